@@ -0,0 +1,440 @@
+import os
+import re
+import json
+import unicodedata
+from collections import Counter
+from atomic_io import atomic_write, FileLock
+from manifest import content_hash
+from references import (read_config_files, read_reference_csv, format_source, extract_season, extract_year,
+                        excitement_level)
+
+
+# Seasons in the order they air within a year, for the excitement trend
+SEASON_CHRONOLOGY = {"Winter": 0, "Spring": 1, "Summer": 2, "Fall": 3}
+
+# Score of the leading word of the "Gigguk Excited?" column, from -1 (not interested) to 1 (excited).
+# Values that say nothing about excitement (N/A, Unclear) don't count towards the averages
+EXCITEMENT_SCORES = {
+    "yes": 1.0, "very": 1.0, "highly": 1.0, "positive": 1.0, "awestruck": 1.0,
+    "maybe": 0.5, "intrigued": 0.5, "curious": 0.5, "cautiously": 0.5, "cautious": 0.5, "moderately": 0.5,
+    "mildly": 0.5, "surprised": 0.5, "initial": 0.5,
+    "neutral": 0.0, "mixed": 0.0, "amused": 0.0, "humorous": 0.0,
+    "skeptical": -0.5, "sarcastic": -0.5, "sarcastically": -0.5, "mocking": -0.5,
+    "no": -1.0, "dismissive": -1.0,
+}
+
+# Alternative titles and remarks, e.g. "(Yofukashi no Uta)" or "(Season 2 implied)"
+PARENTHETICAL_PATTERN = re.compile(r'\s*[(\[][^)\]]*[)\]]')
+
+# Subtitles, e.g. "Frieren: Beyond Journey's End", "Konosuba - God's Blessing..." or "~These Seeds...~"
+SUBTITLE_PATTERN = re.compile(r':\s|\s[-–~]')
+
+# Sequel markers at the end of a title, e.g. "Season 2", "S2 P2", "2nd Season", "Part 2", "IV" or a bare "3"
+SEQUEL_PATTERN = re.compile(
+    r'\s+(?:(?:season|s|part|p|cour)\s*\d+|\d+(?:st|nd|rd|th)\s+season|final\s+season'
+    r'|ii|iii|iv|v|vi|vii|viii|ix|[2-9])\s*$',
+    re.IGNORECASE,
+)
+
+# A bare number after "No." is part of the title, as in "Kaiju No. 8"
+NUMBERED_TITLE_PATTERN = re.compile(r'\bno\.?\s+\d+\s*$', re.IGNORECASE)
+
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[\W_]+')
+
+
+def display_title(title):
+    """
+    Remove the parenthetical remarks and sequel markers from a title, keeping its subtitle.
+
+    Args:
+        title (str): The title as extracted, e.g. "Tsukimichi: Moonlit Fantasy (Season 2)"
+
+    Returns:
+        str: The title without them, e.g. "Tsukimichi: Moonlit Fantasy"
+    """
+    cleaned = PARENTHETICAL_PATTERN.sub('', unicodedata.normalize('NFKC', title or '')).strip()
+    while not NUMBERED_TITLE_PATTERN.search(cleaned):
+        stripped = SEQUEL_PATTERN.sub('', cleaned).rstrip(' :-')
+        if stripped == cleaned or not stripped:
+            break
+        cleaned = stripped
+    return cleaned or (title or '').strip()
+
+
+def canonical_title_key(title):
+    """
+    Get the key shared by every spelling of an anime's title across seasons.
+
+    The key drops parenthetical remarks, the subtitle, sequel markers, case, punctuation and
+    spaces, so "Spy x Family (Season 2)" and "Spy x Family", "Mushoku Tensei II" and "Mushoku
+    Tensei: Jobless Reincarnation Season 2 Part 2", or "Drug Store in Another World" and
+    "Drugstore in Another World" get the same key.
+
+    Args:
+        title (str): The title as extracted
+
+    Returns:
+        str: The key, or an empty string for an empty title
+    """
+    base = display_title(title)
+    base = SUBTITLE_PATTERN.split(base, maxsplit=1)[0]
+    base = display_title(base)
+    key = NON_ALPHANUMERIC_PATTERN.sub('', base.replace('&', 'and').casefold())
+    return key or NON_ALPHANUMERIC_PATTERN.sub('', unicodedata.normalize('NFKC', title or '').casefold())
+
+
+def excitement_score(excited):
+    """
+    Score a "Gigguk Excited?" value.
+
+    Args:
+        excited (str): The column value, e.g. "Yes (Intrigued)"
+
+    Returns:
+        float: The score from -1.0 to 1.0, or None if the value says nothing about excitement
+    """
+    return EXCITEMENT_SCORES.get(excitement_level(excited))
+
+
+def _chronological_key(appearance):
+    return appearance["year"], SEASON_CHRONOLOGY.get(appearance["season"], -1), appearance["file"]
+
+
+class AnimeCatalog:
+    """
+    One entry per anime across every CSV file in the CSV config, keyed by canonical title.
+
+    Each entry holds the anime's appearances (video, timestamp, title as written and excitement)
+    and a summary that is materialized when the entry changes: number of appearances, the seasons
+    it was covered in, excitement counts, the average excitement score and its trend from the first
+    to the latest appearance. The catalog is saved as JSON; adding or replacing a CSV file only
+    touches the entries of that file, and lookup() is a dict access on the canonical key.
+    """
+
+    VERSION = 1
+
+    def __init__(self, config_file="csv_config.json", output_dir="transcripts", catalog_file="anime_catalog.json"):
+        """
+        Initialize the catalog. The catalog file is read on first use.
+
+        Args:
+            config_file (str): Path to the CSV configuration file
+            output_dir (str): Directory containing the CSV files
+            catalog_file (str): Path of the catalog JSON file
+        """
+        self.config_file = config_file
+        self.output_dir = output_dir
+        self.catalog_file = catalog_file
+        self.files = {}      # CSV filename -> {"hash": content hash, "keys": canonical keys of its rows}
+        self.anime = {}      # canonical key -> entry
+        self._stamp = None   # (mtime_ns, size) of the catalog file when it was last read or written
+        # Extractor processes update the catalog side by side, so every update re-reads it under this lock
+        self._lock = FileLock(f"{catalog_file}.lock")
+
+    def _file_stamp(self):
+        try:
+            stat = os.stat(self.catalog_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        """
+        Read the catalog file if it changed since it was last read or written.
+        """
+        stamp = self._file_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return
+        self.files, self.anime = {}, {}
+        if stamp is not None:
+            try:
+                with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self.files = data.get("files", {})
+                    self.anime = data.get("anime", {})
+            except Exception as e:
+                print(f"Error reading anime catalog: {str(e)}")
+        self._stamp = stamp
+
+    def _save(self):
+        data = {"version": self.VERSION, "files": self.files, "anime": self.anime}
+        with atomic_write(self.catalog_file, encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        self._stamp = self._file_stamp()
+
+    def _read_file(self, filename):
+        """
+        Read a CSV file and its content hash.
+
+        Returns:
+            tuple: (content hash, rows), or (None, None) if the file can't be read
+        """
+        path = os.path.join(self.output_dir, filename)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                digest = content_hash(f.read())
+            return digest, read_reference_csv(path)
+        except Exception as e:
+            print(f"Error reading {path}: {str(e)}")
+            return None, None
+
+    def _remove_file(self, filename):
+        """
+        Remove the appearances of a CSV file.
+
+        Returns:
+            set: The canonical keys of the entries that changed
+        """
+        keys = set(self.files.pop(filename, {}).get("keys", []))
+        for key in keys:
+            entry = self.anime.get(key)
+            if entry is None:
+                continue
+            entry["appearances"] = [appearance for appearance in entry["appearances"] if appearance["file"] != filename]
+            if not entry["appearances"]:
+                del self.anime[key]
+        return keys
+
+    def _add_file(self, filename, digest, rows):
+        """
+        Add the appearances of a CSV file.
+
+        Returns:
+            set: The canonical keys of the entries that changed
+        """
+        source = format_source(filename)
+        season = extract_season(filename)
+        year = extract_year(filename)
+        keys = set()
+        for row in rows:
+            title = row.get("Anime Title", "")
+            key = canonical_title_key(title)
+            if not key:
+                continue
+            entry = self.anime.setdefault(key, {"appearances": []})
+            entry["appearances"].append({
+                "file": filename,
+                "source": source,
+                "season": season,
+                "year": year,
+                "title": title,
+                "timestamp": row.get("Timestamp", ""),
+                "excited": row.get("Gigguk Excited?", ""),
+                "score": excitement_score(row.get("Gigguk Excited?")),
+            })
+            keys.add(key)
+        self.files[filename] = {"hash": digest, "keys": sorted(keys)}
+        return keys
+
+    def _summarize(self, keys):
+        """
+        Recompute the summary of the given entries from their appearances.
+        """
+        for key in keys:
+            entry = self.anime.get(key)
+            if entry is None:
+                continue
+            appearances = sorted(entry["appearances"], key=_chronological_key)
+            entry["appearances"] = appearances
+
+            # The most common spelling names the anime; ties go to the one seen first
+            titles = Counter(display_title(appearance["title"]) for appearance in appearances)
+            first_seen = {}
+            for index, appearance in enumerate(appearances):
+                first_seen.setdefault(display_title(appearance["title"]), index)
+            entry["title"] = min(titles, key=lambda title: (-titles[title], first_seen[title]))
+            entry["aliases"] = sorted({appearance["title"] for appearance in appearances})
+
+            seasons = []
+            for appearance in appearances:
+                if appearance["source"] not in seasons:
+                    seasons.append(appearance["source"])
+            entry["seasons"] = seasons
+            entry["appearance_count"] = len(appearances)
+            entry["first_seen"] = appearances[0]["source"]
+            entry["last_seen"] = appearances[-1]["source"]
+            entry["excitement"] = dict(Counter(excitement_level(appearance["excited"]) or "unknown"
+                                               for appearance in appearances))
+
+            scores = [appearance["score"] for appearance in appearances if appearance["score"] is not None]
+            entry["average_score"] = round(sum(scores) / len(scores), 3) if scores else None
+            entry["latest_score"] = scores[-1] if scores else None
+            if len(scores) < 2:
+                entry["trend"] = "single" if scores else "unknown"
+            elif scores[-1] > scores[0]:
+                entry["trend"] = "rising"
+            elif scores[-1] < scores[0]:
+                entry["trend"] = "falling"
+            else:
+                entry["trend"] = "steady"
+
+    def build(self):
+        """
+        Rebuild the catalog from every CSV file listed in the config.
+
+        Returns:
+            int: Number of anime in the catalog
+        """
+        with self._lock:
+            self.files, self.anime = {}, {}
+            for filename in read_config_files(self.config_file):
+                digest, rows = self._read_file(filename)
+                if rows is not None:
+                    self._add_file(filename, digest, rows)
+            self._summarize(list(self.anime))
+            self._save()
+            return len(self.anime)
+
+    def update_file(self, filename):
+        """
+        Add a newly registered or re-extracted CSV file, replacing its previous appearances.
+
+        Only the entries of anime in the old or new version of the file are recomputed. If the
+        catalog file is missing or doesn't cover the CSV config, e.g. on a fresh clone where it
+        isn't committed, the other configured files are synced first, so the saved catalog is complete.
+
+        Args:
+            filename (str): The CSV filename
+
+        Returns:
+            int: Number of entries that changed, or None if the file couldn't be read
+        """
+        with self._lock:
+            self._reload()
+            keys = set()
+            configured = read_config_files(self.config_file)
+            if any(name not in self.files for name in configured if name != filename):
+                keys = self._sync_files(configured, {"added": [], "updated": [], "removed": []}, skip=filename)
+
+            digest, rows = self._read_file(filename)
+            if rows is not None and self.files.get(filename, {}).get("hash") != digest:
+                keys |= self._remove_file(filename) | self._add_file(filename, digest, rows)
+            if keys:
+                self._summarize(keys)
+                self._save()
+            return None if rows is None else len(keys)
+
+    def sync(self):
+        """
+        Bring the catalog up to date with the CSV config: files that were added, changed or removed
+        since the catalog was saved are updated individually.
+
+        Returns:
+            dict: Lists of the 'added', 'updated' and 'removed' CSV filenames
+        """
+        with self._lock:
+            self._reload()
+            changes = {"added": [], "updated": [], "removed": []}
+            keys = self._sync_files(read_config_files(self.config_file), changes)
+            if keys or changes["removed"]:
+                self._summarize(keys)
+                self._save()
+            return changes
+
+    def _sync_files(self, configured, changes, skip=None):
+        """
+        Add, update and remove files so the catalog matches the configured files, without saving it.
+
+        Args:
+            configured (list): The CSV filenames in the config
+            changes (dict): Receives the 'added', 'updated' and 'removed' filenames
+            skip (str, optional): A filename to leave as it is
+
+        Returns:
+            set: The canonical keys of the entries that changed
+        """
+        keys = set()
+        for filename in [filename for filename in self.files if filename not in configured and filename != skip]:
+            keys |= self._remove_file(filename)
+            changes["removed"].append(filename)
+        for filename in configured:
+            if filename == skip:
+                continue
+            digest, rows = self._read_file(filename)
+            if rows is None or self.files.get(filename, {}).get("hash") == digest:
+                continue
+            changes["updated" if filename in self.files else "added"].append(filename)
+            keys |= self._remove_file(filename) | self._add_file(filename, digest, rows)
+        return keys
+
+    def lookup(self, title):
+        """
+        Get the entry of an anime by any spelling of its title.
+
+        Args:
+            title (str): The title, e.g. "Bleach: Thousand Year Blood War 3" or "bleach"
+
+        Returns:
+            dict: The entry, or None if the anime isn't in the catalog
+        """
+        self._reload()
+        return self.anime.get(canonical_title_key(title))
+
+    def top(self, limit=20):
+        """
+        Get the anime that were covered most often.
+
+        Args:
+            limit (int, optional): Maximum number of entries
+
+        Returns:
+            list: The entries, most appearances first
+        """
+        self._reload()
+        entries = sorted(self.anime.values(), key=lambda entry: (-entry["appearance_count"], entry["title"]))
+        return entries[:limit] if limit else entries
+
+
+def print_entry(entry):
+    average = "n/a" if entry["average_score"] is None else f"{entry['average_score']:+.2f}"
+    print(f"{entry['title']}: {entry['appearance_count']} appearance(s), excitement {average} ({entry['trend']})")
+    for appearance in entry["appearances"]:
+        print(f"  {appearance['source']} at {appearance['timestamp']} - {appearance['excited']}"
+              f" [{appearance['title']}]")
+
+
+def main():
+    """
+    Build and query the anime catalog from the command line.
+    Command-line usage: python anime_catalog.py build | sync | show <title> | top [--limit 20]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Per-anime summary of every Gigguk video')
+    parser.add_argument('--catalog', default='anime_catalog.json', help='Catalog file (default: anime_catalog.json)')
+    parser.add_argument('--config', default='csv_config.json', help='CSV configuration file (default: csv_config.json)')
+    parser.add_argument('--output-dir', default='transcripts', help='Directory of the CSV files (default: transcripts)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('build', help='Rebuild the catalog from every CSV file')
+    commands.add_parser('sync', help='Update the catalog with the CSV files that changed')
+    show = commands.add_parser('show', help='Show the summary of one anime')
+    show.add_argument('title', nargs='+', help='Any spelling of the title')
+    top = commands.add_parser('top', help='List the anime covered most often')
+    top.add_argument('--limit', type=int, default=20, help='Number of anime (default: 20)')
+    args = parser.parse_args()
+
+    catalog = AnimeCatalog(args.config, args.output_dir, args.catalog)
+    if args.command in ('show', 'top'):
+        # The catalog is generated and not committed, so create or complete it from the CSV config first
+        catalog.sync()
+    if args.command == 'build':
+        print(f"Built {args.catalog} with {catalog.build()} anime")
+    elif args.command == 'sync':
+        changes = catalog.sync()
+        print(f"Added {len(changes['added'])}, updated {len(changes['updated'])} and removed "
+              f"{len(changes['removed'])} files in {args.catalog}")
+    elif args.command == 'show':
+        title = " ".join(args.title)
+        entry = catalog.lookup(title)
+        if entry is None:
+            print(f"{title} isn't in the catalog")
+        else:
+            print_entry(entry)
+    else:
+        for entry in catalog.top(args.limit):
+            print(f"{entry['appearance_count']:>3}  {entry['title']}  ({', '.join(entry['seasons'])})")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,46 @@ import csv
 import io
 import json
 import base64
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+import hashlib
+import time
+import asyncio
+import threading
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from youtube_transcript_downloader import YouTubeDataExtractor
+from disk_cache import DiskCache
+from scheduler import RequestScheduler
+from manifest import ExtractionManifest, content_hash
+from references import build_viewer_index
+from markdown_table import parse_markdown_table, StreamingCSVWriter
+from transcript_snippets import TranscriptSnippet
+from chapters import parse_chapters, format_timestamp
+from transcript_compactor import compact_transcript, estimate_tokens
+from structured_output import (RECORD_FIELDS, parse_json_records, merge_records, write_records_csv,
+                               render_markdown_table)
+from instrumentation import Instrumentation, JSONLinesSink, PrometheusTextfileSink
+from channel_sync import ChannelSync, DEFAULT_SYNC_URL, DEFAULT_TITLE_PATTERN, DEFAULT_SYNC_LIMIT
+from reference_store import ReferenceStore
+from atomic_io import atomic_write, FileLock
+from anime_catalog import AnimeCatalog
+
+
+# Bump whenever _create_gemini_prompt or the CSV parsing changes, so --incremental
+# runs re-extract the videos processed with the old prompt
+PROMPT_VERSION = "3"
+
+# Model tried when the extraction model fails after its retries (we used to switch to it by hand)
+DEFAULT_FALLBACK_MODEL = "gemini-2.5-pro-preview-03-25"
+
+
+class PartialResponseError(Exception):
+    """
+    Raised when a streamed Gemini response fails after some of it was already received.
+    """
+    
+    # Rows from the first attempt were already written, so the request isn't retried
+    retryable = False
 
 
 class AnimeExtractor:
@@ -14,7 +50,13 @@ class AnimeExtractor:
     A class to extract anime references from Gigguk YouTube videos using Gemini API.
     """
     
-    def __init__(self, output_dir="transcripts", api_key=None, config_file="csv_config.json"):
+    def __init__(self, output_dir="transcripts", api_key=None, config_file="csv_config.json", cache_dir=".cache",
+                 index_file="anime_index.json", catalog_file="anime_catalog.json",
+                 use_response_cache=True, response_cache_max_bytes=256 * 1024 * 1024, segment_seconds=None,
+                 max_segment_workers=4, model="gemini-2.5-pro-exp-03-25", manifest_file="extraction_manifest.json",
+                 incremental=False, output_format="markdown", fallback_model=DEFAULT_FALLBACK_MODEL,
+                 gemini_rate_per_minute=10, compact_transcripts=True, instrumentation=None, quiet=False,
+                 reference_store=None):
         """
         Initialize the AnimeExtractor with necessary components.
         
@@ -22,21 +64,97 @@ class AnimeExtractor:
             output_dir (str): Directory where transcript and output files will be saved
             api_key (str): Google Gemini API key. If None, it will be read from GEMINI_API_KEY env variable
             config_file (str): Path to the configuration file for tracking CSV files
+            cache_dir (str): Directory for the on-disk caches of YouTube and Gemini data
+            index_file (str): Path of the pre-built JSON index loaded by the web viewer
+            catalog_file (str): Path of the per-anime catalog, updated with every CSV that is registered
+            use_response_cache (bool): Read Gemini responses from the response cache. If False the cache is
+                bypassed and every prompt is sent to Gemini, but fresh responses are still stored
+            response_cache_max_bytes (int, optional): Maximum size of the Gemini response cache on disk
+            segment_seconds (float, optional): If set, split transcripts into windows of about this many seconds
+                and send each window to Gemini as a separate, concurrent request
+            max_segment_workers (int): Maximum number of concurrent Gemini requests per video in segmented mode
+            model (str): The Gemini model used for extraction
+            manifest_file (str): Path to the manifest recording the inputs of each output CSV
+            incremental (bool): Skip videos whose output CSV was produced from the same inputs and prompt version
+            output_format (str): "markdown" to ask Gemini for a markdown table, or "json" to ask for
+                schema-constrained JSON records that are written to CSV without parsing a table
+            fallback_model (str, optional): Model used when the extraction model keeps failing. None disables it
+            gemini_rate_per_minute (float): Maximum number of Gemini requests per minute and model. The rate is
+                lowered automatically while Gemini returns rate limit errors
+            compact_transcripts (bool): Strip caption tags, filler and rolling-caption repeats from transcripts
+                and merge them into sentences with [mm:ss] anchors before building the prompt
+            instrumentation (Instrumentation, optional): Receives timing spans of every pipeline stage.
+                A new one without sinks is created if None
+            quiet (bool): Don't echo the Gemini response to stdout while it streams in
+            reference_store (ReferenceStore, optional): Also store the rows of every saved CSV in this
+                SQLite database
         """
-        # Load environment variables from .env file
-        load_dotenv()
+        # Load environment variables from .env file, unless the API key is already known
+        if not (api_key or os.environ.get("GEMINI_API_KEY")):
+            from dotenv import load_dotenv
+            load_dotenv()
         
         self.output_dir = output_dir
         self.config_file = config_file
-        self.yt_extractor = YouTubeDataExtractor(output_dir=output_dir)
+        self.cache_dir = cache_dir
+        self.index_file = index_file
+        self.catalog = AnimeCatalog(config_file, output_dir, catalog_file)
+        self.segment_seconds = segment_seconds
+        self.max_segment_workers = max_segment_workers
+        self.model = model
+        self.incremental = incremental
+        if output_format not in ("markdown", "json"):
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.output_format = output_format
+        self.fallback_model = fallback_model
+        self.compact_transcripts = compact_transcripts
+        self.quiet = quiet
+        self.instrumentation = instrumentation or Instrumentation()
+        self.manifest = ExtractionManifest(manifest_file)
+        self.reference_store = reference_store
+        
+        # Rate limits, retries and circuit breakers for YouTube and each Gemini model
+        self.scheduler = RequestScheduler()
+        for gemini_model in self._gemini_models():
+            self.scheduler.add_backend(f"gemini:{gemini_model}", gemini_rate_per_minute, max_retries=4,
+                                       base_delay=2.0, failure_threshold=3, reset_timeout=120.0)
+        self.yt_extractor = YouTubeDataExtractor(output_dir=output_dir, cache_dir=cache_dir, scheduler=self.scheduler)
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
         
         if not self.api_key:
             raise ValueError("Gemini API key is required. Set GEMINI_API_KEY environment variable or pass it to the constructor.")
             
-        # Initialize Gemini client
-        self.gemini_client = genai.Client(api_key=self.api_key)
+        # The Gemini client is created on first use, see the gemini_client property
+        self._gemini_client = None
+        self._gemini_client_lock = threading.Lock()
+        
+        # Raw Gemini responses keyed by a hash of (model, prompt, generation config)
+        self.use_response_cache = use_response_cache
+        self.response_cache = DiskCache(os.path.join(cache_dir, "gemini"), max_bytes=response_cache_max_bytes,
+                                        compress=True)
+        
+        # Guards the read-modify-write of the CSV config across threads and extractor processes
+        self._config_lock = FileLock(f"{config_file}.lock")
+    
+    @property
+    def gemini_client(self):
+        """
+        The Gemini client, created on first use.
         
+        Importing google-genai and creating the client is slow, and runs that only read
+        caches or re-parse saved responses never need it.
+        """
+        if self._gemini_client is None:
+            with self._gemini_client_lock:
+                if self._gemini_client is None:
+                    from google import genai
+                    self._gemini_client = genai.Client(api_key=self.api_key)
+        return self._gemini_client
+    
+    @gemini_client.setter
+    def gemini_client(self, client):
+        self._gemini_client = client
+    
     def _read_csv_config(self):
         """
         Read the CSV configuration file.
@@ -65,25 +183,43 @@ class AnimeExtractor:
             bool: True if successful, False otherwise
         """
         try:
-            # Read current config
-            config = self._read_csv_config()
-            
-            # Check if the file is already in the config
-            if csv_filename not in config["files"]:
-                # Add the new file to the list
-                config["files"].append(csv_filename)
+            with self._config_lock:
+                # Read current config
+                config = self._read_csv_config()
                 
-                # Write updated config back to file
-                with open(self.config_file, 'w', encoding='utf-8') as f:
-                    json.dump(config, f, indent=2)
+                # Check if the file is already in the config
+                if csv_filename not in config["files"]:
+                    # Add the new file to the list
+                    config["files"].append(csv_filename)
                     
-                print(f"Added {csv_filename} to CSV configuration file")
+                    # Write updated config back to file
+                    with atomic_write(self.config_file, encoding='utf-8') as f:
+                        json.dump(config, f, indent=2)
+                        
+                    print(f"Added {csv_filename} to CSV configuration file")
+                
+                # Only the anime in this file are recomputed, whether it is new or re-extracted
+                if self.catalog.update_file(csv_filename):
+                    print(f"Updated anime catalog {self.catalog.catalog_file}")
             
             return True
         except Exception as e:
             print(f"Error updating CSV config file: {str(e)}")
             return False
     
+    def _build_viewer_index(self):
+        """
+        Rebuild the web viewer's JSON index (and its gzip copy) from the CSV files in the config.
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        with self._config_lock:
+            index_path = build_viewer_index(self.config_file, self.output_dir, self.index_file)
+        if index_path:
+            print(f"Updated viewer index {index_path}")
+        return bool(index_path)
+    
     def process_video(self, video_id, output_csv=None):
         """
         Process a Gigguk YouTube video to extract anime references and save as CSV.
@@ -97,57 +233,946 @@ class AnimeExtractor:
         """
         print(f"Processing video ID: {video_id}")
         
+        with self.instrumentation.video(video_id), self.instrumentation.span("video") as span:
+            inputs = self._fetch_video_inputs(video_id)
+            if not inputs:
+                span.fail("could not fetch transcript")
+                return None
+            
+            csv_path = self._extract_and_save(inputs, output_csv, echo=not self.quiet)
+            if not csv_path:
+                span.fail("extraction failed")
+            return csv_path
+    
+    def _fetch_video_inputs(self, video_id):
+        """
+        Fetch the transcript, title and timestamps needed to process a video.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            
+        Returns:
+            dict: The video_id, video_title, transcript, description, chapters and formatted timestamps, or None if an error occurred
+        """
         # 1. Get transcript
-        transcript = self.yt_extractor.get_transcript_text(video_id)
+        transcript = self._get_prompt_transcript(video_id)
         if not transcript:
             print(f"Error: Could not retrieve transcript for video {video_id}")
             return None
             
-        # 2. Construct video URL and get video title and timestamps
-        video_url = f"https://www.youtube.com/watch?v={video_id}"
-        video_title = self.yt_extractor.get_video_title(video_url)
+        # 2. Get video title and timestamps
+        metadata = self._get_metadata(video_id)
+        if metadata and metadata.get('title'):
+            print(f"Video title: {metadata['title']}")
+        return self._video_inputs(video_id, transcript, metadata)
+    
+    def _video_inputs(self, video_id, transcript, metadata):
+        """
+        Build the inputs of a video from its transcript and metadata.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            transcript (str): The transcript text used in the prompt
+            metadata (dict): The video metadata, or None if it couldn't be retrieved
+            
+        Returns:
+            dict: The video_id, video_title, transcript, description, chapters and formatted timestamps
+        """
+        metadata = metadata or {}
+        video_title = metadata.get('title')
         if not video_title:
             print(f"Warning: Could not retrieve video title for {video_id}, using video ID instead")
             video_title = video_id
-        else:
-            print(f"Video title: {video_title}")
-            
-        timestamps = self.yt_extractor.extract_timestamps(video_url=video_url)
-        if not timestamps:
+        
+        description = metadata.get('description')
+        chapters = parse_chapters(description, metadata.get('duration'))
+        if not chapters:
             print(f"Warning: No timestamps found for video {video_id}")
         
-        # Format timestamps for the prompt
-        formatted_timestamps = ""
-        for timestamp, title in timestamps.items():
-            formatted_timestamps += f"{timestamp} - {title}\n"
+        return {
+            "video_id": video_id,
+            "video_title": video_title,
+            "transcript": transcript,
+            "description": description,
+            "chapters": chapters,
+            "timestamps": self._format_timestamps(chapters),
+        }
+    
+    def _get_metadata(self, video_id):
+        """
+        Get the metadata of a video, recording whether it came from the metadata cache.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            
+        Returns:
+            dict: The video metadata or None if it couldn't be retrieved
+        """
+        with self.instrumentation.span("metadata", video_id) as span:
+            metadata = self.yt_extractor.metadata_cache.get(video_id)
+            span.set(cache_hit=metadata is not None)
+            if metadata is None:
+                metadata = self.yt_extractor.get_video_metadata(video_id)
+            if not metadata:
+                span.fail("no metadata")
+            return metadata
+    
+    async def _get_metadata_async(self, video_id):
+        """
+        Async version of _get_metadata.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            
+        Returns:
+            dict: The video metadata or None if it couldn't be retrieved
+        """
+        with self.instrumentation.span("metadata", video_id) as span:
+            metadata = self.yt_extractor.metadata_cache.get(video_id)
+            span.set(cache_hit=metadata is not None)
+            if metadata is None:
+                metadata = await self.yt_extractor.get_video_metadata_async(video_id)
+            if not metadata:
+                span.fail("no metadata")
+            return metadata
+    
+    def _get_prompt_transcript(self, video_id):
+        """
+        Get the transcript text used in the Gemini prompt, compacted unless compaction is disabled.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            
+        Returns:
+            str: The transcript text or None if an error occurred
+        """
+        with self.instrumentation.span("transcript", video_id) as span:
+            span.set(cache_hit=self.yt_extractor.transcript_store.has(video_id))
+            if not self.compact_transcripts:
+                transcript = self.yt_extractor.get_transcript_text(video_id)
+            else:
+                try:
+                    transcript = self._compact_snippets(video_id, self.yt_extractor.iter_snippets(video_id), span)
+                except Exception as e:
+                    print(f"Error getting transcript for video {video_id}: {str(e)}")
+                    transcript = None
+            if not transcript:
+                span.fail("no transcript")
+            return transcript
+    
+    async def _get_prompt_transcript_async(self, video_id):
+        """
+        Async version of _get_prompt_transcript.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            
+        Returns:
+            str: The transcript text or None if an error occurred
+        """
+        with self.instrumentation.span("transcript", video_id) as span:
+            span.set(cache_hit=self.yt_extractor.transcript_store.has(video_id))
+            if not self.compact_transcripts:
+                transcript = await self.yt_extractor.get_transcript_text_async(video_id)
+            else:
+                try:
+                    snippets = await self.yt_extractor.get_transcript_async(video_id)
+                    transcript = self._compact_snippets(
+                        video_id, (TranscriptSnippet.from_dict(snippet) for snippet in snippets), span)
+                except Exception as e:
+                    print(f"Error getting transcript for video {video_id}: {str(e)}")
+                    transcript = None
+            if not transcript:
+                span.fail("no transcript")
+            return transcript
+    
+    def _compact_snippets(self, video_id, snippets, span=None):
+        """
+        Compact the transcript snippets of a video and report the estimated token savings.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            snippets (iterable): TranscriptSnippets in time order
+            span (Span, optional): Receives the estimated raw_tokens and compact_tokens
+            
+        Returns:
+            str: The compacted transcript or None if it is empty
+        """
+        raw_chars = 0
+        
+        def counted(snippets):
+            nonlocal raw_chars
+            for snippet in snippets:
+                raw_chars += len(snippet.text) + 1
+                yield snippet
+        
+        transcript = compact_transcript(counted(snippets))
+        if not transcript:
+            return None
+        raw_tokens = max(1, raw_chars // 4)
+        compact_tokens = estimate_tokens(transcript)
+        print(f"Compacted transcript of {video_id}: ~{raw_tokens} -> ~{compact_tokens} tokens "
+              f"({100 * (raw_tokens - compact_tokens) / max(raw_tokens, 1):.0f}% smaller)")
+        if span is not None:
+            span.set(raw_tokens=raw_tokens, compact_tokens=compact_tokens)
+        return transcript
+    
+    def _format_timestamps(self, chapters):
+        """
+        Format timestamps for the prompt.
+        
+        Args:
+            chapters (list): Chapters as returned by chapters.parse_chapters
+            
+        Returns:
+            str: One "timestamp - title" line per chapter
+        """
+        return "".join(f"{chapter.timestamp} - {chapter.title}\n" for chapter in chapters)
+    
+    def _extract_and_save(self, inputs, output_csv=None, echo=True, gemini_slots=None):
+        """
+        Send the fetched video inputs to Gemini and save the extracted table as CSV.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            output_csv (str, optional): Custom filename for the CSV output
+            echo (bool): Whether to print the streamed Gemini response
+            gemini_slots (threading.Semaphore, optional): Held during each Gemini request, to cap the
+                number of concurrent requests across videos and segments
+            
+        Returns:
+            str: Path to the saved CSV file or None if an error occurred
+        """
+        existing_csv = self._up_to_date_output(inputs, output_csv)
+        if existing_csv:
+            return existing_csv
+        
+        if self.segment_seconds or self.output_format == "json":
+            # 3-5. Send the transcript (or each segment of it) to Gemini, then write the result as CSV
+            usage = {}
+            responses = self._request_responses(inputs, echo=echo, usage=usage, gemini_slots=gemini_slots)
+            return self._save_responses(inputs, responses, output_csv, usage)
         
         # 3. Create the prompt for Gemini
-        prompt = self._create_gemini_prompt(transcript, formatted_timestamps)
+        prompt = self._create_gemini_prompt(inputs["transcript"], inputs["timestamps"])
         
-        # 4. Send to Gemini API and get response
-        markdown_response = self._send_to_gemini(prompt)
+        # 4-5. Send to Gemini API and write CSV rows as the table streams in
+        output_csv = self._output_csv_name(inputs, output_csv)
+        writer = StreamingCSVWriter(os.path.join(self.output_dir, output_csv))
+        usage = {}
+        markdown_response = self._send_to_gemini(prompt, echo=echo, on_chunk=writer.feed, usage=usage,
+                                                 gemini_slots=gemini_slots)
+        inputs["model"] = usage.get("model", self.model)
+        return self._finish_streamed_csv(inputs, writer, markdown_response, output_csv)
+    
+    def _request_responses(self, inputs, echo=True, usage=None, gemini_slots=None):
+        """
+        Send the fetched video inputs to Gemini without saving anything, and record the answering model in inputs.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            echo (bool): Whether to print the streamed Gemini response (not used in segmented mode)
+            usage (dict, optional): Receives the 'output_tokens' reported by Gemini and the answering 'model'
+            gemini_slots (threading.Semaphore, optional): Held during each Gemini request
+            
+        Returns:
+            list: The response of every request (one per segment in segmented mode, None for failed ones),
+                or None if the transcript couldn't be split
+        """
+        if usage is None:
+            usage = {}
+        if self.segment_seconds:
+            # Send each transcript segment to Gemini in parallel
+            responses = self._send_segments_to_gemini(inputs, usage=usage, gemini_slots=gemini_slots)
+        else:
+            prompt = self._create_gemini_prompt(inputs["transcript"], inputs["timestamps"])
+            responses = [self._send_to_gemini(prompt, echo=echo, usage=usage, gemini_slots=gemini_slots)]
+            if echo:
+                print()
+        inputs["model"] = usage.get("model", self.model)
+        return responses
+    
+    def _save_responses(self, inputs, responses, output_csv=None, usage=None):
+        """
+        Save the Gemini responses returned by _request_responses as CSV and register it in the CSV config.
+        
+        Args:
+            inputs (dict): The video inputs, with the answering 'model'
+            responses (list): The responses returned by _request_responses
+            output_csv (str, optional): Custom filename for the CSV output
+            usage (dict, optional): 'output_tokens' reported by Gemini for the responses
+            
+        Returns:
+            str: Path to the saved CSV file or None if an error occurred
+        """
+        if self.output_format == "json":
+            return self._save_json_responses(inputs, responses, output_csv, usage)
+        if self.segment_seconds:
+            return self._save_response(inputs, self._merge_markdown_tables(responses), output_csv)
+        return self._save_response(inputs, responses[0] if responses else None, output_csv)
+    
+    def _build_segments(self, video_id, chapters):
+        """
+        Split a video transcript into time windows for segmented extraction.
+        
+        Windows end on chapter boundaries from the video description where there are any,
+        grouping consecutive chapters until a window is at least segment_seconds long.
+        Without chapters the transcript is cut into fixed windows of segment_seconds.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            chapters (list): Chapters as returned by chapters.parse_chapters
+            
+        Returns:
+            list: Segment dicts with start, end, transcript and formatted timestamps, or None if an error occurred
+        """
+        # Window boundaries in seconds
+        boundaries = None
+        if chapters:
+            boundaries = [0]
+            for chapter in chapters:
+                if chapter.start - boundaries[-1] >= self.segment_seconds:
+                    boundaries.append(chapter.start)
+        
+        segments = []
+        with self.instrumentation.span("segments", video_id) as span:
+            try:
+                for window in self.yt_extractor.iter_transcript_windows(video_id, self.segment_seconds, boundaries):
+                    if self.compact_transcripts:
+                        transcript = compact_transcript(window.snippets)
+                    else:
+                        transcript = window.text
+                    if not transcript:
+                        continue
+                    window_chapters = [chapter for chapter in chapters if window.start <= chapter.start < window.end]
+                    segments.append({
+                        "start": window.start,
+                        "end": window.end,
+                        "transcript": transcript,
+                        "timestamps": self._format_timestamps(window_chapters),
+                    })
+            except Exception as e:
+                print(f"Error getting transcript for video {video_id}: {str(e)}")
+                span.fail(e)
+                return None
+            span.set(segments=len(segments))
+        return segments or None
+    
+    def _segment_prompt(self, segment):
+        """
+        Create the Gemini prompt for one transcript segment.
+        
+        Args:
+            segment (dict): A segment returned by _build_segments
+            
+        Returns:
+            str: The formatted prompt
+        """
+        timestamps = (f"This part of the video runs from {format_timestamp(segment['start'])} "
+                      f"to {format_timestamp(segment['end'])}.\n{segment['timestamps']}")
+        return self._create_gemini_prompt(segment["transcript"], timestamps)
+    
+    def _send_segments_to_gemini(self, inputs, usage=None, gemini_slots=None):
+        """
+        Run every transcript segment of a video through Gemini concurrently.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            usage (dict, optional): Receives the total 'output_tokens' of the segments if Gemini reported them,
+                and the fallback 'model' if any segment needed it
+            gemini_slots (threading.Semaphore, optional): Held during each segment's Gemini request
+            
+        Returns:
+            list: The response of every segment in video order (None for failed segments),
+                or None if the transcript couldn't be split
+        """
+        segments = self._build_segments(inputs["video_id"], inputs["chapters"])
+        if not segments:
+            print(f"Error: Could not split the transcript of video {inputs['video_id']} into segments")
+            return None
+        print(f"Sending {len(segments)} transcript segments to Gemini")
+        
+        prompts = [self._segment_prompt(segment) for segment in segments]
+        usages = [{} for _ in prompts]
+        # Each request runs in a copy of this context, so its spans are attributed to the video
+        context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=min(len(prompts), self.max_segment_workers)) as executor:
+            responses = list(executor.map(
+                lambda prompt, segment_usage: context.copy().run(self._send_to_gemini, prompt, False, None,
+                                                                 segment_usage, gemini_slots),
+                prompts, usages))
+        
+        if usage is not None and all("output_tokens" in segment_usage for segment_usage in usages):
+            usage["output_tokens"] = sum(segment_usage["output_tokens"] for segment_usage in usages)
+        if usage is not None:
+            usage["model"] = self._answering_model(usages)
+        return responses
+    
+    def _answering_model(self, usages):
+        """
+        Get the model recorded for a video whose requests may have been answered by different models.
+        
+        Args:
+            usages (list): The usage dicts of every request
+            
+        Returns:
+            str: The fallback model if any request used it, the extraction model otherwise
+        """
+        models = {usage.get("model", self.model) for usage in usages}
+        models.discard(self.model)
+        return models.pop() if models else self.model
+    
+    def _merge_markdown_tables(self, markdown_tables):
+        """
+        Merge the markdown tables of several segments into one, dropping duplicate anime titles.
+        
+        Args:
+            markdown_tables (list): The markdown responses of every segment, in video order, or None
+            
+        Returns:
+            str: The merged markdown table or None if any segment failed
+        """
+        if not markdown_tables:
+            return None
+        if any(not markdown_table for markdown_table in markdown_tables):
+            print("Error: Gemini did not return a table for every segment")
+            return None
+        
+        header = None
+        rows = []
+        seen_titles = set()
+        for markdown_table in markdown_tables:
+            table_header, table_rows = self._parse_markdown_table(markdown_table)
+            if header is None:
+                header = table_header
+            for row in table_rows:
+                title_key = " ".join(row[0].lower().split()) if row else ""
+                if title_key in seen_titles:
+                    continue
+                seen_titles.add(title_key)
+                rows.append(row)
+        
+        if not header:
+            return None
+        lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+        lines.extend("| " + " | ".join(row) + " |" for row in rows)
+        return "\n".join(lines) + "\n"
+    
+    def _finish_streamed_csv(self, inputs, writer, markdown_response, output_csv):
+        """
+        Complete a CSV written while the Gemini response streamed in and register it in the CSV config.
+        
+        If the response failed or was cut off, the rows received so far are kept in the
+        writer's ".partial.csv" file and the output isn't registered.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            writer (StreamingCSVWriter): The writer fed with the response chunks
+            markdown_response (str): The full markdown response, or None if the request failed
+            output_csv (str): The CSV filename
+            
+        Returns:
+            str: Path to the saved CSV file or None if an error occurred
+        """
+        with self.instrumentation.span("csv_write", inputs["video_id"], streamed=True) as span:
+            try:
+                if not markdown_response:
+                    partial_path = writer.abort()
+                    print(f"Error: Could not get a response from Gemini API")
+                    if partial_path:
+                        print(f"Kept {writer.rows_written} rows received before the failure in {partial_path}")
+                    span.fail("no response")
+                    span.set(rows=writer.rows_written)
+                    return None
+                
+                if not writer.finish():
+                    print("Error: No markdown table found in the response")
+                    span.fail("no table")
+                    return None
+            except Exception as e:
+                print(f"Error converting markdown to CSV: {str(e)}")
+                span.fail(e)
+                return None
+            
+            stats = writer.stats()
+            span.set(rows=stats["rows"], time_to_first_row=stats["time_to_first_row"])
+        
+        if stats["time_to_first_row"] is not None:
+            print(f"First table row written after {stats['time_to_first_row']:.1f}s, "
+                  f"{stats['rows']} rows in {stats['total_seconds']:.1f}s")
+        if stats["malformed_rows"]:
+            print(f"Warning: {stats['malformed_rows']} rows didn't match the table header and were padded or merged")
+        
+        print(f"Successfully saved anime references to {writer.output_path}")
+        self._register_output(inputs, output_csv)
+        return writer.output_path
+    
+    def _register_output(self, inputs, output_csv):
+        """
+        Register a saved CSV in the CSV config, the viewer index, the manifest and the reference store.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            output_csv (str): The CSV filename
+        """
+        # Update the CSV configuration file and record the inputs of this output
+        with self.instrumentation.span("register", inputs["video_id"]):
+            self._update_csv_config(output_csv)
+            self._build_viewer_index()
+            self.manifest.record(output_csv, self._input_fingerprint(inputs), video_title=inputs["video_title"])
+            if self.reference_store is not None:
+                self.reference_store.save_csv(os.path.join(self.output_dir, output_csv), video_id=inputs["video_id"])
+    
+    def _save_response(self, inputs, markdown_response, output_csv=None):
+        """
+        Save the Gemini response for a video as CSV and register it in the CSV config.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            markdown_response (str): The markdown table returned by Gemini, or None if the request failed
+            output_csv (str, optional): Custom filename for the CSV output
+            
+        Returns:
+            str: Path to the saved CSV file or None if an error occurred
+        """
         if not markdown_response:
             print(f"Error: Could not get a response from Gemini API")
             return None
             
         # 5. Convert markdown to CSV and save
-        if not output_csv:
-            # Create a sanitized filename from the video title
-            sanitized_title = self.yt_extractor.sanitize_filename(video_title)
-            output_csv = f"{sanitized_title}_anime_references.csv"
-        
+        output_csv = self._output_csv_name(inputs, output_csv)
         csv_path = os.path.join(self.output_dir, output_csv)
-        success = self._save_markdown_as_csv(markdown_response, csv_path)
+        with self.instrumentation.span("csv_write", inputs["video_id"], streamed=False) as span:
+            success = self._save_markdown_as_csv(markdown_response, csv_path)
+            if not success:
+                span.fail("could not save CSV")
         
         if success:
             print(f"Successfully saved anime references to {csv_path}")
-            # Update the CSV configuration file
-            self._update_csv_config(output_csv)
+            self._register_output(inputs, output_csv)
             return csv_path
         else:
             print(f"Error: Failed to save CSV file")
             return None
     
+    def _save_json_responses(self, inputs, json_responses, output_csv=None, usage=None):
+        """
+        Save the JSON records returned by Gemini for a video as CSV and register it in the CSV config.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            json_responses (list): The JSON response of every request for the video (one per segment in
+                segmented mode), or None if the transcript couldn't be split
+            output_csv (str, optional): Custom filename for the CSV output
+            usage (dict, optional): 'output_tokens' reported by Gemini for the responses
+            
+        Returns:
+            str: Path to the saved CSV file or None if an error occurred
+        """
+        if not json_responses or any(not json_response for json_response in json_responses):
+            print(f"Error: Could not get a response from Gemini API")
+            return None
+        
+        with self.instrumentation.span("csv_write", inputs["video_id"], streamed=False) as span:
+            try:
+                records = merge_records([parse_json_records(json_response) for json_response in json_responses])
+            except ValueError as e:
+                print(f"Error parsing JSON records from Gemini: {str(e)}")
+                span.fail(e)
+                return None
+            
+            # 5. Write the records as CSV
+            output_csv = self._output_csv_name(inputs, output_csv)
+            csv_path = os.path.join(self.output_dir, output_csv)
+            try:
+                write_records_csv(records, csv_path)
+            except Exception as e:
+                print(f"Error saving CSV file: {str(e)}")
+                span.fail(e)
+                return None
+            span.set(rows=len(records))
+        
+        print(f"Successfully saved {len(records)} anime references to {csv_path}")
+        self._report_output_tokens("".join(json_responses), records, (usage or {}).get("output_tokens"))
+        self._register_output(inputs, output_csv)
+        return csv_path
+    
+    def _report_output_tokens(self, json_text, records, output_tokens=None):
+        """
+        Print how many output tokens the JSON records took compared to the same rows as a markdown table.
+        
+        Both sides are estimated locally, so the comparison costs no API request or quota.
+        
+        Args:
+            json_text (str): The JSON returned by Gemini
+            records (list): The records parsed from json_text
+            output_tokens (int, optional): Output tokens reported by Gemini, printed alongside the estimate
+            
+        Returns:
+            dict: 'json_tokens' and 'markdown_tokens'
+        """
+        json_tokens = estimate_tokens(json_text)
+        markdown_tokens = estimate_tokens(render_markdown_table(records))
+        saved = markdown_tokens - json_tokens
+        percent = 100 * saved / markdown_tokens if markdown_tokens else 0
+        reported = f" (Gemini reported {output_tokens})" if output_tokens is not None else ""
+        print(f"Output tokens (estimated): {json_tokens} as JSON{reported} vs {markdown_tokens} "
+              f"for the same rows as a markdown table "
+              f"({abs(saved)} {'fewer' if saved >= 0 else 'more'}, {abs(percent):.0f}%)")
+        return {"json_tokens": json_tokens, "markdown_tokens": markdown_tokens}
+    
+    def _output_csv_name(self, inputs, output_csv=None):
+        """
+        Get the CSV filename for a video.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            output_csv (str, optional): Custom filename for the CSV output
+            
+        Returns:
+            str: The CSV filename
+        """
+        if output_csv:
+            return output_csv
+        # Create a sanitized filename from the video title
+        sanitized_title = self.yt_extractor.sanitize_filename(inputs["video_title"])
+        return f"{sanitized_title}_anime_references.csv"
+    
+    def _input_fingerprint(self, inputs):
+        """
+        Describe the inputs an extraction depends on.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            
+        Returns:
+            dict: The video ID, transcript and description hashes, model and prompt version. The model is
+                the one that answered (possibly the fallback model) once the video was extracted
+        """
+        prompt_version = PROMPT_VERSION
+        if self.segment_seconds:
+            prompt_version = f"{PROMPT_VERSION}-segmented-{int(self.segment_seconds)}"
+        if self.output_format == "json":
+            prompt_version += "-json"
+        return {
+            "video_id": inputs["video_id"],
+            "transcript_hash": content_hash(inputs["transcript"]),
+            "description_hash": content_hash(inputs.get("description")),
+            "model": inputs.get("model", self.model),
+            "prompt_version": prompt_version,
+        }
+    
+    def _up_to_date_output(self, inputs, output_csv=None):
+        """
+        In incremental mode, find an existing output CSV produced from the same inputs.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs
+            output_csv (str, optional): Custom filename for the CSV output
+            
+        Returns:
+            str: Path to the up-to-date CSV file, or None if the video needs to be processed
+        """
+        if not self.incremental:
+            return None
+        output_csv = self._output_csv_name(inputs, output_csv)
+        csv_path = os.path.join(self.output_dir, output_csv)
+        # An output answered by the fallback model is as current as one from the extraction model
+        fingerprint = self._input_fingerprint(inputs)
+        if os.path.exists(csv_path) and self.manifest.is_up_to_date(output_csv, fingerprint, self._gemini_models()):
+            print(f"Skipping video {inputs['video_id']}: {csv_path} is up to date")
+            return csv_path
+        return None
+    
+    def process_videos(self, video_ids, max_workers=4, max_gemini_calls=2):
+        """
+        Process several videos concurrently.
+        
+        Transcript and metadata fetches run on a thread pool of max_workers threads,
+        while the number of Gemini requests in flight at once is capped separately
+        by max_gemini_calls so batch runs stay within the API quota. The cap counts
+        individual requests, so it also holds for the segments of segmented mode.
+        
+        Args:
+            video_ids (list): YouTube video IDs to process
+            max_workers (int): Number of worker threads
+            max_gemini_calls (int): Maximum number of concurrent Gemini requests
+            
+        Returns:
+            list: One result dict per video with video_id, title, csv_path, status, error and seconds
+        """
+        gemini_slots = threading.BoundedSemaphore(max(1, max_gemini_calls))
+        
+        def run(video_id):
+            with self.instrumentation.video(video_id), self.instrumentation.span("video") as span:
+                result = process(video_id)
+                self._finish_video_span(span, result)
+            return result
+        
+        def process(video_id):
+            started = time.perf_counter()
+            result = {"video_id": video_id, "title": None, "csv_path": None, "status": "failed", "error": None}
+            try:
+                inputs = self._fetch_video_inputs(video_id)
+                if not inputs:
+                    result["error"] = "could not fetch transcript"
+                    return result
+                result["title"] = inputs["video_title"]
+                
+                existing_csv = self._up_to_date_output(inputs)
+                if existing_csv:
+                    result["csv_path"] = existing_csv
+                    result["status"] = "skipped"
+                    return result
+                
+                csv_path = self._extract_and_save(inputs, echo=False, gemini_slots=gemini_slots)
+                if csv_path:
+                    result["csv_path"] = csv_path
+                    result["status"] = "ok"
+                else:
+                    result["error"] = "extraction failed"
+            except Exception as e:
+                result["error"] = str(e)
+            finally:
+                result["seconds"] = time.perf_counter() - started
+            return result
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = list(executor.map(run, video_ids))
+        
+        return results
+    
+    def _finish_video_span(self, span, result):
+        """
+        Copy the outcome of a batch video into its span.
+        
+        Args:
+            span (Span): The video span
+            result (dict): The result dict of the video
+        """
+        span.set(status=result["status"])
+        if result["status"] == "failed":
+            span.fail(result["error"])
+    
+    def print_batch_summary(self, results):
+        """
+        Print a per-video summary of a batch run.
+        
+        Args:
+            results (list): The results returned by process_videos
+        """
+        print("\nBatch summary:")
+        for result in results:
+            title = result["title"] or "-"
+            if result["status"] in ("ok", "skipped"):
+                detail = result["csv_path"]
+            else:
+                detail = f"error: {result['error']}"
+            print(f"  [{result['status']:>6}] {result['video_id']} ({result['seconds']:.1f}s) {title} -> {detail}")
+        succeeded = sum(1 for result in results if result["status"] == "ok")
+        skipped = sum(1 for result in results if result["status"] == "skipped")
+        print(f"{succeeded}/{len(results)} videos processed successfully, {skipped} up to date and skipped")
+    
+    def print_cache_stats(self):
+        """
+        Print the hit/miss counters and size of the Gemini response cache.
+        """
+        stats = self.response_cache.stats()
+        print(f"Gemini response cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['entries']} entries ({stats['bytes'] / 1024:.0f} KiB)")
+    
+    def print_request_stats(self):
+        """
+        Print the request scheduler's counters for YouTube and each Gemini model.
+        """
+        for name, stats in self.scheduler.stats().items():
+            if not stats["calls"]:
+                continue
+            print(f"{name}: {stats['calls']} calls, {stats['retries']} retries, {stats['rate_limited']} rate limited, "
+                  f"{stats['failures']} failed, {stats['rate_per_minute']}/min, circuit {stats['circuit']}")
+    
+    def print_stage_stats(self):
+        """
+        Print the time spent in each pipeline stage and the Gemini token totals.
+        """
+        self.instrumentation.print_summary()
+    
+    def close_instrumentation(self):
+        """
+        Emit the request scheduler's counters and close the instrumentation sinks.
+        """
+        self.instrumentation.record_requests(self.scheduler.stats())
+        self.instrumentation.close()
+    
+    async def process_video_async(self, video_id, output_csv=None, gemini_slots=None):
+        """
+        Async version of process_video using the async Gemini client.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            output_csv (str, optional): Custom filename for the CSV output
+            gemini_slots (asyncio.Semaphore, optional): Limits the number of concurrent Gemini requests
+            
+        Returns:
+            str: Path to the saved CSV file or None if an error occurred
+        """
+        print(f"Processing video ID: {video_id}")
+        
+        with self.instrumentation.video(video_id), self.instrumentation.span("video") as span:
+            inputs = await self._fetch_video_inputs_async(video_id)
+            if not inputs:
+                span.fail("could not fetch transcript")
+                return None
+            
+            csv_path = await self._extract_and_save_async(inputs, output_csv, gemini_slots)
+            if not csv_path:
+                span.fail("extraction failed")
+            return csv_path
+    
+    async def _extract_and_save_async(self, inputs, output_csv=None, gemini_slots=None):
+        """
+        Async version of _extract_and_save.
+        
+        Args:
+            inputs (dict): The video inputs returned by _fetch_video_inputs_async
+            output_csv (str, optional): Custom filename for the CSV output
+            gemini_slots (asyncio.Semaphore, optional): Limits the number of concurrent Gemini requests
+            
+        Returns:
+            str: Path to the saved CSV file or None if an error occurred
+        """
+        existing_csv = self._up_to_date_output(inputs, output_csv)
+        if existing_csv:
+            return existing_csv
+        
+        if self.segment_seconds:
+            segments = self._build_segments(inputs["video_id"], inputs["chapters"])
+            if not segments:
+                print(f"Error: Could not split the transcript of video {inputs['video_id']} into segments")
+                return None
+            prompts = [self._segment_prompt(segment) for segment in segments]
+        else:
+            prompts = [self._create_gemini_prompt(inputs["transcript"], inputs["timestamps"])]
+        
+        async def send(prompt, on_chunk=None, usage=None):
+            if gemini_slots is None:
+                return await self._send_to_gemini_async(prompt, on_chunk=on_chunk, usage=usage)
+            async with gemini_slots:
+                return await self._send_to_gemini_async(prompt, on_chunk=on_chunk, usage=usage)
+        
+        if self.output_format == "json":
+            usages = [{} for _ in prompts]
+            responses = await asyncio.gather(*(send(prompt, usage=usage) for prompt, usage in zip(prompts, usages)))
+            usage = {}
+            if all("output_tokens" in prompt_usage for prompt_usage in usages):
+                usage["output_tokens"] = sum(prompt_usage["output_tokens"] for prompt_usage in usages)
+            inputs["model"] = self._answering_model(usages)
+            return self._save_json_responses(inputs, responses, output_csv, usage)
+        
+        if self.segment_seconds:
+            usages = [{} for _ in prompts]
+            responses = await asyncio.gather(*(send(prompt, usage=usage) for prompt, usage in zip(prompts, usages)))
+            inputs["model"] = self._answering_model(usages)
+            return self._save_response(inputs, self._merge_markdown_tables(responses), output_csv)
+        
+        output_csv = self._output_csv_name(inputs, output_csv)
+        writer = StreamingCSVWriter(os.path.join(self.output_dir, output_csv))
+        usage = {}
+        markdown_response = await send(prompts[0], on_chunk=writer.feed, usage=usage)
+        inputs["model"] = usage.get("model", self.model)
+        return self._finish_streamed_csv(inputs, writer, markdown_response, output_csv)
+    
+    async def _fetch_video_inputs_async(self, video_id):
+        """
+        Async version of _fetch_video_inputs. The transcript and metadata are fetched concurrently.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            
+        Returns:
+            dict: The video_id, video_title, transcript, description, chapters and formatted timestamps, or None if an error occurred
+        """
+        transcript, metadata = await asyncio.gather(
+            self._get_prompt_transcript_async(video_id),
+            self._get_metadata_async(video_id),
+        )
+        if not transcript:
+            print(f"Error: Could not retrieve transcript for video {video_id}")
+            return None
+        return self._video_inputs(video_id, transcript, metadata)
+    
+    async def process_videos_async(self, video_ids, max_in_flight=100, max_gemini_calls=8):
+        """
+        Process many videos on one event loop.
+        
+        At most max_in_flight videos are in progress at once; the rest wait in a bounded
+        queue. Gemini requests are capped separately by max_gemini_calls, and blocking
+        YouTube calls are capped by the YouTubeDataExtractor I/O pool.
+        
+        Args:
+            video_ids (list): YouTube video IDs to process
+            max_in_flight (int): Maximum number of videos processed concurrently
+            max_gemini_calls (int): Maximum number of concurrent Gemini requests
+            
+        Returns:
+            list: One result dict per video with video_id, csv_path, status, error and seconds, in input order
+        """
+        gemini_slots = asyncio.Semaphore(max(1, max_gemini_calls))
+        workers = max(1, min(max_in_flight, len(video_ids)))
+        queue = asyncio.Queue(maxsize=workers * 2)
+        results = [None] * len(video_ids)
+        
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    queue.task_done()
+                    return
+                index, video_id = item
+                try:
+                    with self.instrumentation.video(video_id), self.instrumentation.span("video") as span:
+                        results[index] = await process(video_id)
+                        self._finish_video_span(span, results[index])
+                finally:
+                    queue.task_done()
+        
+        async def process(video_id):
+            started = time.perf_counter()
+            result = {"video_id": video_id, "title": None, "csv_path": None, "status": "failed", "error": None}
+            try:
+                inputs = await self._fetch_video_inputs_async(video_id)
+                if not inputs:
+                    result["error"] = "could not fetch transcript"
+                    return result
+                result["title"] = inputs["video_title"]
+                
+                existing_csv = self._up_to_date_output(inputs)
+                if existing_csv:
+                    result["csv_path"] = existing_csv
+                    result["status"] = "skipped"
+                    return result
+                
+                csv_path = await self._extract_and_save_async(inputs, gemini_slots=gemini_slots)
+                if csv_path:
+                    result["csv_path"] = csv_path
+                    result["status"] = "ok"
+                else:
+                    result["error"] = "extraction failed"
+            except Exception as e:
+                result["error"] = str(e)
+            finally:
+                result["seconds"] = time.perf_counter() - started
+            return result
+        
+        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+        for item in enumerate(video_ids):
+            await queue.put(item)
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+        
+        return results
+    
     def _create_gemini_prompt(self, transcript, timestamps):
         """
         Create the prompt to send to Gemini API.
@@ -159,6 +1184,9 @@ class AnimeExtractor:
         Returns:
             str: The formatted prompt
         """
+        if self.output_format == "json":
+            return self._create_gemini_json_prompt(transcript, timestamps)
+        
         prompt = f"""This is a subtitles file from youtube of gigguk, make me a table with the columns: 
         Anime Title, Timestamp, Gigguk Excited?, Notes
 
@@ -172,48 +1200,425 @@ class AnimeExtractor:
         
         return prompt
     
-    def _send_to_gemini(self, prompt_text):
+    def _create_gemini_json_prompt(self, transcript, timestamps):
+        """
+        Create the prompt for JSON output mode. The record fields are enforced by the response schema.
+        
+        Args:
+            transcript (str): The video transcript
+            timestamps (str): Formatted timestamps from the video
+            
+        Returns:
+            str: The formatted prompt
+        """
+        prompt = f"""This is a subtitles file from youtube of gigguk, list every anime he talks about as one record with:
+        title (Anime Title), timestamp (Timestamp), excited (Gigguk Excited?), notes (Notes)
+
+        transcript:
+        {transcript}
+
+        here are some timestamps for your reference: 
+        {timestamps}"""
+        
+        return prompt
+    
+    def _send_to_gemini(self, prompt_text, echo=True, on_chunk=None, usage=None, gemini_slots=None):
         """
         Send the prompt to Gemini API and get the response.
         
+        Requests go through the request scheduler, which rate-limits them and retries rate
+        limits and transient errors. If the model still fails, the fallback model is tried.
+        
         Args:
             prompt_text (str): The prompt to send to Gemini
+            echo (bool): Whether to print the response chunks as they stream in
+            on_chunk (callable, optional): Called with each chunk of text as it arrives
+            usage (dict, optional): Receives the 'model' that answered and the 'output_tokens'
+                Gemini reports for a fresh response
+            gemini_slots (threading.Semaphore, optional): Held while the request is in flight (cached
+                responses don't take a slot), to cap the number of concurrent Gemini requests
             
         Returns:
-            str: The markdown response from Gemini or None if an error occurred
+            str: The markdown (or JSON) response from Gemini or None if an error occurred
         """
+        usage = {} if usage is None else usage
+        if gemini_slots is None:
+            gemini_slots = contextlib.nullcontext()
+        for model in self._gemini_models():
+            with self.instrumentation.span("gemini", model=model) as span:
+                usage.pop("attempts", None)
+                usage.pop("stream_seconds", None)
+                try:
+                    cache_key = self._response_cache_key(model, prompt_text, self._generation_config())
+                    cached_response = self._get_cached_response(cache_key)
+                    if cached_response is not None:
+                        if echo:
+                            print(cached_response)
+                        if on_chunk:
+                            on_chunk(cached_response)
+                        self._record_model(model, usage)
+                        span.set(**self._gemini_metrics(prompt_text, cached_response, None, cache_hit=True))
+                        return cached_response
+                    
+                    model, contents, generate_content_config = self._gemini_request(prompt_text, model)
+                    with gemini_slots:
+                        full_response = self.scheduler.call(f"gemini:{model}", self._stream_gemini, model, contents,
+                                                            generate_content_config, echo, on_chunk, usage)
+                    self.response_cache.set(cache_key, full_response)
+                    self._record_model(model, usage)
+                    span.set(**self._gemini_metrics(prompt_text, full_response, usage, elapsed=span.elapsed))
+                    return full_response
+                    
+                except PartialResponseError as e:
+                    # Part of the response was already handed to on_chunk, so it can't be retried
+                    print(f"Error calling Gemini API: {str(e)}")
+                    span.fail(e)
+                    span.set(**self._gemini_metrics(prompt_text, None, usage, elapsed=span.elapsed))
+                    return None
+                except Exception as e:
+                    print(f"Error calling Gemini API ({model}): {str(e)}")
+                    span.fail(e)
+                    span.set(**self._gemini_metrics(prompt_text, None, usage, elapsed=span.elapsed))
+        return None
+    
+    def _stream_gemini(self, model, contents, generate_content_config, echo=True, on_chunk=None, usage=None):
+        """
+        Make one streamed Gemini request.
+        
+        Args:
+            model (str): The Gemini model name
+            contents (list): The request contents
+            generate_content_config: The GenerateContentConfig of the request
+            echo (bool): Whether to print the response chunks as they stream in
+            on_chunk (callable, optional): Called with each chunk of text as it arrives
+            usage (dict, optional): Receives the 'output_tokens' and 'input_tokens' Gemini reports, the number
+                of 'attempts' and the 'first_token_seconds' and 'generation_seconds' of the last attempt
+            
+        Returns:
+            str: The full response
+            
+        Raises:
+            PartialResponseError: If the stream failed after the first chunk
+        """
+        # Collect the full response
+        chunks = []
+        started = self._start_attempt(usage)
         try:
-            # model = "gemini-2.5-pro-preview-03-25"
-            model = "gemini-2.5-pro-exp-03-25"
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=prompt_text),
-                    ],
-                ),
-            ]
-            generate_content_config = types.GenerateContentConfig(
-                response_mime_type="text/plain",
-            )
-
-            # Collect the full response
-            full_response = ""
             for chunk in self.gemini_client.models.generate_content_stream(
                 model=model,
                 contents=contents,
                 config=generate_content_config,
             ):
+                self._record_usage(chunk, usage)
                 chunk_text = chunk.text
-                full_response += chunk_text
+                if not chunk_text:
+                    continue
+                if not chunks:
+                    self._record_first_token(started, usage)
+                chunks.append(chunk_text)
+                if on_chunk:
+                    on_chunk(chunk_text)
                 # Print progress
-                print(chunk_text, end="")
-                
-            return full_response
-            
+                if echo:
+                    print(chunk_text, end="")
         except Exception as e:
-            print(f"Error calling Gemini API: {str(e)}")
+            if chunks:
+                raise PartialResponseError(f"response stream from {model} failed after "
+                                           f"{len(chunks)} chunks: {str(e)}") from e
+            raise
+        finally:
+            self._end_attempt(started, usage)
+        self._record_generation(started, usage)
+        return "".join(chunks)
+    
+    def _gemini_models(self):
+        """
+        Get the models to try, in order.
+        
+        Returns:
+            list: The extraction model, followed by the fallback model if there is one
+        """
+        if self.fallback_model and self.fallback_model != self.model:
+            return [self.model, self.fallback_model]
+        return [self.model]
+    
+    def _record_model(self, model, usage):
+        if usage is None:
+            return
+        if model != self.model:
+            print(f"Used fallback model {model}")
+        usage["model"] = model
+    
+    def _generation_config(self):
+        """
+        Get the generation config of the extraction requests as plain data.
+        
+        The dict has the same shape as GenerateContentConfig.model_dump(mode="json", exclude_none=True),
+        so response cache keys can be built without importing google-genai.
+        
+        Returns:
+            dict: The keyword arguments of GenerateContentConfig
+        """
+        if self.output_format == "json":
+            return {
+                "response_mime_type": "application/json",
+                "response_schema": {
+                    "type": "ARRAY",
+                    "items": {
+                        "type": "OBJECT",
+                        "properties": {field: {"type": "STRING"} for field in RECORD_FIELDS},
+                        "required": list(RECORD_FIELDS),
+                        "property_ordering": list(RECORD_FIELDS),
+                    },
+                },
+            }
+        return {"response_mime_type": "text/plain"}
+    
+    def _gemini_request(self, prompt_text, model=None):
+        """
+        Build the model name, contents and config for a Gemini request.
+        
+        Args:
+            prompt_text (str): The prompt to send to Gemini
+            model (str, optional): The Gemini model. Defaults to the extraction model
+            
+        Returns:
+            tuple: (model, contents, generate_content_config)
+        """
+        from google.genai import types
+        
+        model = model or self.model
+        contents = [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=prompt_text),
+                ],
+            ),
+        ]
+        generate_content_config = types.GenerateContentConfig(**self._generation_config())
+        return model, contents, generate_content_config
+    
+    def _record_usage(self, chunk, usage):
+        """
+        Copy the output token count of a streamed chunk into a usage dict.
+        
+        Args:
+            chunk: A GenerateContentResponse chunk
+            usage (dict): The dict to update, or None
+        """
+        usage_metadata = getattr(chunk, "usage_metadata", None)
+        if usage is None or usage_metadata is None:
+            return
+        if usage_metadata.candidates_token_count:
+            usage["output_tokens"] = usage_metadata.candidates_token_count
+        if getattr(usage_metadata, "prompt_token_count", None):
+            usage["input_tokens"] = usage_metadata.prompt_token_count
+    
+    def _start_attempt(self, usage):
+        """
+        Count a streamed request attempt and reset the timings of the previous one.
+        
+        Args:
+            usage (dict): The usage dict of the request, or None
+            
+        Returns:
+            float: The perf_counter value at the start of the attempt
+        """
+        if usage is not None:
+            usage["attempts"] = usage.get("attempts", 0) + 1
+            usage.pop("first_token_seconds", None)
+            usage.pop("generation_seconds", None)
+        return time.perf_counter()
+    
+    def _end_attempt(self, started, usage):
+        if usage is not None:
+            usage["stream_seconds"] = usage.get("stream_seconds", 0.0) + time.perf_counter() - started
+    
+    def _record_first_token(self, started, usage):
+        if usage is not None:
+            usage["first_token_seconds"] = time.perf_counter() - started
+    
+    def _record_generation(self, started, usage):
+        if usage is not None and "first_token_seconds" in usage:
+            usage["generation_seconds"] = time.perf_counter() - started - usage["first_token_seconds"]
+    
+    def _gemini_metrics(self, prompt_text, response, usage, cache_hit=False, elapsed=None):
+        """
+        Build the span attributes of a Gemini request.
+        
+        Token counts come from the usage metadata Gemini reports and are estimated from the
+        text (about 4 characters per token) for cached responses or when Gemini doesn't report them.
+        
+        Args:
+            prompt_text (str): The prompt
+            response (str): The response, or None if the request failed
+            usage (dict): The usage dict of the request, or None for a cached response
+            cache_hit (bool): Whether the response came from the response cache
+            elapsed (float, optional): Seconds since the request started, including rate limit waits
+                and retry backoff
+            
+        Returns:
+            dict: cache_hit, input_tokens, output_tokens, tokens_estimated, retries and, for
+                streamed responses, wait_seconds, first_token_seconds, generation_seconds and tokens_per_second.
+                A cache hit sends and generates nothing, so it reports the estimated tokens it saved as
+                cached_input_tokens and cached_output_tokens instead of input_tokens and output_tokens
+        """
+        if cache_hit:
+            return {
+                "cache_hit": True,
+                "cached_input_tokens": estimate_tokens(prompt_text),
+                "cached_output_tokens": estimate_tokens(response),
+                "tokens_estimated": True,
+                "retries": 0,
+            }
+        
+        usage = usage or {}
+        input_tokens = usage.get("input_tokens")
+        output_tokens = usage.get("output_tokens")
+        metrics = {
+            "cache_hit": False,
+            "input_tokens": input_tokens or estimate_tokens(prompt_text),
+            "output_tokens": output_tokens or estimate_tokens(response),
+            "tokens_estimated": not (input_tokens and output_tokens),
+            "retries": max(0, usage.get("attempts", 1) - 1),
+        }
+        if elapsed is not None and "stream_seconds" in usage:
+            # Time not spent streaming went to the rate limiter and retry backoff
+            metrics["wait_seconds"] = round(max(0.0, elapsed - usage["stream_seconds"]), 6)
+        if "first_token_seconds" in usage:
+            metrics["first_token_seconds"] = round(usage["first_token_seconds"], 6)
+        if usage.get("generation_seconds"):
+            metrics["generation_seconds"] = round(usage["generation_seconds"], 6)
+            metrics["tokens_per_second"] = round(metrics["output_tokens"] / usage["generation_seconds"], 1)
+        return metrics
+    
+    def _response_cache_key(self, model, prompt_text, generate_content_config):
+        """
+        Build the response cache key for a Gemini request.
+        
+        Args:
+            model (str): The Gemini model name
+            prompt_text (str): The prompt sent to Gemini
+            generate_content_config: The GenerateContentConfig of the request, or the dict from
+                _generation_config
+            
+        Returns:
+            str: A SHA-256 hex digest of the model, prompt and generation config
+        """
+        if isinstance(generate_content_config, dict):
+            config = generate_content_config
+        elif hasattr(generate_content_config, "model_dump"):
+            config = generate_content_config.model_dump(mode="json", exclude_none=True)
+        else:
+            config = vars(generate_content_config)
+        payload = json.dumps([model, prompt_text, config], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _get_cached_response(self, cache_key):
+        """
+        Look up a Gemini response in the response cache, unless the cache is bypassed.
+        
+        Args:
+            cache_key (str): The key from _response_cache_key
+            
+        Returns:
+            str: The cached response or None on a miss
+        """
+        if not self.use_response_cache:
             return None
+        cached_response = self.response_cache.get(cache_key)
+        if cached_response is not None:
+            print("Using cached Gemini response")
+        return cached_response
+    
+    async def _send_to_gemini_async(self, prompt_text, on_chunk=None, usage=None):
+        """
+        Async version of _send_to_gemini using the async Gemini client.
+        
+        Args:
+            prompt_text (str): The prompt to send to Gemini
+            on_chunk (callable, optional): Called with each chunk of text as it arrives
+            usage (dict, optional): Receives the 'model' that answered and the 'output_tokens'
+                Gemini reports for a fresh response
+            
+        Returns:
+            str: The markdown (or JSON) response from Gemini or None if an error occurred
+        """
+        usage = {} if usage is None else usage
+        for model in self._gemini_models():
+            with self.instrumentation.span("gemini", model=model) as span:
+                usage.pop("attempts", None)
+                usage.pop("stream_seconds", None)
+                try:
+                    cache_key = self._response_cache_key(model, prompt_text, self._generation_config())
+                    cached_response = self._get_cached_response(cache_key)
+                    if cached_response is not None:
+                        if on_chunk:
+                            on_chunk(cached_response)
+                        self._record_model(model, usage)
+                        span.set(**self._gemini_metrics(prompt_text, cached_response, None, cache_hit=True))
+                        return cached_response
+                    
+                    model, contents, generate_content_config = self._gemini_request(prompt_text, model)
+                    full_response = await self.scheduler.call_async(f"gemini:{model}", self._stream_gemini_async,
+                                                                    model, contents, generate_content_config,
+                                                                    on_chunk, usage)
+                    self.response_cache.set(cache_key, full_response)
+                    self._record_model(model, usage)
+                    span.set(**self._gemini_metrics(prompt_text, full_response, usage, elapsed=span.elapsed))
+                    return full_response
+                    
+                except PartialResponseError as e:
+                    print(f"Error calling Gemini API: {str(e)}")
+                    span.fail(e)
+                    span.set(**self._gemini_metrics(prompt_text, None, usage, elapsed=span.elapsed))
+                    return None
+                except Exception as e:
+                    print(f"Error calling Gemini API ({model}): {str(e)}")
+                    span.fail(e)
+                    span.set(**self._gemini_metrics(prompt_text, None, usage, elapsed=span.elapsed))
+        return None
+    
+    async def _stream_gemini_async(self, model, contents, generate_content_config, on_chunk=None, usage=None):
+        """
+        Async version of _stream_gemini.
+        
+        Args:
+            model (str): The Gemini model name
+            contents (list): The request contents
+            generate_content_config: The GenerateContentConfig of the request
+            on_chunk (callable, optional): Called with each chunk of text as it arrives
+            usage (dict, optional): Receives the 'output_tokens' and 'input_tokens' Gemini reports, the number
+                of 'attempts' and the 'first_token_seconds' and 'generation_seconds' of the last attempt
+            
+        Returns:
+            str: The full response
+        """
+        chunks = []
+        started = self._start_attempt(usage)
+        try:
+            async for chunk in await self.gemini_client.aio.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=generate_content_config,
+            ):
+                self._record_usage(chunk, usage)
+                if chunk.text:
+                    if not chunks:
+                        self._record_first_token(started, usage)
+                    chunks.append(chunk.text)
+                    if on_chunk:
+                        on_chunk(chunk.text)
+        except Exception as e:
+            if chunks:
+                raise PartialResponseError(f"response stream from {model} failed after "
+                                           f"{len(chunks)} chunks: {str(e)}") from e
+            raise
+        finally:
+            self._end_attempt(started, usage)
+        self._record_generation(started, usage)
+        return "".join(chunks)
     
     def _save_markdown_as_csv(self, markdown_table, output_path):
         """
@@ -227,42 +1632,13 @@ class AnimeExtractor:
             bool: True if successful, False otherwise
         """
         try:
-            # Parse the markdown table
-            lines = markdown_table.strip().split('\n')
-            
-            # Remove any lines before the header (first row with |)
-            while lines and '|' not in lines[0]:
-                lines.pop(0)
-                
-            if not lines:
+            header, csv_rows = self._parse_markdown_table(markdown_table)
+            if header is None:
                 print("Error: No markdown table found in the response")
                 return False
-                
-            # Skip the separator line (second row with dashes)
-            csv_rows = []
-            header = None
-            
-            for i, line in enumerate(lines):
-                if '|' not in line:
-                    continue
-                    
-                # Split the line by | and remove leading/trailing whitespace from each cell
-                cells = [cell.strip() for cell in line.split('|')]
-                # Remove empty cells at the start and end (from the outer | characters)
-                cells = [cell for cell in cells if cell]
-                
-                if i == 0:
-                    # This is the header row
-                    header = cells
-                elif i == 1 and all('-' in cell for cell in cells):
-                    # This is the separator row, skip it
-                    continue
-                else:
-                    # These are data rows
-                    csv_rows.append(cells)
             
             # Write to CSV
-            with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
+            with atomic_write(output_path, newline='', encoding='utf-8') as csvfile:
                 writer = csv.writer(csvfile)
                 if header:
                     writer.writerow(header)
@@ -273,22 +1649,130 @@ class AnimeExtractor:
         except Exception as e:
             print(f"Error converting markdown to CSV: {str(e)}")
             return False
+    
+    def _parse_markdown_table(self, markdown_table):
+        """
+        Parse a markdown table into a header and data rows.
+        
+        Args:
+            markdown_table (str): The markdown table from Gemini
+            
+        Returns:
+            tuple: (header, rows). header is None if no table was found
+        """
+        return parse_markdown_table(markdown_table)
+
+
+def read_video_ids(path):
+    """
+    Read video IDs from a file with one video ID or YouTube URL per line.
+    
+    Args:
+        path (str): Path to the file
+        
+    Returns:
+        list: The video IDs in file order, without duplicates
+    """
+    video_ids = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            video_id = YouTubeDataExtractor.resolve_video_id(line)
+            if video_id and video_id not in video_ids:
+                video_ids.append(video_id)
+    return video_ids
 
 
 def main():
     """
     Example usage of the AnimeExtractor class.
-    Command-line usage: python anime_extractor.py <video_id>
+    Command-line usage: python anime_extractor.py <video_id> [<video_id> ...] [--file ids.txt] [--sync [URL]]
     """
     import argparse
     
     # Set up command-line argument parsing
     parser = argparse.ArgumentParser(description='Extract anime references from Gigguk YouTube videos')
-    parser.add_argument('video_id', 
-                        help='YouTube video ID to process')
+    parser.add_argument('video_ids', nargs='*',
+                        help='YouTube video ID(s) to process')
+    parser.add_argument('-f', '--file',
+                        help='File with one YouTube video ID or URL per line (lines starting with # are ignored)')
+    parser.add_argument('--sync', metavar='URL', nargs='?', const=DEFAULT_SYNC_URL,
+                        help='Process the videos of a channel or playlist whose title matches --title-pattern and that '
+                             f'are not in the manifest or CSV config yet (default URL: {DEFAULT_SYNC_URL})')
+    parser.add_argument('--title-pattern', default=DEFAULT_TITLE_PATTERN,
+                        help=f'Case-insensitive regular expression for --sync titles (default: {DEFAULT_TITLE_PATTERN})')
+    parser.add_argument('--sync-limit', type=int, default=DEFAULT_SYNC_LIMIT,
+                        help=f'Number of latest listing entries --sync reads, or 0 for all (default: {DEFAULT_SYNC_LIMIT})')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='With --sync, only list the new videos')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of videos fetched in parallel in batch mode (default: 4)')
+    parser.add_argument('--gemini-concurrency', type=int, default=2,
+                        help='Maximum number of concurrent Gemini requests in batch mode (default: 2)')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run the batch on a single asyncio event loop instead of a thread pool')
+    parser.add_argument('--segmented', type=float, metavar='MINUTES', nargs='?', const=5.0,
+                        help='Split long transcripts into windows of about MINUTES minutes (default: 5) '
+                             'and send them to Gemini in parallel')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only process videos whose transcript, description, model or prompt version changed')
+    parser.add_argument('--build-index', action='store_true',
+                        help='Rebuild the web viewer index (anime_index.json) and the anime catalog from the CSV files and exit')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Bypass the Gemini response cache and send every prompt to Gemini')
+    parser.add_argument('--fallback-model', default=DEFAULT_FALLBACK_MODEL,
+                        help=f'Model used when the extraction model keeps failing, or "" to disable '
+                             f'(default: {DEFAULT_FALLBACK_MODEL})')
+    parser.add_argument('--gemini-rpm', type=float, default=10,
+                        help='Maximum Gemini requests per minute; lowered automatically on rate limit errors (default: 10)')
+    parser.add_argument('--no-compact', action='store_true',
+                        help='Send the raw caption text to Gemini instead of the compacted transcript')
+    parser.add_argument('--output-format', choices=['markdown', 'json'], default='markdown',
+                        help='Ask Gemini for a markdown table or for schema-constrained JSON records (default: markdown)')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help="Don't echo the Gemini response while it streams in")
+    parser.add_argument('--metrics-jsonl', metavar='PATH',
+                        help='Append a JSON line per pipeline stage (timings, tokens, cache hits) to PATH, or - for stdout')
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help='Write stage timing and token totals to PATH in the Prometheus textfile format')
+    parser.add_argument('--store', metavar='PATH', nargs='?', const='references.db',
+                        help='Also store every extracted reference in a SQLite database (default: references.db)')
     args = parser.parse_args()
     
+    if args.build_index:
+        # Only rebuild the viewer index and the anime catalog from the existing CSV files
+        index_path = build_viewer_index()
+        if index_path:
+            print(f"Built viewer index {index_path}")
+        catalog = AnimeCatalog()
+        print(f"Built anime catalog {catalog.catalog_file} with {catalog.build()} anime")
+        return
+    
+    video_ids = list(args.video_ids)
+    if args.file:
+        video_ids.extend(read_video_ids(args.file))
+    if args.sync:
+        # Only the listing is requested; videos that were already extracted are never visited
+        sync = ChannelSync(YouTubeDataExtractor(), title_pattern=args.title_pattern)
+        new_entries = sync.new_videos(args.sync, max_entries=args.sync_limit or None)
+        if new_entries is None:
+            print(f"ERROR: Could not list the videos of {args.sync}")
+            return
+        print(f"Found {len(new_entries)} new video(s) matching '{args.title_pattern}' in {args.sync}")
+        for entry in new_entries:
+            print(f"  {entry['id']}  {entry['title']}")
+        if args.dry_run:
+            return
+        video_ids.extend(entry['id'] for entry in new_entries if entry['id'] not in video_ids)
+        if not video_ids:
+            return
+    if not video_ids:
+        parser.error('provide at least one video ID, --file or --sync')
+    
     # Load environment variables from .env file
+    from dotenv import load_dotenv
     print("Attempting to load .env file...")
     load_dotenv()
     
@@ -304,11 +1788,39 @@ def main():
         print("You can set it with: set GEMINI_API_KEY=your_api_key")
         return
         
+    # Stage timings and token counts go to the requested sinks
+    sinks = []
+    if args.metrics_jsonl:
+        sinks.append(JSONLinesSink(args.metrics_jsonl))
+    if args.metrics_prom:
+        sinks.append(PrometheusTextfileSink(args.metrics_prom))
+    
     # Create extractor
-    extractor = AnimeExtractor()
+    extractor = AnimeExtractor(use_response_cache=not args.no_cache, incremental=args.incremental,
+                               segment_seconds=args.segmented * 60 if args.segmented else None,
+                               output_format=args.output_format, fallback_model=args.fallback_model or None,
+                               gemini_rate_per_minute=args.gemini_rpm, compact_transcripts=not args.no_compact,
+                               instrumentation=Instrumentation(sinks), quiet=args.quiet,
+                               reference_store=ReferenceStore(args.store) if args.store else None)
+    
+    if len(video_ids) > 1:
+        # Batch mode
+        print(f"Processing {len(video_ids)} videos with {args.workers} workers")
+        if args.use_async:
+            results = asyncio.run(extractor.process_videos_async(video_ids, max_in_flight=args.workers,
+                                                                 max_gemini_calls=args.gemini_concurrency))
+        else:
+            results = extractor.process_videos(video_ids, max_workers=args.workers,
+                                               max_gemini_calls=args.gemini_concurrency)
+        extractor.print_batch_summary(results)
+        extractor.print_cache_stats()
+        extractor.print_request_stats()
+        extractor.print_stage_stats()
+        extractor.close_instrumentation()
+        return
     
     # Get video ID from command-line arguments
-    video_id = args.video_id
+    video_id = video_ids[0]
     print(f"Processing video ID: {video_id}")
     
     # Process the specified video
@@ -317,6 +1829,10 @@ def main():
         print(f"Successfully processed video and saved to {csv_path}")
     else:
         print("Failed to process the video")
+    extractor.print_cache_stats()
+    extractor.print_request_stats()
+    extractor.print_stage_stats()
+    extractor.close_instrumentation()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def temporary_path(path):
+    """
+    Get a temporary path next to a file, unique to the current process and thread.
+
+    Args:
+        path (str): The final path
+
+    Returns:
+        str: The temporary path, on the same file system so it can be renamed over the final path
+    """
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode='w', **open_kwargs):
+    """
+    Open a temporary file that replaces path once the with block completes.
+
+    Readers see either the old file or the complete new one, never a partly written file, and two
+    processes writing the same path at once leave one of their complete files behind. If the block
+    raises, the temporary file is removed and path is left untouched.
+
+    Args:
+        path (str): The final path
+        mode (str): 'w' or 'wb'
+        **open_kwargs: Passed to open(), e.g. encoding='utf-8' and newline=''
+
+    Yields:
+        file: The temporary file
+    """
+    tmp_path = temporary_path(path)
+    try:
+        with open(tmp_path, mode, **open_kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FileLock:
+    """
+    An exclusive lock shared by every thread and process that uses the same lock file.
+
+    Used around read-modify-write cycles of shared JSON files such as the CSV config, so
+    extractor processes running side by side don't lose each other's updates. The lock is held
+    by an open file handle (flock on POSIX, msvcrt.locking on Windows), so the operating system
+    releases it when a process dies. The lock file itself is left in place.
+    """
+
+    def __init__(self, path, timeout=None, poll_seconds=0.05):
+        """
+        Initialize the lock.
+
+        Args:
+            path (str): Path of the lock file, e.g. "csv_config.json.lock"
+            timeout (float, optional): Seconds to wait for the lock before raising TimeoutError.
+                None waits forever
+            poll_seconds (float): Interval between attempts while another process holds the lock
+        """
+        self.path = path
+        self.timeout = timeout
+        self.poll_seconds = poll_seconds
+        # Threads of one process queue here first, so only one of them polls the file lock
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def _try_lock(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def acquire(self):
+        """
+        Wait for the lock. A thread that already holds it can acquire it again.
+
+        Raises:
+            TimeoutError: If the lock wasn't acquired within the timeout
+        """
+        if not self._thread_lock.acquire(timeout=-1 if self.timeout is None else self.timeout):
+            raise TimeoutError(f"Timed out waiting for {self.path}")
+        if self._depth:
+            self._depth += 1
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, 'a+')
+            deadline = None if self.timeout is None else time.monotonic() + self.timeout
+            while not self._try_lock():
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Timed out waiting for {self.path}")
+                time.sleep(self.poll_seconds)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+        self._depth = 1
+
+    def release(self):
+        """
+        Release the lock.
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                self._unlock()
+            finally:
+                self._file.close()
+                self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,154 @@
+"""
+Micro-benchmark of the chapter/timestamp parser.
+
+Compares chapters.parse_chapters with the two-regex parser extract_timestamps used before,
+on large descriptions. Real descriptions are read from a directory of .txt files (such as
+the "<video_id>_description.txt" files written by YouTubeDataExtractor.save_description);
+without one, realistic descriptions are built from the anime titles and timestamps of the
+extracted CSV files, padded with the link lists, sponsor blurbs and long paragraphs real
+descriptions have.
+
+Usage: python benchmarks/bench_chapters.py [--descriptions DIR] [--repeat 3] [--output results.json]
+"""
+import os
+import re
+import sys
+import csv
+import glob
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chapters import parse_chapters, parse_chapters_many, chapters_to_dict  # noqa: E402
+
+
+def legacy_extract_timestamps(description):
+    """
+    The parser extract_timestamps used before chapters.py, kept as the baseline.
+    """
+    timestamps_dict = {}
+    timestamp_first_pattern = r'(\d+:\d+(?::\d+)?)\s+(.*?)(?=\n\d+:\d+(?::\d+)?\s+|\n\n|\Z)'
+    title_first_pattern = r'(.*?)\s+(\d+:\d+(?::\d+)?)(?=\n|$)'
+    for timestamp, title in re.findall(timestamp_first_pattern, description, re.MULTILINE):
+        timestamps_dict[timestamp] = title.strip()
+    for title, timestamp in re.findall(title_first_pattern, description, re.MULTILINE):
+        if timestamp not in timestamps_dict:
+            timestamps_dict[timestamp] = title.strip()
+    return timestamps_dict
+
+
+def read_descriptions(directory):
+    descriptions = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.txt"))):
+        with open(path, 'r', encoding='utf-8') as f:
+            descriptions.append(f.read())
+    return descriptions
+
+
+def synthetic_descriptions(transcripts_dir, count, seed=0):
+    """
+    Build descriptions from the chapters of the extracted CSV files.
+    """
+    random.seed(seed)
+    chapter_lists = []
+    for path in sorted(glob.glob(os.path.join(transcripts_dir, "*.csv"))):
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            rows = [row for row in csv.DictReader(f) if row.get("Timestamp") and row.get("Anime Title")]
+        if rows:
+            chapter_lists.append([(row["Timestamp"].strip(), row["Anime Title"].strip()) for row in rows])
+    if not chapter_lists:
+        chapter_lists = [[(f"{minute}:{second:02d}", f"Anime {minute}") for minute, second in
+                          ((i * 2, i * 7 % 60) for i in range(60))]]
+
+    words = ("anime season nutshell watch sponsor link merch discord twitter patreon editor thumbnail "
+             "music outro intro check shows bookmark episode trailer manga studio").split()
+    descriptions = []
+    for index in range(count):
+        chapters = chapter_lists[index % len(chapter_lists)]
+        lines = [" ".join(random.choices(words, k=150)), ""]  # long opening paragraph without timestamps
+        lines.extend(f"Sponsor: https://example.com/{random.randint(0, 10 ** 6)}?ref=gigguk&t=12:30pm"
+                     for _ in range(20))
+        lines.append("")
+        for timestamp, title in chapters:
+            if random.random() < 0.5:
+                lines.append(f"{timestamp} {title}")
+            else:
+                lines.append(f"{title} - {timestamp}")
+        lines.append("")
+        lines.extend(" ".join(random.choices(words, k=80)) + " 10:00 am" for _ in range(30))
+        descriptions.append("\n".join(lines))
+    return descriptions
+
+
+def measure(func, descriptions, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for description in descriptions:
+            func(description)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the chapter/timestamp parser')
+    parser.add_argument('--descriptions', help='Directory with one description per .txt file')
+    parser.add_argument('--transcripts', default='transcripts', help='CSV directory for synthetic descriptions')
+    parser.add_argument('--count', type=int, default=50, help="Number of synthetic descriptions (default: 50)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per parser; the best is reported (default: 3)")
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    if args.descriptions:
+        descriptions = read_descriptions(args.descriptions)
+        source = args.descriptions
+    else:
+        descriptions = synthetic_descriptions(args.transcripts, args.count)
+        source = "synthetic"
+    if not descriptions:
+        parser.error("no descriptions found")
+
+    total_bytes = sum(len(description.encode('utf-8')) for description in descriptions)
+    legacy = measure(legacy_extract_timestamps, descriptions, args.repeat)
+    single_pass = measure(parse_chapters, descriptions, args.repeat)
+    as_dict = measure(lambda description: chapters_to_dict(parse_chapters(description)), descriptions, args.repeat)
+
+    started = time.perf_counter()
+    parse_chapters_many(descriptions)
+    bulk = time.perf_counter() - started
+
+    legacy_count = sum(len(legacy_extract_timestamps(description)) for description in descriptions)
+    chapter_count = sum(len(parse_chapters(description)) for description in descriptions)
+
+    results = {
+        "benchmark": "chapters",
+        "source": source,
+        "descriptions": len(descriptions),
+        "megabytes": round(total_bytes / 1e6, 3),
+        "legacy_seconds": round(legacy, 6),
+        "parse_chapters_seconds": round(single_pass, 6),
+        "extract_timestamps_dict_seconds": round(as_dict, 6),
+        "parse_chapters_many_seconds": round(bulk, 6),
+        "speedup": round(legacy / single_pass, 2) if single_pass else None,
+        "legacy_timestamps": legacy_count,
+        "chapters": chapter_count,
+    }
+
+    print(f"{len(descriptions)} descriptions ({results['megabytes']} MB, {source})")
+    print(f"  legacy two-regex parser: {legacy * 1000:9.2f} ms  ({legacy_count} timestamps)")
+    print(f"  parse_chapters:          {single_pass * 1000:9.2f} ms  ({chapter_count} chapters)")
+    print(f"  extract_timestamps dict: {as_dict * 1000:9.2f} ms")
+    print(f"  parse_chapters_many:     {bulk * 1000:9.2f} ms")
+    print(f"  speedup: {results['speedup']}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+Offline benchmark of the extraction pipeline.
+
+YouTube and Gemini are replaced by the stand-ins of fakes.py, which replay recorded videos
+(--recordings) or synthetic videos built from the extracted CSV files at a configurable
+latency, so the benchmark needs no network access or API key. It measures:
+
+- process_video end to end, with cold caches and again with warm caches
+- get_video_metadata with a new yt-dlp instance per call, as before the pool, and with the pooled instances
+- _save_markdown_as_csv throughput on tables of growing size
+- extract_timestamps on pathological descriptions
+- process_videos (threads) and process_videos_async at several worker counts
+
+Results are written as JSON (--output) and can be compared with an earlier run (--compare)
+to spot regressions between commits.
+
+Usage: python benchmarks/bench_pipeline.py [--videos 15] [--workers 1,2,4,8] [--output results.json]
+                                           [--compare baseline.json]
+"""
+import os
+import io
+import sys
+import json
+import time
+import asyncio
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+import contextlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import fakes  # noqa: E402
+from instrumentation import Instrumentation  # noqa: E402
+
+
+# Rate used for every backend unless --rate-limits is given, so the fakes' latency is what gets measured
+UNLIMITED_PER_MINUTE = 10 ** 9
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(seconds):
+    return {
+        "count": len(seconds),
+        "total_seconds": round(sum(seconds), 4),
+        "mean_seconds": round(statistics.mean(seconds), 4) if seconds else None,
+        "median_seconds": round(statistics.median(seconds), 4) if seconds else None,
+        "p95_seconds": round(percentile(seconds, 0.95), 4) if seconds else None,
+    }
+
+
+@contextlib.contextmanager
+def quiet(enabled=True):
+    """
+    Swallow the progress output of the pipeline while it is being timed.
+    """
+    if not enabled:
+        yield
+        return
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class PipelineBenchmark:
+    """
+    Runs the pipeline benchmarks against the fakes in throwaway working directories.
+    """
+
+    def __init__(self, services, options, rate_limits=False, verbose=False):
+        """
+        Initialize the benchmark.
+
+        Args:
+            services (fakes.FakeServices): The installed fakes
+            options (dict): Extra AnimeExtractor arguments, e.g. output_format or segment_seconds
+            rate_limits (bool): Keep the real request rate limits instead of lifting them
+            verbose (bool): Show the pipeline's own output
+        """
+        self.services = services
+        self.options = options
+        self.rate_limits = rate_limits
+        self.verbose = verbose
+
+    def make_extractor(self, workdir):
+        from anime_extractor import AnimeExtractor
+        from scheduler import TokenBucket
+
+        extractor = AnimeExtractor(
+            output_dir=os.path.join(workdir, "transcripts"),
+            config_file=os.path.join(workdir, "csv_config.json"),
+            cache_dir=os.path.join(workdir, ".cache"),
+            index_file=os.path.join(workdir, "anime_index.json"),
+            catalog_file=os.path.join(workdir, "anime_catalog.json"),
+            manifest_file=os.path.join(workdir, "extraction_manifest.json"),
+            api_key="offline-benchmark",
+            **self.options,
+        )
+        if not self.rate_limits:
+            for backend in extractor.scheduler.backends.values():
+                backend.bucket = TokenBucket(UNLIMITED_PER_MINUTE / 60.0, burst=UNLIMITED_PER_MINUTE)
+        return extractor
+
+    def process_video(self, video_ids):
+        """
+        Time process_video for each video, first with empty caches and then with warm ones.
+        """
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            extractor = self.make_extractor(workdir)
+            for phase in ("cold", "warm"):
+                self.services.reset_counts()
+                extractor.instrumentation = Instrumentation()
+                seconds = []
+                failed = 0
+                for video_id in video_ids:
+                    started = time.perf_counter()
+                    with quiet(not self.verbose):
+                        csv_path = extractor.process_video(video_id)
+                    seconds.append(time.perf_counter() - started)
+                    failed += csv_path is None
+                stages = {stage: round(totals["seconds"], 4)
+                          for stage, totals in extractor.instrumentation.totals.stages.items()}
+                results[phase] = dict(summarize(seconds), failed=failed, calls=dict(self.services.calls),
+                                      stage_seconds=stages)
+        return results
+
+    def metadata(self, video_ids):
+        """
+        Time get_video_metadata per video with a new, fully processing yt-dlp instance per call (as
+        before the pool) and with the pooled instances and lean options.
+        """
+        import yt_dlp
+
+        def per_call(video_url):
+            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+                return ydl.extract_info(video_url, download=False)
+
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            yt_extractor = self.make_extractor(workdir).yt_extractor
+            for name, extract in (("per_call", per_call), ("pooled", yt_extractor._extract_info)):
+                yt_extractor._extract_info = extract
+                self.services.reset_counts()
+                seconds = []
+                for video_id in video_ids:
+                    started = time.perf_counter()
+                    with quiet(not self.verbose):
+                        yt_extractor.get_video_metadata(video_id, refresh=True)
+                    seconds.append(time.perf_counter() - started)
+                results[name] = dict(summarize(seconds), calls=dict(self.services.calls))
+        return results
+
+    def save_markdown_as_csv(self, sizes, repeat):
+        """
+        Measure the rows per second _save_markdown_as_csv converts, for tables of several sizes.
+        """
+        rows = [row for video in self.services.library.videos.values() for row in video.rows]
+        if not rows:
+            rows = [{"Anime Title": "Anime", "Timestamp": "1:00", "Gigguk Excited?": "Yes", "Notes": "Notes"}]
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            extractor = self.make_extractor(workdir)
+            output_path = os.path.join(workdir, "table.csv")
+            for size in sizes:
+                table = fakes.render_markdown([rows[i % len(rows)] for i in range(size)])
+                best = None
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    ok = extractor._save_markdown_as_csv(table, output_path)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                results[str(size)] = {
+                    "ok": ok,
+                    "seconds": round(best, 6),
+                    "rows_per_second": round(size / best) if best else None,
+                    "megabytes_per_second": round(len(table.encode('utf-8')) / 1e6 / best, 2) if best else None,
+                }
+        return results
+
+    def extract_timestamps(self, repeat):
+        """
+        Time extract_timestamps on descriptions that used to make the timestamp regexes backtrack.
+        """
+        chapters = "\n".join(f"{minute}:{second:02d} Anime number {minute}" for minute, second in
+                             ((i // 2, (i * 29) % 60) for i in range(120)))
+        cases = {
+            "typical": next(iter(self.services.library.videos.values())).description
+            if len(self.services.library) else chapters,
+            "long_line_without_timestamps": " ".join(["anime season nutshell"] * 20000),
+            "long_whitespace_runs": ("word" + " " * 5000) * 20 + "\n" + chapters,
+            "digit_colon_runs": "\n".join(":".join(str(i % 60) for i in range(j, j + 400)) for j in range(50)),
+            "title_first_long_lines": "\n".join(" ".join(["Anime"] * 3000) + f" {i}:00" for i in range(40)),
+            "thousands_of_chapters": "\n".join(f"{i // 60}:{i % 60:02d}:00 Chapter {i}" for i in range(5000)),
+            "no_newlines": " ".join(f"{i}:00 Chapter {i}" for i in range(3000)),
+        }
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            extractor = self.make_extractor(workdir)
+            for name, description in cases.items():
+                best = None
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    timestamps = extractor.yt_extractor.extract_timestamps(description=description)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                results[name] = {"bytes": len(description), "timestamps": len(timestamps),
+                                 "milliseconds": round(best * 1000, 3)}
+        return results
+
+    def batch_scaling(self, video_ids, worker_counts, use_async=False):
+        """
+        Time a cold batch run over all videos for each worker count.
+        """
+        results = {}
+        baseline = None
+        for workers in worker_counts:
+            with tempfile.TemporaryDirectory() as workdir:
+                extractor = self.make_extractor(workdir)
+                self.services.reset_counts()
+                started = time.perf_counter()
+                with quiet(not self.verbose):
+                    if use_async:
+                        batch = asyncio.run(extractor.process_videos_async(video_ids, max_in_flight=workers,
+                                                                           max_gemini_calls=workers))
+                    else:
+                        batch = extractor.process_videos(video_ids, max_workers=workers, max_gemini_calls=workers)
+                elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            results[str(workers)] = {
+                "seconds": round(elapsed, 4),
+                "videos_per_second": round(len(video_ids) / elapsed, 3) if elapsed else None,
+                "speedup": round(baseline / elapsed, 2) if elapsed else None,
+                "ok": sum(1 for result in batch if result["status"] == "ok"),
+                "calls": dict(self.services.calls),
+            }
+        return results
+
+
+def flatten(results, prefix=""):
+    """
+    Flatten nested results into {"a.b.c": number} for comparisons.
+    """
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def print_comparison(results, baseline_path, threshold=0.1):
+    """
+    Print the timing metrics that changed by more than threshold since a baseline run.
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    current = flatten(results["results"])
+    previous = flatten(baseline.get("results", {}))
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit') or 'unknown'}):")
+    changed = 0
+    for name, value in current.items():
+        old = previous.get(name)
+        if not old or not name.endswith(("seconds", "milliseconds")):
+            continue
+        ratio = value / old
+        if abs(ratio - 1) >= threshold:
+            changed += 1
+            label = "slower" if ratio > 1 else "faster"
+            print(f"  {name}: {old} -> {value} ({abs(ratio - 1) * 100:.0f}% {label})")
+    if not changed:
+        print(f"  no timing changed by more than {threshold * 100:.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extraction pipeline without network access')
+    parser.add_argument('--recordings', help='Directory of recorded videos (JSON, see benchmarks/fakes.py)')
+    parser.add_argument('--transcripts', default=os.path.join(REPO_ROOT, 'transcripts'),
+                        help='CSV directory the synthetic videos are built from')
+    parser.add_argument('--videos', type=int, help='Number of synthetic videos (default: one per CSV)')
+    parser.add_argument('--workers', default='1,2,4,8', help='Worker counts for the batch runs (default: 1,2,4,8)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per micro-benchmark; the best is reported')
+    parser.add_argument('--metadata-latency', type=float, default=0.05, help='Seconds per yt-dlp call')
+    parser.add_argument('--ytdlp-setup-latency', type=float, default=0.05,
+                        help='Seconds to create a yt-dlp instance')
+    parser.add_argument('--format-latency', type=float, default=0.05,
+                        help='Extra seconds per yt-dlp call with format processing')
+    parser.add_argument('--transcript-latency', type=float, default=0.05, help='Seconds per transcript call')
+    parser.add_argument('--gemini-latency', type=float, default=0.2, help='Seconds until the first Gemini chunk')
+    parser.add_argument('--chunk-latency', type=float, default=0.005, help='Seconds between Gemini chunks')
+    parser.add_argument('--output-format', choices=['markdown', 'json'], default='markdown')
+    parser.add_argument('--segmented', type=float, metavar='MINUTES', help='Benchmark segmented extraction')
+    parser.add_argument('--no-compact', action='store_true', help='Send raw transcripts to the fake model')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep the real request rate limits')
+    parser.add_argument('--skip', default='', help='Comma-separated benchmarks to skip: '
+                        'process_video,metadata,save_markdown_as_csv,extract_timestamps,batch,batch_async')
+    parser.add_argument('--verbose', action='store_true', help="Show the pipeline's output")
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare with the results JSON of an earlier run')
+    args = parser.parse_args()
+
+    if args.recordings:
+        library = fakes.VideoLibrary.from_recordings(args.recordings)
+        source = args.recordings
+    else:
+        library = fakes.VideoLibrary.synthetic(args.transcripts, args.videos)
+        source = "synthetic"
+    if not len(library):
+        parser.error("no videos to replay")
+
+    latency = fakes.Latency(metadata=args.metadata_latency, transcript=args.transcript_latency,
+                            first_chunk=args.gemini_latency, chunk=args.chunk_latency,
+                            ytdlp_setup=args.ytdlp_setup_latency, formats=args.format_latency)
+    services = fakes.install(library, latency)
+
+    options = {"output_format": args.output_format, "compact_transcripts": not args.no_compact}
+    if args.segmented:
+        options["segment_seconds"] = args.segmented * 60
+    benchmark = PipelineBenchmark(services, options, rate_limits=args.rate_limits, verbose=args.verbose)
+    video_ids = library.video_ids()
+    worker_counts = [int(count) for count in args.workers.split(',') if count.strip()]
+    skip = {name.strip() for name in args.skip.split(',') if name.strip()}
+
+    results = {}
+    if "process_video" not in skip:
+        print(f"process_video: {len(video_ids)} videos ({source})")
+        results["process_video"] = benchmark.process_video(video_ids)
+        for phase, summary in results["process_video"].items():
+            print(f"  {phase}: {summary['mean_seconds']:.3f}s mean, {summary['p95_seconds']:.3f}s p95, "
+                  f"{summary['failed']} failed, calls {summary['calls']}")
+            print("    stages: " + ", ".join(f"{stage} {seconds:.2f}s"
+                                             for stage, seconds in summary["stage_seconds"].items()))
+    if "metadata" not in skip:
+        print(f"get_video_metadata: {len(video_ids)} videos")
+        results["metadata"] = benchmark.metadata(video_ids)
+        for name, summary in results["metadata"].items():
+            print(f"  {name}: {summary['mean_seconds'] * 1000:.1f} ms mean, {summary['p95_seconds'] * 1000:.1f} ms p95, "
+                  f"{summary['calls']['ytdlp_instances']} yt-dlp instances")
+    if "save_markdown_as_csv" not in skip:
+        print("_save_markdown_as_csv:")
+        results["save_markdown_as_csv"] = benchmark.save_markdown_as_csv([100, 1000, 10000], args.repeat)
+        for size, result in results["save_markdown_as_csv"].items():
+            print(f"  {size:>6} rows: {result['seconds'] * 1000:8.2f} ms, {result['rows_per_second']} rows/s, "
+                  f"{result['megabytes_per_second']} MB/s")
+    if "extract_timestamps" not in skip:
+        print("extract_timestamps:")
+        results["extract_timestamps"] = benchmark.extract_timestamps(args.repeat)
+        for name, result in results["extract_timestamps"].items():
+            print(f"  {name:<30} {result['bytes']:>8} bytes {result['milliseconds']:>9.3f} ms "
+                  f"({result['timestamps']} timestamps)")
+    for name, use_async in (("batch", False), ("batch_async", True)):
+        if name in skip:
+            continue
+        print(f"{'process_videos_async' if use_async else 'process_videos'}: {len(video_ids)} videos")
+        results[name] = benchmark.batch_scaling(video_ids, worker_counts, use_async=use_async)
+        for workers, result in results[name].items():
+            print(f"  {workers:>3} workers: {result['seconds']:.2f}s, {result['videos_per_second']} videos/s, "
+                  f"{result['speedup']}x, {result['ok']} ok")
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "source": source,
+        "videos": len(video_ids),
+        "latency": latency.to_dict(),
+        "options": dict(options, rate_limits=args.rate_limits),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if args.compare:
+        print_comparison(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+Startup benchmark of the code paths that need no network access.
+
+Every run starts a fresh interpreter, so module imports are paid again each time. It measures:
+
+- import: importing anime_extractor
+- help: running anime_extractor.py --help
+- parse: creating an AnimeExtractor and parsing a saved markdown table and a video description
+- cached_rerun: process_video for a video whose metadata, transcript and Gemini response are
+  all in the caches (populated beforehand with the fakes of fakes.py)
+
+Each scenario is run as the pipeline runs it ("lazy") and "eager", with google-genai, yt-dlp,
+youtube-transcript-api and python-dotenv imported up front and the Gemini client created with
+the extractor, as before they were loaded on first use. The eager runs need those packages
+installed and are reported as unavailable otherwise.
+
+Usage: python benchmarks/bench_startup.py [--repeat 7] [--scenarios import,help,parse,cached_rerun]
+                                          [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from bench_pipeline import git_commit  # noqa: E402
+
+
+# Third-party modules that are slow to import and only needed to talk to YouTube or Gemini
+HEAVY_MODULES = ("google.genai", "yt_dlp", "youtube_transcript_api", "dotenv")
+
+# Prefix of the line a child interpreter reports its measurements on
+RESULT_MARKER = "BENCH_STARTUP_RESULT "
+
+TABLE = """| Anime Name | Timestamp | Context |
+|---|---|---|
+""" + "\n".join(f"| Anime {i} | {i // 60}:{i % 60:02d} | Mentioned while talking about episode {i} |"
+                for i in range(200))
+
+DESCRIPTION = "Anime mentioned in this video:\n" + "\n".join(f"{i // 60}:{i % 60:02d} Anime {i}" for i in range(200))
+
+# Code run in the child interpreter around each scenario, whose body is indented to sit in the
+# with block. The clock starts before anything from the repository is imported
+CHILD_TEMPLATE = """
+import time
+started = time.perf_counter()
+import sys, json, contextlib, io
+sys.path.insert(0, {repo!r})
+EAGER = {eager!r}
+WORKDIR = {workdir!r}
+if EAGER:
+    import google.genai, yt_dlp, youtube_transcript_api, dotenv
+
+
+def make_extractor():
+    import os
+    from anime_extractor import AnimeExtractor
+    extractor = AnimeExtractor(
+        output_dir=os.path.join(WORKDIR, "transcripts"),
+        config_file=os.path.join(WORKDIR, "csv_config.json"),
+        cache_dir=os.path.join(WORKDIR, ".cache"),
+        index_file=os.path.join(WORKDIR, "anime_index.json"),
+        catalog_file=os.path.join(WORKDIR, "anime_catalog.json"),
+        manifest_file=os.path.join(WORKDIR, "extraction_manifest.json"),
+        api_key="offline-benchmark",
+    )
+    if EAGER:
+        extractor.gemini_client
+    return extractor
+
+
+ok = True
+with contextlib.redirect_stdout(io.StringIO()):
+{body}
+print({marker!r} + json.dumps({{
+    "seconds": time.perf_counter() - started,
+    "ok": bool(ok),
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+SCENARIOS = {
+    "import": """
+    import anime_extractor
+""",
+    "help": """
+    import runpy
+    sys.argv = [{script!r}, "--help"]
+    try:
+        runpy.run_path({script!r}, run_name="__main__")
+    except SystemExit:
+        pass
+""",
+    "parse": """
+    import os
+    extractor = make_extractor()
+    ok = extractor._save_markdown_as_csv({table!r}, os.path.join(WORKDIR, "parsed.csv"))
+    ok = ok and len(extractor.yt_extractor.extract_timestamps(description={description!r})) == 200
+""",
+    "cached_rerun": """
+    extractor = make_extractor()
+    ok = extractor.process_video({video_id!r}) is not None
+""",
+}
+
+# Runs once before the cached_rerun scenario, with the fakes installed, to fill the caches
+SETUP_TEMPLATE = """
+import os, sys, json, contextlib, io
+sys.path.insert(0, {repo!r})
+sys.path.insert(0, {benchmarks!r})
+import fakes
+library = fakes.VideoLibrary.synthetic({transcripts!r}, count=1)
+fakes.install(library, fakes.Latency(metadata=0, transcript=0, first_chunk=0, chunk=0))
+from anime_extractor import AnimeExtractor
+video_id = library.video_ids()[0]
+workdir = {workdir!r}
+with contextlib.redirect_stdout(io.StringIO()):
+    extractor = AnimeExtractor(
+        output_dir=os.path.join(workdir, "transcripts"),
+        config_file=os.path.join(workdir, "csv_config.json"),
+        cache_dir=os.path.join(workdir, ".cache"),
+        index_file=os.path.join(workdir, "anime_index.json"),
+        catalog_file=os.path.join(workdir, "anime_catalog.json"),
+        manifest_file=os.path.join(workdir, "extraction_manifest.json"),
+        api_key="offline-benchmark",
+    )
+    csv_path = extractor.process_video(video_id)
+print(json.dumps({{"video_id": video_id, "ok": csv_path is not None}}))
+"""
+
+
+def heavy_modules_available():
+    """
+    Check whether the real heavy dependencies can be imported, for the eager runs.
+    """
+    code = "import " + ", ".join(HEAVY_MODULES)
+    return subprocess.run([sys.executable, "-c", code], capture_output=True).returncode == 0
+
+
+def populate_caches(workdir, transcripts_dir):
+    """
+    Process one synthetic video with the fakes, so every cache holds its inputs and response.
+
+    Returns:
+        str: The video ID, or None if the setup failed
+    """
+    code = SETUP_TEMPLATE.format(repo=REPO_ROOT, benchmarks=BENCHMARKS_DIR, transcripts=transcripts_dir,
+                                 workdir=workdir)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=workdir)
+    if result.returncode != 0:
+        print(f"Error populating the caches: {result.stderr.strip()}")
+        return None
+    setup = json.loads(result.stdout.strip().splitlines()[-1])
+    return setup["video_id"] if setup["ok"] else None
+
+
+def run_child(body, eager, workdir):
+    """
+    Run one scenario in a fresh interpreter.
+
+    Returns:
+        dict: wall_seconds (including interpreter startup), seconds (from the first line of the
+            scenario), ok and the heavy modules that were loaded, or an error
+    """
+    code = CHILD_TEMPLATE.format(repo=REPO_ROOT, eager=eager, workdir=workdir, body=body.strip("\n"),
+                                 marker=RESULT_MARKER, heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=workdir)
+    wall_seconds = time.perf_counter() - started
+    for line in result.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return dict(json.loads(line[len(RESULT_MARKER):]), wall_seconds=wall_seconds)
+    error = (result.stderr.strip().splitlines() or ["no result"])[-1]
+    return {"ok": False, "error": error}
+
+
+def run_scenario(name, body, eager, workdir, repeat):
+    runs = [run_child(body, eager, workdir) for _ in range(repeat)]
+    failed = [run for run in runs if "seconds" not in run]
+    if failed:
+        return {"error": failed[0]["error"]}
+    return {
+        "median_seconds": round(statistics.median(run["seconds"] for run in runs), 4),
+        "median_wall_seconds": round(statistics.median(run["wall_seconds"] for run in runs), 4),
+        "min_seconds": round(min(run["seconds"] for run in runs), 4),
+        "ok": all(run["ok"] for run in runs),
+        "loaded": runs[-1]["loaded"],
+    }
+
+
+def print_results(results):
+    print(f"{'scenario':<14}{'lazy':>12}{'eager':>12}{'speedup':>10}  heavy modules loaded (lazy)")
+    for name, variants in results.items():
+        lazy = variants["lazy"]
+        eager = variants.get("eager")
+        if "error" in lazy:
+            print(f"{name:<14}{'error':>12}  {lazy['error']}")
+            continue
+        lazy_text = f"{lazy['median_seconds'] * 1000:.0f} ms"
+        if eager is None:
+            eager_text, speedup = "unavailable", ""
+        elif "error" in eager:
+            eager_text, speedup = "error", ""
+        else:
+            eager_text = f"{eager['median_seconds'] * 1000:.0f} ms"
+            speedup = f"{eager['median_seconds'] / lazy['median_seconds']:.1f}x"
+        loaded = ", ".join(lazy["loaded"]) or "none"
+        status = "" if lazy["ok"] else " (failed)"
+        print(f"{name:<14}{lazy_text:>12}{eager_text:>12}{speedup:>10}  {loaded}{status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the startup time of the non-network code paths')
+    parser.add_argument('--repeat', type=int, default=7, help='Fresh interpreters per scenario; the median is reported')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--transcripts', default=os.path.join(REPO_ROOT, 'transcripts'),
+                        help='CSV directory the cached video is built from')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    eager_available = heavy_modules_available()
+    if not eager_available:
+        print("google-genai, yt-dlp, youtube-transcript-api or python-dotenv is not installed; "
+              "skipping the eager runs")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        video_id = None
+        if "cached_rerun" in names:
+            video_id = populate_caches(workdir, args.transcripts)
+            if video_id is None:
+                names.remove("cached_rerun")
+
+        for name in names:
+            body = SCENARIOS[name].format(script=os.path.join(REPO_ROOT, "anime_extractor.py"), table=TABLE,
+                                          description=DESCRIPTION, video_id=video_id)
+            results[name] = {"lazy": run_scenario(name, body, False, workdir, args.repeat)}
+            if eager_available:
+                results[name]["eager"] = run_scenario(name, body, True, workdir, args.repeat)
+
+    print_results(results)
+
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "eager_available": eager_available,
+            "results": results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,501 @@
+"""
+Offline stand-ins for the YouTube and Gemini clients, used by the benchmarks.
+
+install() registers fake youtube_transcript_api, yt_dlp, google.genai and dotenv modules in
+sys.modules, so importing anime_extractor or youtube_transcript_downloader afterwards picks
+them up instead of the real packages and no call touches the network. The fakes replay the
+videos of a VideoLibrary: recorded videos loaded from JSON files, or synthetic videos built
+from the extracted CSV files. Every call sleeps for a configurable latency to stand in for
+the network round trip.
+
+A recording is one JSON file per video:
+
+    {"id": "...", "title": "...", "description": "...", "duration": 1234, "upload_date": "20250101",
+     "transcript": [{"text": "...", "start": 0.0, "duration": 2.5}, ...],
+     "rows": [{"Anime Title": "...", "Timestamp": "...", "Gigguk Excited?": "...", "Notes": "..."}, ...],
+     "response": "optional raw markdown response replayed as is"}
+"""
+import os
+import csv
+import sys
+import glob
+import json
+import time
+import types
+import random
+import asyncio
+import threading
+
+
+CSV_COLUMNS = ["Anime Title", "Timestamp", "Gigguk Excited?", "Notes"]
+
+# CSV column -> field of the JSON records requested in structured output mode
+JSON_FIELDS = {"Anime Title": "title", "Timestamp": "timestamp", "Gigguk Excited?": "excited", "Notes": "notes"}
+
+CAPTION_WORDS = ("so this season we got a show that honestly nobody expected to be this good and the "
+                 "animation is pretty wild um the studio really went for it uh if you liked the manga "
+                 "you will probably enjoy this one").split()
+
+
+class Latency:
+    """
+    Simulated network latency of each fake call, in seconds.
+    """
+
+    def __init__(self, metadata=0.05, transcript=0.05, first_chunk=0.2, chunk=0.005, chunk_chars=64,
+                 ytdlp_setup=0.05, formats=0.05):
+        """
+        Initialize the latencies.
+
+        Args:
+            metadata (float): Latency of a yt-dlp extract_info call
+            transcript (float): Latency of a YouTubeTranscriptApi.get_transcript call
+            first_chunk (float): Time until a Gemini stream returns its first chunk
+            chunk (float): Time between two Gemini stream chunks
+            chunk_chars (int): Number of characters per Gemini stream chunk
+            ytdlp_setup (float): Time to create a yt_dlp.YoutubeDL instance
+            formats (float): Extra time of an extract_info call with processing (format selection,
+                thumbnails), which the lean process=False calls skip
+        """
+        self.metadata = metadata
+        self.transcript = transcript
+        self.first_chunk = first_chunk
+        self.chunk = chunk
+        self.chunk_chars = chunk_chars
+        self.ytdlp_setup = ytdlp_setup
+        self.formats = formats
+
+    def to_dict(self):
+        return {"metadata": self.metadata, "transcript": self.transcript, "first_chunk": self.first_chunk,
+                "chunk": self.chunk, "chunk_chars": self.chunk_chars, "ytdlp_setup": self.ytdlp_setup,
+                "formats": self.formats}
+
+
+class FakeVideo:
+    """
+    The metadata, transcript and extracted rows of one video.
+    """
+
+    def __init__(self, video_id, title, description, duration, transcript, rows, upload_date=None, response=None):
+        """
+        Initialize the video.
+
+        Args:
+            video_id (str): The YouTube video ID
+            title (str): The video title
+            description (str): The video description with its timestamp lines
+            duration (int): The video duration in seconds
+            transcript (list): Snippet dicts with text, start and duration
+            rows (list): Row dicts with the four CSV columns, returned by the fake Gemini model
+            upload_date (str, optional): Upload date as YYYYMMDD
+            response (str, optional): Raw markdown response replayed instead of rendering the rows
+        """
+        self.video_id = video_id
+        self.title = title
+        self.description = description
+        self.duration = duration
+        self.transcript = transcript
+        self.rows = rows
+        self.upload_date = upload_date
+        self.response = response
+
+    def info(self):
+        """
+        Get the video in the shape of a yt-dlp info dict.
+        """
+        return {"id": self.video_id, "title": self.title, "description": self.description,
+                "duration": self.duration, "upload_date": self.upload_date, "chapters": None}
+
+
+def render_markdown(rows):
+    lines = ["| " + " | ".join(CSV_COLUMNS) + " |", "|" + "|".join("---" for _ in CSV_COLUMNS) + "|"]
+    for row in rows:
+        lines.append("| " + " | ".join(row.get(column, "").replace("|", "/") for column in CSV_COLUMNS) + " |")
+    return "\n".join(lines) + "\n"
+
+
+def render_json(rows):
+    return json.dumps([{field: row.get(column, "") for column, field in JSON_FIELDS.items()} for row in rows])
+
+
+class VideoLibrary:
+    """
+    The videos the fakes know about, keyed by video ID.
+    """
+
+    def __init__(self, videos=None):
+        self.videos = {video.video_id: video for video in (videos or [])}
+
+    def __len__(self):
+        return len(self.videos)
+
+    def video_ids(self):
+        return list(self.videos)
+
+    def get(self, video_id):
+        return self.videos.get(video_id)
+
+    def add(self, video):
+        self.videos[video.video_id] = video
+
+    def rows_for_prompt(self, prompt_text):
+        """
+        Find the rows a model would extract from a prompt: those whose anime title appears in it.
+
+        Args:
+            prompt_text (str): The prompt sent to Gemini
+
+        Returns:
+            tuple: (rows, video) with the matched rows and the video they came from, or ([], None)
+        """
+        best_rows, best_video = [], None
+        for video in self.videos.values():
+            rows = [row for row in video.rows if row["Anime Title"] and row["Anime Title"] in prompt_text]
+            if len(rows) > len(best_rows):
+                best_rows, best_video = rows, video
+        return best_rows, best_video
+
+    @classmethod
+    def from_recordings(cls, directory):
+        """
+        Load recorded videos from a directory of JSON files.
+
+        Args:
+            directory (str): The directory with one JSON recording per video
+
+        Returns:
+            VideoLibrary: The recorded videos
+        """
+        videos = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            with open(path, 'r', encoding='utf-8') as f:
+                recording = json.load(f)
+            videos.append(FakeVideo(recording["id"], recording.get("title") or recording["id"],
+                                    recording.get("description") or "", recording.get("duration") or 0,
+                                    recording.get("transcript") or [], recording.get("rows") or [],
+                                    upload_date=recording.get("upload_date"), response=recording.get("response")))
+        return cls(videos)
+
+    @classmethod
+    def synthetic(cls, transcripts_dir, count=None, snippet_seconds=2.5, seed=0):
+        """
+        Build videos from the extracted CSV files.
+
+        Each CSV becomes a video titled after the file. Its rows are the model's answer, its
+        timestamps become the chapter lines of the description, and the transcript is made of
+        filler captions that mention each anime at its timestamp.
+
+        Args:
+            transcripts_dir (str): Directory with the extracted CSV files
+            count (int, optional): Number of videos. CSVs are reused with new IDs if there are fewer
+            snippet_seconds (float): Time between two caption snippets
+            seed (int): Seed of the random caption text
+
+        Returns:
+            VideoLibrary: The synthetic videos
+        """
+        rng = random.Random(seed)
+        sources = []
+        for path in sorted(glob.glob(os.path.join(transcripts_dir, "*.csv"))):
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                rows = [{column: (row.get(column) or "").strip() for column in CSV_COLUMNS}
+                        for row in csv.DictReader(f)]
+            rows = [row for row in rows if row["Anime Title"]]
+            if rows:
+                title = os.path.basename(path).replace("_anime_references.csv", "")
+                sources.append((title, rows))
+        if not sources:
+            sources = [("Synthetic Anime in a Nutshell",
+                        [{"Anime Title": f"Anime {i}", "Timestamp": f"{i * 2}:{i * 7 % 60:02d}",
+                          "Gigguk Excited?": "Yes" if i % 3 else "Neutral", "Notes": f"Note {i}"}
+                         for i in range(40)])]
+
+        count = count or len(sources)
+        videos = []
+        for index in range(count):
+            title, rows = sources[index % len(sources)]
+            if index >= len(sources):
+                title = f"{title} (copy {index // len(sources)})"
+            videos.append(cls._synthetic_video(f"fake{index:07d}", title, rows, snippet_seconds, rng))
+        return cls(videos)
+
+    @staticmethod
+    def _synthetic_video(video_id, title, rows, snippet_seconds, rng):
+        mentions = {}
+        for row in rows:
+            seconds = _timestamp_seconds(row["Timestamp"])
+            if seconds is not None:
+                mentions.setdefault(seconds, []).append(row["Anime Title"])
+        duration = (max(mentions) if mentions else 600) + 120
+
+        chapter_lines = []
+        for row in rows:
+            if _timestamp_seconds(row["Timestamp"]) is not None:
+                chapter_lines.append(f"{row['Timestamp']} {row['Anime Title']}")
+        description = "\n".join([f"{title}! Here are the anime of the season.", ""] + chapter_lines +
+                                ["", "Merch: https://example.com/merch", "Twitter: https://example.com/gigguk"])
+
+        transcript = []
+        pending = sorted(mentions.items())
+        start = 0.0
+        while start < duration:
+            words = rng.choices(CAPTION_WORDS, k=rng.randint(6, 12))
+            while pending and pending[0][0] <= start:
+                words.extend(pending.pop(0)[1])
+            text = "[Music]" if rng.random() < 0.03 else " ".join(words)
+            transcript.append({"text": text, "start": round(start, 2), "duration": snippet_seconds + 0.5})
+            start += snippet_seconds
+        return FakeVideo(video_id, title, description, duration, transcript, rows, upload_date="20250101")
+
+
+def _timestamp_seconds(timestamp):
+    try:
+        seconds = 0
+        for part in timestamp.split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+class FakeServices:
+    """
+    The shared state of the fake modules: the video library, latencies and call counters.
+    """
+
+    def __init__(self, library, latency=None):
+        self.library = library
+        self.latency = latency or Latency()
+        self.calls = {"metadata": 0, "listing": 0, "ytdlp_instances": 0, "transcript": 0, "gemini": 0,
+                      "count_tokens": 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.calls[name] += 1
+
+    def reset_counts(self):
+        with self._lock:
+            for name in self.calls:
+                self.calls[name] = 0
+
+    def response_text(self, contents, config):
+        """
+        Get the response of the fake model to a request.
+        """
+        prompt_text = "\n".join(getattr(part, "text", "") or "" for content in contents
+                                for part in getattr(content, "parts", None) or [])
+        rows, video = self.library.rows_for_prompt(prompt_text)
+        if getattr(config, "response_mime_type", None) == "application/json":
+            return render_json(rows)
+        if video is not None and video.response and len(rows) == len(video.rows):
+            return video.response
+        return render_markdown(rows)
+
+    def chunks(self, text):
+        size = max(1, self.latency.chunk_chars)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class _Namespace:
+    """
+    Stand-in for the google.genai.types classes: keeps its keyword arguments as attributes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.__dict__.update(kwargs)
+
+    @classmethod
+    def from_text(cls, text):
+        return cls(text=text)
+
+    def model_dump(self, mode=None, exclude_none=False):
+        # Like the pydantic models of google.genai, so response cache keys are stable
+        return {key: _dump(value) for key, value in vars(self).items() if not (exclude_none and value is None)}
+
+
+def _dump(value):
+    if isinstance(value, _Namespace):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_dump(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _dump(item) for key, item in value.items()}
+    return value
+
+
+class _Chunk:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class _UsageMetadata:
+    def __init__(self, candidates_token_count):
+        self.candidates_token_count = candidates_token_count
+
+
+class _TokenCount:
+    def __init__(self, total_tokens):
+        self.total_tokens = total_tokens
+
+
+def _build_genai(services):
+    genai = types.ModuleType("google.genai")
+    genai_types = types.ModuleType("google.genai.types")
+    for name in ("Content", "Part", "GenerateContentConfig", "Schema", "ThinkingConfig"):
+        setattr(genai_types, name, type(name, (_Namespace,), {}))
+    genai_types.Type = type("Type", (), {"OBJECT": "OBJECT", "ARRAY": "ARRAY", "STRING": "STRING"})
+    errors = types.ModuleType("google.genai.errors")
+    errors.APIError = type("APIError", (Exception,), {})
+
+    class Models:
+        def generate_content_stream(self, model, contents, config=None):
+            services.count("gemini")
+            text = services.response_text(contents, config)
+            time.sleep(services.latency.first_chunk)
+            chunks = services.chunks(text)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    time.sleep(services.latency.chunk)
+                yield _Chunk(chunk)
+            yield _Chunk("", _UsageMetadata(max(1, len(text) // 4)))
+
+        def count_tokens(self, model, contents):
+            services.count("count_tokens")
+            return _TokenCount(max(1, len(contents) // 4) if isinstance(contents, str) else 1)
+
+    class AsyncModels:
+        async def generate_content_stream(self, model, contents, config=None):
+            services.count("gemini")
+            text = services.response_text(contents, config)
+            await asyncio.sleep(services.latency.first_chunk)
+
+            async def stream():
+                for index, chunk in enumerate(services.chunks(text)):
+                    if index:
+                        await asyncio.sleep(services.latency.chunk)
+                    yield _Chunk(chunk)
+                yield _Chunk("", _UsageMetadata(max(1, len(text) // 4)))
+            return stream()
+
+    class Client:
+        def __init__(self, api_key=None, **kwargs):
+            self.models = Models()
+            self.aio = types.SimpleNamespace(models=AsyncModels())
+
+    genai.Client = Client
+    genai.types = genai_types
+    genai.errors = errors
+    return genai, genai_types, errors
+
+
+def _build_yt_dlp(services):
+    yt_dlp = types.ModuleType("yt_dlp")
+    utils = types.ModuleType("yt_dlp.utils")
+    utils.DownloadError = type("DownloadError", (Exception,), {})
+
+    class YoutubeDL:
+        def __init__(self, params=None):
+            services.count("ytdlp_instances")
+            time.sleep(services.latency.ytdlp_setup)
+            self.params = params or {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+        def close(self):
+            pass
+
+        def extract_info(self, url, download=True, process=True, **kwargs):
+            if "/videos" in url or "list=" in url:
+                return self._listing(url)
+            services.count("metadata")
+            time.sleep(services.latency.metadata + (services.latency.formats if process else 0))
+            video_id = url.split("v=")[-1].split("&")[0] if "v=" in url else url.rstrip("/").split("/")[-1]
+            video = services.library.get(video_id)
+            if video is None:
+                raise utils.DownloadError(f"ERROR: [youtube] {video_id}: Video unavailable")
+            return video.info()
+
+        def _listing(self, url):
+            # A channel or playlist page: flat entries for every video in the library, newest first
+            services.count("listing")
+            time.sleep(services.latency.metadata)
+            videos = sorted(services.library.videos.values(), key=lambda video: video.upload_date or "", reverse=True)
+            entries = ({"_type": "url", "ie_key": "Youtube", "id": video.video_id, "title": video.title,
+                        "url": f"https://www.youtube.com/watch?v={video.video_id}", "duration": video.duration}
+                       for video in videos)
+            return {"_type": "playlist", "id": url, "title": url, "entries": entries}
+
+    yt_dlp.YoutubeDL = YoutubeDL
+    yt_dlp.DownloadError = utils.DownloadError
+    yt_dlp.utils = utils
+    return yt_dlp, utils
+
+
+def _build_transcript_api(services):
+    api = types.ModuleType("youtube_transcript_api")
+    errors = types.ModuleType("youtube_transcript_api._errors")
+    for name in ("TranscriptsDisabled", "NoTranscriptFound", "VideoUnavailable", "TooManyRequests"):
+        setattr(errors, name, type(name, (Exception,), {}))
+    formatters = types.ModuleType("youtube_transcript_api.formatters")
+    formatters.TextFormatter = type("TextFormatter", (), {})
+
+    class YouTubeTranscriptApi:
+        @staticmethod
+        def get_transcript(video_id, languages=("en",), **kwargs):
+            services.count("transcript")
+            time.sleep(services.latency.transcript)
+            video = services.library.get(video_id)
+            if video is None:
+                raise errors.VideoUnavailable(video_id)
+            if not video.transcript:
+                raise errors.NoTranscriptFound(video_id)
+            return [dict(snippet) for snippet in video.transcript]
+
+    api.YouTubeTranscriptApi = YouTubeTranscriptApi
+    api._errors = errors
+    api.formatters = formatters
+    return api, errors, formatters
+
+
+def install(library, latency=None):
+    """
+    Register the fake modules in sys.modules.
+
+    Must be called before anime_extractor or youtube_transcript_downloader is imported.
+
+    Args:
+        library (VideoLibrary): The videos the fakes replay
+        latency (Latency, optional): Simulated latency of each call
+
+    Returns:
+        FakeServices: The shared state, e.g. to read the call counters or change the latency
+    """
+    services = FakeServices(library, latency)
+    genai, genai_types, genai_errors = _build_genai(services)
+    google = types.ModuleType("google")
+    google.__path__ = []
+    google.genai = genai
+    yt_dlp, yt_dlp_utils = _build_yt_dlp(services)
+    transcript_api, transcript_errors, formatters = _build_transcript_api(services)
+    dotenv = types.ModuleType("dotenv")
+    dotenv.load_dotenv = lambda *args, **kwargs: False
+
+    sys.modules.update({
+        "google": google,
+        "google.genai": genai,
+        "google.genai.types": genai_types,
+        "google.genai.errors": genai_errors,
+        "yt_dlp": yt_dlp,
+        "yt_dlp.utils": yt_dlp_utils,
+        "youtube_transcript_api": transcript_api,
+        "youtube_transcript_api._errors": transcript_errors,
+        "youtube_transcript_api.formatters": formatters,
+        "dotenv": dotenv,
+    })
+    return services
@@ -0,0 +1,102 @@
+import re
+from manifest import ExtractionManifest
+from references import read_config_files
+
+
+# Gigguk's uploads, newest first
+DEFAULT_SYNC_URL = "https://www.youtube.com/@Gigguk/videos"
+
+# The seasonal videos, e.g. "Spring Anime 2025 In A Nutshell" or "Fall 2024 Anime in a Nutshell"
+DEFAULT_TITLE_PATTERN = r'\banime\b.*\bin a nutshell\b'
+
+# Number of uploads read per sync. One page of a channel listing holds about 30 videos
+DEFAULT_SYNC_LIMIT = 30
+
+
+class ChannelSync:
+    """
+    Finds the videos of a channel or playlist that match a title pattern and haven't been extracted yet.
+
+    The listing uses yt-dlp's flat extraction, so a sync costs one listing request and never
+    visits a video that was already processed. A video counts as processed if the manifest
+    records it or if the CSV config lists the CSV file its title would produce (for outputs
+    extracted before the manifest existed).
+    """
+
+    def __init__(self, yt_extractor, config_file="csv_config.json", manifest_file="extraction_manifest.json",
+                 title_pattern=DEFAULT_TITLE_PATTERN):
+        """
+        Initialize the sync.
+
+        Args:
+            yt_extractor (YouTubeDataExtractor): Used for the listing and to build CSV filenames from titles
+            config_file (str): Path to the CSV configuration file
+            manifest_file (str): Path to the extraction manifest
+            title_pattern (str): Regular expression a video title must match, case-insensitive
+        """
+        self.yt_extractor = yt_extractor
+        self.config_file = config_file
+        self.manifest = ExtractionManifest(manifest_file)
+        self.title_pattern = re.compile(title_pattern, re.IGNORECASE)
+
+    def list_matching(self, url=DEFAULT_SYNC_URL, max_entries=DEFAULT_SYNC_LIMIT):
+        """
+        List the videos of a channel or playlist whose title matches the title pattern.
+
+        Args:
+            url (str): The channel or playlist URL
+            max_entries (int, optional): Number of listing entries to read. None reads the whole listing
+
+        Returns:
+            list: Entry dicts with 'id', 'title', 'url' and 'duration', or None if the listing failed
+        """
+        entries = self.yt_extractor.get_playlist_entries(url, max_entries=max_entries)
+        if entries is None:
+            return None
+        return [entry for entry in entries if self.title_pattern.search(entry.get('title') or "")]
+
+    def known_csv_files(self):
+        """
+        Get the CSV filenames registered in the CSV config.
+
+        Returns:
+            set: The filenames
+        """
+        return set(read_config_files(self.config_file))
+
+    def is_processed(self, entry, video_ids=None, csv_files=None):
+        """
+        Check whether a listed video was already extracted.
+
+        Args:
+            entry (dict): A listing entry
+            video_ids (set, optional): Video IDs in the manifest. Read from the manifest if None
+            csv_files (set, optional): Filenames in the CSV config. Read from the config if None
+
+        Returns:
+            bool: True if the manifest or the CSV config already has the video
+        """
+        video_ids = self.manifest.video_ids() if video_ids is None else video_ids
+        csv_files = self.known_csv_files() if csv_files is None else csv_files
+        if entry['id'] in video_ids:
+            return True
+        title = entry.get('title')
+        return bool(title) and f"{self.yt_extractor.sanitize_filename(title)}_anime_references.csv" in csv_files
+
+    def new_videos(self, url=DEFAULT_SYNC_URL, max_entries=DEFAULT_SYNC_LIMIT):
+        """
+        List the matching videos that haven't been extracted yet.
+
+        Args:
+            url (str): The channel or playlist URL
+            max_entries (int, optional): Number of listing entries to read. None reads the whole listing
+
+        Returns:
+            list: The new entries in listing order, or None if the listing failed
+        """
+        entries = self.list_matching(url, max_entries)
+        if entries is None:
+            return None
+        video_ids = self.manifest.video_ids()
+        csv_files = self.known_csv_files()
+        return [entry for entry in entries if not self.is_processed(entry, video_ids, csv_files)]
@@ -0,0 +1,176 @@
+import re
+
+
+# A timestamp at the start of a line, optionally in brackets and followed by a separator: "0:00 - Intro"
+LEADING_TIMESTAMP_PATTERN = re.compile(r'[ \t]*[\(\[]?(\d+:\d+(?::\d+)?)[\)\]]?(?:[ \t]+[-–—|:]?[ \t]*(.*))?$')
+
+# A whole-word timestamp, used for the last word of "Anime Name 0:00" lines
+TIMESTAMP_PATTERN = re.compile(r'[\(\[]?(\d+:\d+(?::\d+)?)[\)\]]?')
+
+# Separators left at the end of the title of "Anime Name - 0:00" lines
+TRAILING_SEPARATOR_PATTERN = re.compile(r'[ \t]*[-–—|:]$')
+
+
+class Chapter:
+    """
+    A chapter of a video, parsed from a timestamp line in its description.
+    """
+
+    __slots__ = ("timestamp", "title", "start", "end")
+
+    def __init__(self, timestamp, title, start, end=None):
+        """
+        Initialize the chapter.
+
+        Args:
+            timestamp (str): The timestamp as written in the description, e.g. "5:41"
+            title (str): The chapter title
+            start (int): Start time in seconds
+            end (int, optional): End time in seconds; None for the last chapter if the video duration is unknown
+        """
+        self.timestamp = timestamp
+        self.title = title
+        self.start = start
+        self.end = end
+
+    @property
+    def duration(self):
+        return None if self.end is None else self.end - self.start
+
+    def to_dict(self):
+        return {"timestamp": self.timestamp, "title": self.title, "start": self.start, "end": self.end}
+
+    def __repr__(self):
+        return f"Chapter({self.timestamp!r}, {self.title!r}, start={self.start}, end={self.end})"
+
+
+def parse_timestamp(timestamp):
+    """
+    Convert a "m:ss" or "h:mm:ss" timestamp to seconds.
+
+    Args:
+        timestamp (str): The timestamp
+
+    Returns:
+        int: The timestamp in seconds or None if it couldn't be parsed
+    """
+    try:
+        seconds = 0
+        for part in timestamp.strip().split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+
+def format_timestamp(seconds):
+    """
+    Format a number of seconds as a "m:ss" or "h:mm:ss" timestamp.
+
+    Args:
+        seconds (float): Number of seconds
+
+    Returns:
+        str: The formatted timestamp
+    """
+    seconds = int(seconds)
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def parse_chapter_line(line):
+    """
+    Parse one description line in the "0:00 Anime Name" or "Anime Name 0:00" format.
+
+    Args:
+        line (str): The description line
+
+    Returns:
+        tuple: (timestamp, title), or None if the line isn't a timestamp line
+    """
+    match = LEADING_TIMESTAMP_PATTERN.match(line)
+    if match:
+        return match.group(1), (match.group(2) or "").strip()
+
+    # Title first: only the last word can be the timestamp, so no pattern has to scan the whole line
+    parts = line.rsplit(None, 1)
+    if len(parts) == 2:
+        match = TIMESTAMP_PATTERN.fullmatch(parts[1])
+        if match:
+            return match.group(1), TRAILING_SEPARATOR_PATTERN.sub('', parts[0].strip())
+    return None
+
+
+def parse_chapters(description, duration=None):
+    """
+    Parse the chapters of a video from its description in a single pass over its lines.
+
+    Both "0:00 Anime Name" and "Anime Name 0:00" lines are recognized. Every timestamp
+    line becomes a chapter, including repeated timestamps. Each chapter ends where the
+    next one starts; the last one ends at the video duration if it is known.
+
+    Args:
+        description (str): The video description
+        duration (float, optional): The video duration in seconds
+
+    Returns:
+        list: Chapter objects ordered by start time (description order for equal start times)
+    """
+    chapters = []
+    for line in (description or "").splitlines():
+        # Every timestamp contains ':', which rules out most lines without running a pattern
+        if ':' not in line:
+            continue
+        parsed = parse_chapter_line(line)
+        if parsed is None:
+            continue
+        timestamp, title = parsed
+        start = parse_timestamp(timestamp)
+        if start is not None:
+            chapters.append(Chapter(timestamp, title, start))
+
+    chapters.sort(key=lambda chapter: chapter.start)
+    for chapter, next_chapter in zip(chapters, chapters[1:]):
+        chapter.end = next_chapter.start
+    if chapters and duration is not None:
+        chapters[-1].end = max(chapters[-1].start, int(duration))
+    return chapters
+
+
+def parse_chapters_many(descriptions, durations=None):
+    """
+    Parse the chapters of many videos at once.
+
+    Args:
+        descriptions (dict or iterable): Video ID -> description, or an iterable of descriptions
+        durations (dict or iterable, optional): Video durations in seconds, in the same shape as descriptions
+
+    Returns:
+        dict or list: Video ID -> list of Chapters if descriptions is a dict, otherwise a list of chapter lists
+    """
+    if isinstance(descriptions, dict):
+        durations = durations or {}
+        return {video_id: parse_chapters(description, durations.get(video_id))
+                for video_id, description in descriptions.items()}
+    descriptions = list(descriptions)
+    durations = list(durations) if durations is not None else [None] * len(descriptions)
+    return [parse_chapters(description, duration) for description, duration in zip(descriptions, durations)]
+
+
+def chapters_to_dict(chapters):
+    """
+    Convert chapters to the {timestamp: title} dict returned by YouTubeDataExtractor.extract_timestamps.
+
+    Args:
+        chapters (list): Chapter objects
+
+    Returns:
+        dict: Raw timestamp -> title, in start order. For repeated timestamps the first title is kept
+    """
+    timestamps = {}
+    for chapter in chapters:
+        timestamps.setdefault(chapter.timestamp, chapter.title)
+    return timestamps
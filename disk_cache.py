@@ -0,0 +1,228 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+
+
+class DiskCache:
+    """
+    A small persistent key/value cache that stores one JSON file per entry on disk.
+    """
+
+    def __init__(self, cache_dir, ttl=None, max_entries=None, max_bytes=None, compress=False):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory where cache entries are stored
+            ttl (float, optional): Time-to-live of an entry in seconds. None means entries never expire
+            max_entries (int, optional): Maximum number of entries to keep before evicting the oldest
+            max_bytes (int, optional): Maximum total size of the cache directory in bytes
+            compress (bool): Whether to gzip entries on disk
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Create the cache directory if it doesn't exist
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        """
+        Get the file path used to store a key.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            str: Path of the entry file
+        """
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()[:40]
+        extension = ".json.gz" if self.compress else ".json"
+        return os.path.join(self.cache_dir, digest + extension)
+
+    def _is_entry(self, filename):
+        return filename.endswith(".json") or filename.endswith(".json.gz")
+
+    def _open(self, path, mode):
+        if self.compress:
+            return gzip.open(path, mode + 't', encoding='utf-8')
+        return open(path, mode, encoding='utf-8')
+
+    def get(self, key):
+        """
+        Get a value from the cache.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            The cached value or None if the key is missing or expired
+        """
+        path = self._path(key)
+        try:
+            with self._open(path, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if entry.get("key") != key or self._expired(entry):
+            self._count(hit=False)
+            self.delete(key)
+            return None
+
+        # Touch the file so eviction removes the least recently used entries first
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self._count(hit=True)
+        return entry.get("value")
+
+    def _count(self, hit):
+        # The cache is shared by the batch and segment thread pools
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _expired(self, entry):
+        if self.ttl is None:
+            return False
+        return time.time() - entry.get("created", 0) > self.ttl
+
+    def set(self, key, value):
+        """
+        Store a value in the cache and evict old entries if the cache is over its limits.
+
+        Args:
+            key (str): The cache key
+            value: A JSON-serializable value
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with self._open(tmp_path, 'w') as f:
+                json.dump({"key": key, "created": time.time(), "value": value}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing cache entry {key}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        self.evict()
+        return True
+
+    def delete(self, key):
+        """
+        Remove a key from the cache.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            bool: True if an entry was removed, False otherwise
+        """
+        try:
+            os.remove(self._path(key))
+            return True
+        except OSError:
+            return False
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+
+        Returns:
+            int: Number of entries removed
+        """
+        removed = 0
+        for filename in os.listdir(self.cache_dir):
+            if self._is_entry(filename):
+                try:
+                    os.remove(os.path.join(self.cache_dir, filename))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def evict(self):
+        """
+        Evict expired entries, then the least recently used entries until the cache is within
+        its max_entries and max_bytes limits.
+
+        Returns:
+            int: Number of entries removed
+        """
+        if self.ttl is None and self.max_entries is None and self.max_bytes is None:
+            return 0
+
+        with self._lock:
+            entries = []
+            for filename in os.listdir(self.cache_dir):
+                if not self._is_entry(filename):
+                    continue
+                path = os.path.join(self.cache_dir, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            # Oldest (least recently used) first
+            entries.sort()
+            now = time.time()
+            total_bytes = sum(size for _, size, _ in entries)
+            removed = 0
+
+            for mtime, size, path in list(entries):
+                over_count = self.max_entries is not None and len(entries) > self.max_entries
+                over_size = self.max_bytes is not None and total_bytes > self.max_bytes
+                # mtime is refreshed on every read, so an old mtime is a safe lower bound for expiry
+                stale = self.ttl is not None and now - mtime > self.ttl
+                if not (over_count or over_size or stale):
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                entries.remove((mtime, size, path))
+                total_bytes -= size
+                removed += 1
+
+            return removed
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Number of entries, total bytes, hits and misses
+        """
+        entries = 0
+        total_bytes = 0
+        for filename in os.listdir(self.cache_dir):
+            if self._is_entry(filename):
+                entries += 1
+                try:
+                    total_bytes += os.path.getsize(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {"entries": entries, "bytes": total_bytes, "hits": hits, "misses": misses}
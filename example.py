@@ -24,6 +24,10 @@ def main():
     # print("\nPrinting individual transcript snippets:")
     # extractor.print_transcript_snippets(video_id)
     
+    # # Stream the transcript in 5-minute windows without loading it all into memory
+    # for window in extractor.iter_transcript_windows(video_id, window_seconds=300):
+    #     print(f"{window.start:.0f}s - {window.end:.0f}s: {len(window.snippets)} snippets")
+    
     # # Method 4: Get video description
     # print("\nGetting video description:")
     # description = extractor.get_description(video_url)
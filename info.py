@@ -1,9 +1,11 @@
-import yt_dlp
+from ytdlp_pool import YoutubeDLPool
+
+# One long-lived yt-dlp instance with the lean metadata options, reused for every lookup
+ytdlp = YoutubeDLPool(max_size=1)
 
 def get_description(video_url):
-    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-        info = ydl.extract_info(video_url, download=False)
-        return info.get('description', 'No description found')
+    info = ytdlp.extract_info(video_url)
+    return info.get('description', 'No description found')
 
 # Example
 url = 'https://www.youtube.com/watch?v=WAk1u5e9K7A'
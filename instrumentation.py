@@ -0,0 +1,377 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+import contextvars
+
+
+# The video being processed by the current thread or task, attached to every span it records
+_current_video = contextvars.ContextVar("current_video", default=None)
+
+
+class Span:
+    """
+    The timing and attributes of one pipeline stage, e.g. a transcript fetch or a Gemini request.
+    """
+
+    __slots__ = ("stage", "video_id", "attributes", "ok", "error", "timestamp", "seconds", "_started")
+
+    def __init__(self, stage, video_id=None, attributes=None):
+        """
+        Initialize and start the span.
+
+        Args:
+            stage (str): The stage name, e.g. "transcript", "metadata", "gemini" or "csv_write"
+            video_id (str, optional): The video the stage belongs to
+            attributes (dict, optional): Stage-specific values such as token counts or cache hit flags
+        """
+        self.stage = stage
+        self.video_id = video_id
+        self.attributes = dict(attributes or {})
+        self.ok = True
+        self.error = None
+        self.timestamp = time.time()
+        self.seconds = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        """
+        Add or update attributes of the span.
+        """
+        self.attributes.update(attributes)
+
+    def fail(self, error=None):
+        """
+        Mark the stage as failed.
+
+        Args:
+            error (Exception or str, optional): What went wrong
+        """
+        self.ok = False
+        if error is not None:
+            self.error = str(error)
+
+    @property
+    def elapsed(self):
+        """
+        Seconds since the span started, or its duration once it finished.
+        """
+        if self.seconds is not None:
+            return self.seconds
+        return time.perf_counter() - self._started
+
+    def finish(self):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self._started
+
+    def to_record(self):
+        """
+        Get the span as a flat dict for the sinks.
+
+        Returns:
+            dict: event, stage, video_id, timestamp, seconds, ok, error and the span attributes
+        """
+        record = {
+            "event": "span",
+            "stage": self.stage,
+            "video_id": self.video_id,
+            "timestamp": round(self.timestamp, 3),
+            "seconds": round(self.seconds, 6) if self.seconds is not None else None,
+            "ok": self.ok,
+        }
+        if self.error:
+            record["error"] = self.error
+        record.update(self.attributes)
+        return record
+
+
+class MetricTotals:
+    """
+    Running totals of the recorded spans and request counters, per stage and per backend.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.tokens = {"input": 0, "output": 0}
+        self.cached_tokens = {"input": 0, "output": 0}
+        self.first_token_seconds = 0.0
+        self.generation_seconds = 0.0
+        self.generated_tokens = 0
+        self.requests = {}
+
+    def add(self, record):
+        """
+        Add a record emitted by Instrumentation.
+
+        Args:
+            record (dict): A span record or a "requests" record with a backend's scheduler counters
+        """
+        if record.get("event") == "requests":
+            self.requests[record["backend"]] = record
+            return
+        if record.get("event") != "span":
+            return
+
+        stage = self.stages.setdefault(record["stage"], {"count": 0, "seconds": 0.0, "failures": 0,
+                                                         "cache_hits": 0, "cache_lookups": 0, "retries": 0})
+        stage["count"] += 1
+        stage["seconds"] += record.get("seconds") or 0.0
+        stage["failures"] += 0 if record.get("ok", True) else 1
+        stage["retries"] += record.get("retries") or 0
+        if "cache_hit" in record:
+            stage["cache_lookups"] += 1
+            stage["cache_hits"] += 1 if record["cache_hit"] else 0
+        self.tokens["input"] += record.get("input_tokens") or 0
+        self.tokens["output"] += record.get("output_tokens") or 0
+        self.cached_tokens["input"] += record.get("cached_input_tokens") or 0
+        self.cached_tokens["output"] += record.get("cached_output_tokens") or 0
+        if record.get("first_token_seconds") is not None:
+            self.first_token_seconds += record["first_token_seconds"]
+        if record.get("generation_seconds"):
+            self.generation_seconds += record["generation_seconds"]
+            self.generated_tokens += record.get("output_tokens") or 0
+
+
+class JSONLinesSink:
+    """
+    Writes every record as one JSON line to a file or to stdout.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the sink.
+
+        Args:
+            path (str): File the lines are appended to, or "-" for stdout
+        """
+        self.path = path
+        self._file = sys.stdout if path == "-" else open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class PrometheusTextfileSink:
+    """
+    Keeps totals of the records and writes them in the Prometheus text format, for the
+    node_exporter textfile collector.
+
+    The file is rewritten atomically after every processed video and on close.
+    """
+
+    def __init__(self, path, prefix="gigguk"):
+        """
+        Initialize the sink.
+
+        Args:
+            path (str): Path of the .prom file
+            prefix (str): Prefix of the metric names
+        """
+        self.path = path
+        self.prefix = prefix
+        self.totals = MetricTotals()
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        with self._lock:
+            self.totals.add(record)
+            if record.get("stage") == "video":
+                self._write()
+
+    def close(self):
+        with self._lock:
+            self._write()
+
+    def render(self):
+        """
+        Render the totals in the Prometheus text format.
+
+        Returns:
+            str: The metrics
+        """
+        prefix = self.prefix
+        lines = []
+
+        def metric(name, kind, description, samples):
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{label_value}"' for key, label_value in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+        stages = sorted(self.totals.stages.items())
+        lines.append(f"# HELP {prefix}_stage_duration_seconds Time spent in each pipeline stage")
+        lines.append(f"# TYPE {prefix}_stage_duration_seconds summary")
+        for stage, totals in stages:
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {totals["seconds"]:.6f}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {totals["count"]}')
+        metric("stage_failures_total", "counter", "Failed runs of each pipeline stage",
+               [({"stage": stage}, totals["failures"]) for stage, totals in stages])
+        metric("cache_hits_total", "counter", "Cache hits of each pipeline stage",
+               [({"stage": stage}, totals["cache_hits"]) for stage, totals in stages if totals["cache_lookups"]])
+        metric("cache_lookups_total", "counter", "Cache lookups of each pipeline stage",
+               [({"stage": stage}, totals["cache_lookups"]) for stage, totals in stages if totals["cache_lookups"]])
+        metric("stage_retries_total", "counter", "Retried requests of each pipeline stage",
+               [({"stage": stage}, totals["retries"]) for stage, totals in stages if totals["retries"]])
+        metric("gemini_tokens_total", "counter", "Gemini tokens sent and generated",
+               [({"direction": direction}, count) for direction, count in sorted(self.totals.tokens.items())])
+        metric("gemini_cached_tokens_total", "counter", "Estimated Gemini tokens of responses served from the cache",
+               [({"direction": direction}, count) for direction, count in sorted(self.totals.cached_tokens.items())])
+        metric("gemini_first_token_seconds_total", "counter", "Total time until the first streamed chunk",
+               [({}, f"{self.totals.first_token_seconds:.6f}")])
+        metric("gemini_generation_seconds_total", "counter", "Total time spent streaming responses",
+               [({}, f"{self.totals.generation_seconds:.6f}")])
+        metric("gemini_generated_tokens_total", "counter", "Output tokens of streamed (not cached) responses",
+               [({}, self.totals.generated_tokens)])
+        backends = sorted(self.totals.requests.items())
+        for counter in ("calls", "retries", "rate_limited", "failures"):
+            metric(f"requests_{counter}_total", "counter", f"Scheduler {counter.replace('_', ' ')} per backend",
+                   [({"backend": backend}, stats.get(counter, 0)) for backend, stats in backends])
+        return "\n".join(lines) + "\n"
+
+    def _write(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error writing metrics file {self.path}: {str(e)}")
+
+
+class Instrumentation:
+    """
+    Records timing spans of the extraction pipeline and hands them to pluggable sinks.
+
+    A sink is any callable that takes a record dict, e.g. JSONLinesSink or
+    PrometheusTextfileSink; sinks with a close() method are closed by close(). Totals per
+    stage are kept even without sinks, for print_summary.
+    """
+
+    def __init__(self, sinks=None):
+        """
+        Initialize the instrumentation.
+
+        Args:
+            sinks (list, optional): Callables receiving every record
+        """
+        self.sinks = list(sinks or [])
+        self.totals = MetricTotals()
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    @contextlib.contextmanager
+    def video(self, video_id):
+        """
+        Attach spans recorded in this context (thread or asyncio task) to a video.
+
+        Args:
+            video_id (str): The YouTube video ID
+        """
+        token = _current_video.set(video_id)
+        try:
+            yield
+        finally:
+            _current_video.reset(token)
+
+    @contextlib.contextmanager
+    def span(self, stage, video_id=None, **attributes):
+        """
+        Time a pipeline stage. The span is emitted when the block exits and marked as
+        failed if the block raises.
+
+        Args:
+            stage (str): The stage name
+            video_id (str, optional): The video ID. Defaults to the video of the current context
+            **attributes: Initial span attributes
+
+        Yields:
+            Span: The span, to add attributes or mark it as failed
+        """
+        span = Span(stage, video_id or _current_video.get(), attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(e)
+            raise
+        finally:
+            span.finish()
+            self.emit(span.to_record())
+
+    def record_requests(self, scheduler_stats):
+        """
+        Emit the request scheduler's counters, one record per backend.
+
+        Args:
+            scheduler_stats (dict): The output of RequestScheduler.stats()
+        """
+        for backend, stats in scheduler_stats.items():
+            self.emit(dict(stats, event="requests", backend=backend, timestamp=round(time.time(), 3)))
+
+    def emit(self, record):
+        """
+        Hand a record to every sink.
+
+        Args:
+            record (dict): The record
+        """
+        with self._lock:
+            self.totals.add(record)
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception as e:
+                print(f"Error writing metrics: {str(e)}")
+
+    def close(self):
+        """
+        Close every sink that has a close() method.
+        """
+        for sink in self.sinks:
+            close = getattr(sink, "close", None)
+            if close:
+                try:
+                    close()
+                except Exception as e:
+                    print(f"Error closing metrics sink: {str(e)}")
+
+    def print_summary(self):
+        """
+        Print the time spent per stage and the Gemini token totals.
+        """
+        if not self.totals.stages:
+            return
+        print("Stage timings:")
+        for stage, totals in self.totals.stages.items():
+            line = (f"  {stage}: {totals['count']} x {totals['seconds'] / totals['count']:.2f}s avg, "
+                    f"{totals['seconds']:.1f}s total")
+            if totals["cache_lookups"]:
+                line += f", {totals['cache_hits']}/{totals['cache_lookups']} cache hits"
+            if totals["retries"]:
+                line += f", {totals['retries']} retries"
+            if totals["failures"]:
+                line += f", {totals['failures']} failed"
+            print(line)
+        tokens = self.totals.tokens
+        cached_tokens = self.totals.cached_tokens
+        if tokens["input"] or tokens["output"] or cached_tokens["input"] or cached_tokens["output"]:
+            line = f"Gemini tokens: {tokens['input']} in, {tokens['output']} out"
+            if self.totals.generation_seconds:
+                line += f", {self.totals.generated_tokens / self.totals.generation_seconds:.0f} tokens/s generated"
+            if cached_tokens["input"] or cached_tokens["output"]:
+                line += f" (cache hits saved about {cached_tokens['input']} in, {cached_tokens['output']} out)"
+            print(line)
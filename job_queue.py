@@ -0,0 +1,636 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+import contextlib
+
+
+# Pipeline stages of a job, in order. Each one's output (the prompt transcript, the video metadata,
+# the raw Gemini responses, the CSV path) is stored with the job, so a resumed job skips the finished ones
+STAGES = ("transcript", "metadata", "llm", "csv")
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Result of QueueWorker.run_job when the worker lost the lease, so another worker owns the job
+LEASE_LOST = "lease_lost"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    video_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    stages TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    csv_path TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS stage_outputs (
+    video_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    output TEXT NOT NULL,
+    PRIMARY KEY (video_id, stage)
+);
+"""
+
+
+class LeaseLostError(Exception):
+    """
+    Raised inside a worker when its lease on a job expired or was taken over by another worker.
+    """
+
+
+def default_owner():
+    """
+    Get the lease owner name of this process.
+
+    Returns:
+        str: "hostname:pid"
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    A durable queue of videos to extract, backed by a local SQLite file.
+
+    Workers claim a job by taking a lease on it for lease_seconds and renew the lease while
+    they work. A job whose worker crashed is claimed again once its lease expires, and every
+    finished stage is recorded with its output, so the next worker resumes after the last finished stage.
+    Failed jobs are retried with a growing delay until max_attempts is reached.
+
+    Each thread gets its own connection; the database uses WAL mode so workers in several
+    processes can read and claim jobs at the same time.
+    """
+
+    def __init__(self, db_path="jobs.db", lease_seconds=600, max_attempts=3, retry_delay=60):
+        """
+        Initialize the queue and create the database if needed.
+
+        Args:
+            db_path (str): Path of the SQLite database
+            lease_seconds (float): How long a claimed job stays reserved without a renewal
+            max_attempts (int): Number of failed attempts after which a job is marked as failed
+            retry_delay (float): Seconds before a failed job is retried, doubled after every attempt
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same job
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["stages"] = [stage for stage in job["stages"].split(",") if stage]
+        job["stage"] = None
+        for stage in STAGES:
+            if stage not in job["stages"]:
+                break
+            job["stage"] = stage
+        return job
+
+    def enqueue(self, video_ids, requeue=False):
+        """
+        Add videos to the queue.
+
+        Args:
+            video_ids (list): YouTube video IDs
+            requeue (bool): Also reset videos that are already done or failed, so they are extracted again
+
+        Returns:
+            int: Number of jobs added or reset
+        """
+        now = time.time()
+        added = 0
+        with self._transaction() as db:
+            for video_id in video_ids:
+                cursor = db.execute("INSERT OR IGNORE INTO jobs (video_id, created_at, updated_at) VALUES (?, ?, ?)",
+                                    (video_id, now, now))
+                if not cursor.rowcount and requeue:
+                    cursor = db.execute("UPDATE jobs SET status = ?, stages = '', attempts = 0, available_at = 0, "
+                                        "error = NULL, updated_at = ? WHERE video_id = ? AND status IN (?, ?)",
+                                        (PENDING, now, video_id, DONE, FAILED))
+                    if cursor.rowcount:
+                        db.execute("DELETE FROM stage_outputs WHERE video_id = ?", (video_id,))
+                added += cursor.rowcount
+        return added
+
+    def claim(self, owner=None):
+        """
+        Claim the next job: a pending job that is due, or a running job whose lease expired.
+
+        Args:
+            owner (str, optional): Name of the worker. Defaults to "hostname:pid"
+
+        Returns:
+            dict: The job, with 'stages' (finished stages) and 'stage' (the last one of them in
+                pipeline order), or None if no job can be claimed
+        """
+        owner = owner or default_owner()
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT video_id FROM jobs WHERE (status = ? AND available_at <= ?) "
+                             "OR (status = ? AND lease_expires < ?) ORDER BY created_at, video_id LIMIT 1",
+                             (PENDING, now, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                       "updated_at = ? WHERE video_id = ?",
+                       (RUNNING, owner, now + self.lease_seconds, now, row["video_id"]))
+            return self._job(db.execute("SELECT * FROM jobs WHERE video_id = ?", (row["video_id"],)).fetchone())
+
+    def renew(self, video_id, owner):
+        """
+        Extend the lease on a claimed job.
+
+        Returns:
+            bool: False if the worker lost the lease, e.g. because it expired and another worker took the job
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                                "WHERE video_id = ? AND status = ? AND lease_owner = ?",
+                                (now + self.lease_seconds, now, video_id, RUNNING, owner))
+            return cursor.rowcount == 1
+
+    def complete_stage(self, video_id, stage, owner=None, output=None):
+        """
+        Record that a stage of a job finished. If owner is given, the stage is only recorded while
+        that worker holds the lease, and the lease is renewed.
+
+        Args:
+            video_id (str): The YouTube video ID
+            stage (str): One of STAGES
+            owner (str, optional): The worker holding the lease
+            output (optional): JSON-serializable output of the stage, returned by stage_outputs() on resume
+
+        Returns:
+            bool: False if the job doesn't exist or the worker no longer held the lease
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT stages, status, lease_owner FROM jobs WHERE video_id = ?", (video_id,)).fetchone()
+            if row is None or (owner and (row["status"] != RUNNING or row["lease_owner"] != owner)):
+                return False
+            stages = [name for name in row["stages"].split(",") if name]
+            if stage not in stages:
+                stages.append(stage)
+            db.execute("UPDATE jobs SET stages = ?, updated_at = ? WHERE video_id = ?",
+                       (",".join(name for name in STAGES if name in stages), now, video_id))
+            if output is not None:
+                db.execute("INSERT OR REPLACE INTO stage_outputs (video_id, stage, output) VALUES (?, ?, ?)",
+                           (video_id, stage, json.dumps(output, ensure_ascii=False)))
+            if owner:
+                db.execute("UPDATE jobs SET lease_expires = ? WHERE video_id = ?", (now + self.lease_seconds, video_id))
+            return True
+
+    def stage_outputs(self, video_id):
+        """
+        Get the outputs recorded for the finished stages of a job.
+
+        Returns:
+            dict: Stage -> output, for the stages recorded with an output
+        """
+        rows = self._connection().execute("SELECT stage, output FROM stage_outputs WHERE video_id = ?", (video_id,))
+        return {row["stage"]: json.loads(row["output"]) for row in rows}
+
+    def complete(self, video_id, owner, csv_path):
+        """
+        Mark a job as done.
+
+        Returns:
+            bool: False if the worker no longer held the lease
+        """
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = ?, csv_path = ?, error = NULL, lease_owner = NULL, "
+                                "lease_expires = NULL, updated_at = ? WHERE video_id = ? AND lease_owner = ?",
+                                (DONE, csv_path, now, video_id, owner))
+            return cursor.rowcount == 1
+
+    def fail(self, video_id, owner, error):
+        """
+        Record a failed attempt. The job is retried after a delay until max_attempts is reached.
+
+        Returns:
+            bool: False if the worker no longer held the lease
+        """
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT attempts FROM jobs WHERE video_id = ? AND lease_owner = ?",
+                             (video_id, owner)).fetchone()
+            if row is None:
+                return False
+            attempts = row["attempts"]
+            status = FAILED if attempts >= self.max_attempts else PENDING
+            available_at = now + self.retry_delay * 2 ** max(0, attempts - 1)
+            db.execute("UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL, "
+                       "lease_expires = NULL, updated_at = ? WHERE video_id = ?",
+                       (status, str(error), available_at, now, video_id))
+            return True
+
+    def release(self, video_id, owner):
+        """
+        Give a claimed job back without counting the attempt, e.g. when the worker is interrupted.
+        Its finished stages are kept.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET status = ?, attempts = MAX(0, attempts - 1), lease_owner = NULL, "
+                       "lease_expires = NULL, updated_at = ? WHERE video_id = ? AND lease_owner = ?",
+                       (PENDING, now, video_id, owner))
+
+    def retry_failed(self):
+        """
+        Reset every failed job to pending, keeping its finished stages.
+
+        Returns:
+            int: Number of jobs reset
+        """
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = ?, attempts = 0, available_at = 0, updated_at = ? "
+                                "WHERE status = ?", (PENDING, time.time(), FAILED))
+            return cursor.rowcount
+
+    def counts(self):
+        """
+        Count the jobs per status.
+
+        Returns:
+            dict: Status -> number of jobs, for every status
+        """
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for row in self._connection().execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["count"]
+        return counts
+
+    def jobs(self, status=None):
+        """
+        List jobs, oldest first.
+
+        Args:
+            status (str, optional): Only list jobs in this state
+
+        Returns:
+            list: Job dicts
+        """
+        if status:
+            rows = self._connection().execute("SELECT * FROM jobs WHERE status = ? ORDER BY created_at, video_id",
+                                              (status,))
+        else:
+            rows = self._connection().execute("SELECT * FROM jobs ORDER BY created_at, video_id")
+        return [self._job(row) for row in rows]
+
+
+class QueueWorker:
+    """
+    Claims jobs from a JobQueue and runs them through an AnimeExtractor, one at a time.
+    """
+
+    def __init__(self, queue, extractor, owner=None):
+        """
+        Initialize the worker.
+
+        Args:
+            queue (JobQueue): The job queue
+            extractor (AnimeExtractor): The extractor that processes the videos
+            owner (str, optional): Name of the worker in the leases. Defaults to "hostname:pid"
+        """
+        self.queue = queue
+        self.extractor = extractor
+        self.owner = owner or default_owner()
+
+    @contextlib.contextmanager
+    def _heartbeat(self, video_id):
+        # Renew the lease in the background, so a long Gemini request doesn't lose the job.
+        # Yields an event that is set once the lease is lost; the stages check it before recording anything
+        stop = threading.Event()
+        lease_lost = threading.Event()
+
+        def renew():
+            while not stop.wait(self.queue.lease_seconds / 3):
+                if not self.queue.renew(video_id, self.owner):
+                    print(f"Lost the lease on {video_id}")
+                    lease_lost.set()
+                    return
+
+        thread = threading.Thread(target=renew, name=f"lease-{video_id}", daemon=True)
+        thread.start()
+        try:
+            yield lease_lost
+        finally:
+            stop.set()
+            thread.join()
+
+    def run_job(self, job):
+        """
+        Process one claimed job and record the outcome in the queue.
+
+        Args:
+            job (dict): The job returned by JobQueue.claim
+
+        Returns:
+            str: The new status of the job, or LEASE_LOST if another worker took it over
+        """
+        video_id = job["video_id"]
+        if job["stage"]:
+            print(f"Resuming {video_id} after the {job['stage']} stage (attempt {job['attempts']})")
+        else:
+            print(f"Starting {video_id} (attempt {job['attempts']})")
+
+        try:
+            with self._heartbeat(video_id) as lease_lost:
+                csv_path = self._run_stages(job, lease_lost)
+        except (KeyboardInterrupt, SystemExit):
+            # Keep the finished stages and let the next worker pick the job up right away
+            self.queue.release(video_id, self.owner)
+            raise
+        except LeaseLostError:
+            print(f"Stopped {video_id}: another worker owns the job now")
+            return LEASE_LOST
+        except Exception as e:
+            return FAILED if self.queue.fail(video_id, self.owner, e) else LEASE_LOST
+
+        if csv_path:
+            if self.queue.complete(video_id, self.owner, csv_path):
+                return DONE
+            print(f"Could not mark {video_id} as done: another worker owns the job now")
+            return LEASE_LOST
+        return FAILED if self.queue.fail(video_id, self.owner, "extraction failed") else LEASE_LOST
+
+    def _run_stages(self, job, lease_lost):
+        """
+        Run the stages of a job that haven't finished yet, recording each one's output in the queue.
+
+        Args:
+            job (dict): The job returned by JobQueue.claim
+            lease_lost (threading.Event): Set by the heartbeat once the lease is lost
+
+        Returns:
+            str: Path to the saved CSV file or None if a stage failed
+
+        Raises:
+            LeaseLostError: If the lease was lost, before the CSV is saved and registered
+        """
+        video_id = job["video_id"]
+        extractor = self.extractor
+        outputs = self.queue.stage_outputs(video_id)
+        finished = {stage for stage in job["stages"] if stage in outputs}
+
+        def finish(stage, output):
+            if lease_lost.is_set() or not self.queue.complete_stage(video_id, stage, self.owner, output):
+                lease_lost.set()
+                raise LeaseLostError(video_id)
+
+        if "csv" in finished:
+            # The CSV was saved and registered, only the job's completion was lost
+            return outputs["csv"]
+
+        with extractor.instrumentation.video(video_id), extractor.instrumentation.span("video") as span:
+            if "transcript" in finished:
+                transcript = outputs["transcript"]
+            else:
+                transcript = extractor._get_prompt_transcript(video_id)
+                if not transcript:
+                    print(f"Error: Could not retrieve transcript for video {video_id}")
+                    span.fail("could not fetch transcript")
+                    return None
+                finish("transcript", transcript)
+
+            if "metadata" in finished:
+                metadata = outputs["metadata"]
+            else:
+                metadata = extractor._get_metadata(video_id)
+                if metadata:
+                    # Without metadata the title falls back to the video ID, and the stage is retried on resume
+                    metadata = {key: metadata.get(key) for key in ("title", "description", "duration")}
+                    finish("metadata", metadata)
+
+            inputs = extractor._video_inputs(video_id, transcript, metadata)
+            existing_csv = extractor._up_to_date_output(inputs)
+            if existing_csv:
+                finish("csv", existing_csv)
+                return existing_csv
+
+            # Responses recorded by a worker with other extraction options can't be reused
+            llm_options = {"output_format": extractor.output_format, "segment_seconds": extractor.segment_seconds}
+            llm = outputs.get("llm") if "llm" in finished else None
+            if llm and llm["options"] == llm_options:
+                responses = llm["responses"]
+                inputs["model"] = llm["model"]
+                usage = {key: value for key, value in llm["usage"].items() if key == "output_tokens"}
+            else:
+                usage = {}
+                responses = extractor._request_responses(inputs, echo=not extractor.quiet, usage=usage)
+                if responses and all(responses):
+                    finish("llm", {"responses": responses, "model": inputs["model"], "usage": usage,
+                                   "options": llm_options})
+
+            # Saving registers the CSV in the config, index and manifest, so confirm the lease first
+            if lease_lost.is_set() or not self.queue.renew(video_id, self.owner):
+                raise LeaseLostError(video_id)
+            csv_path = extractor._save_responses(inputs, responses, usage=usage)
+            if not csv_path:
+                span.fail("extraction failed")
+                return None
+            finish("csv", csv_path)
+            return csv_path
+
+    def run(self, max_jobs=None, wait=False, poll_seconds=10):
+        """
+        Claim and process jobs until the queue is empty.
+
+        Args:
+            max_jobs (int, optional): Stop after this many jobs
+            wait (bool): Keep polling for new or retried jobs instead of stopping when none is claimable
+            poll_seconds (float): Seconds between polls while waiting
+
+        Returns:
+            dict: Number of jobs per resulting status
+        """
+        results = {DONE: 0, FAILED: 0, LEASE_LOST: 0}
+        while max_jobs is None or sum(results.values()) < max_jobs:
+            job = self.queue.claim(self.owner)
+            if job is None:
+                if not wait:
+                    break
+                time.sleep(poll_seconds)
+                continue
+            status = self.run_job(job)
+            results[status] = results.get(status, 0) + 1
+        return results
+
+
+def _work(db_path, options, worker_options):
+    """
+    Run a worker in this process. Used as the target of the worker processes.
+    """
+    from anime_extractor import AnimeExtractor
+
+    queue = JobQueue(db_path, lease_seconds=worker_options["lease_seconds"])
+    extractor = AnimeExtractor(**options)
+    worker = QueueWorker(queue, extractor)
+    try:
+        results = worker.run(max_jobs=worker_options["max_jobs"], wait=worker_options["wait"])
+    except KeyboardInterrupt:
+        print(f"Worker {worker.owner} interrupted")
+        return
+    finally:
+        extractor.close_instrumentation()
+        queue.close()
+    print(f"Worker {worker.owner}: {results[DONE]} done, {results[FAILED]} failed, "
+          f"{results[LEASE_LOST]} taken over by other workers")
+
+
+def print_status(queue):
+    counts = queue.counts()
+    print(", ".join(f"{count} {status}" for status, count in counts.items()))
+    now = time.time()
+    for job in queue.jobs(RUNNING):
+        print(f"  running {job['video_id']} on {job['lease_owner']}, after stage {job['stage'] or '-'}, "
+              f"lease expires in {job['lease_expires'] - now:.0f}s")
+    for job in queue.jobs(FAILED):
+        print(f"  failed  {job['video_id']} after {job['attempts']} attempts: {job['error']}")
+
+
+def main():
+    """
+    Manage the job queue from the command line.
+    Command-line usage: python job_queue.py enqueue <video_id> ... | work [--processes 4] | status | retry
+    """
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description='Durable job queue for extracting many Gigguk videos')
+    parser.add_argument('--db', default='jobs.db', help='SQLite database of the queue (default: jobs.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue = commands.add_parser('enqueue', help='Add videos to the queue')
+    enqueue.add_argument('video_ids', nargs='*', help='YouTube video ID(s)')
+    enqueue.add_argument('-f', '--file', help='File with one YouTube video ID or URL per line')
+    enqueue.add_argument('--sync', metavar='URL', nargs='?', const='',
+                         help='Add the new matching videos of a channel or playlist (see anime_extractor.py --sync)')
+    enqueue.add_argument('--requeue', action='store_true', help='Extract videos that are already done again')
+
+    work = commands.add_parser('work', help='Process queued videos')
+    work.add_argument('--processes', type=int, default=1, help='Number of worker processes (default: 1)')
+    work.add_argument('--max-jobs', type=int, help='Jobs per worker before it exits')
+    work.add_argument('--wait', action='store_true', help='Keep polling for jobs instead of exiting when none is left')
+    work.add_argument('--lease', type=float, default=600, help='Lease duration in seconds (default: 600)')
+    work.add_argument('--gemini-rpm', type=float, default=10,
+                      help='Gemini requests per minute, shared by all worker processes (default: 10)')
+    work.add_argument('--segmented', type=float, metavar='MINUTES', nargs='?', const=5.0,
+                      help='Use segmented extraction with windows of about MINUTES minutes (default: 5)')
+    work.add_argument('--output-format', choices=['markdown', 'json'], default='markdown')
+    work.add_argument('--no-compact', action='store_true', help='Send the raw caption text to Gemini')
+
+    commands.add_parser('status', help='Show the number of jobs per status, running leases and failures')
+    commands.add_parser('retry', help='Reset failed jobs to pending')
+    args = parser.parse_args()
+
+    queue = JobQueue(args.db)
+
+    if args.command == 'enqueue':
+        from anime_extractor import read_video_ids
+        from youtube_transcript_downloader import YouTubeDataExtractor
+
+        video_ids = [YouTubeDataExtractor.resolve_video_id(video) for video in args.video_ids]
+        if args.file:
+            video_ids.extend(read_video_ids(args.file))
+        if args.sync is not None:
+            from channel_sync import ChannelSync, DEFAULT_SYNC_URL
+
+            new_entries = ChannelSync(YouTubeDataExtractor()).new_videos(args.sync or DEFAULT_SYNC_URL)
+            if new_entries is None:
+                print("ERROR: Could not list the channel or playlist")
+                return
+            video_ids.extend(entry['id'] for entry in new_entries)
+        added = queue.enqueue([video_id for video_id in video_ids if video_id], requeue=args.requeue)
+        print(f"Queued {added} video(s)")
+        print_status(queue)
+
+    elif args.command == 'work':
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        if not os.environ.get("GEMINI_API_KEY"):
+            print("ERROR: Please set the GEMINI_API_KEY environment variable")
+            return
+        processes = max(1, args.processes)
+        options = {
+            "segment_seconds": args.segmented * 60 if args.segmented else None,
+            "output_format": args.output_format,
+            "compact_transcripts": not args.no_compact,
+            "gemini_rate_per_minute": args.gemini_rpm / processes,
+            "quiet": True,
+        }
+        worker_options = {"lease_seconds": args.lease, "max_jobs": args.max_jobs, "wait": args.wait}
+        if processes == 1:
+            _work(args.db, options, worker_options)
+        else:
+            workers = [multiprocessing.Process(target=_work, args=(args.db, options, worker_options))
+                       for _ in range(processes)]
+            for worker in workers:
+                worker.start()
+            try:
+                for worker in workers:
+                    worker.join()
+            except KeyboardInterrupt:
+                # The workers got the same Ctrl-C and give their jobs back
+                for worker in workers:
+                    worker.join()
+        print_status(queue)
+
+    elif args.command == 'status':
+        print_status(queue)
+
+    elif args.command == 'retry':
+        print(f"Reset {queue.retry_failed()} failed job(s)")
+
+
+if __name__ == "__main__":
+    main()
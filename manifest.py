@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+from atomic_io import atomic_write, FileLock
+
+
+def content_hash(text):
+    """
+    Get a short, stable hash of a piece of text.
+
+    Args:
+        text (str): The text to hash. None is treated as an empty string
+
+    Returns:
+        str: SHA-256 hex digest of the text
+    """
+    return hashlib.sha256((text or "").encode('utf-8')).hexdigest()
+
+
+class ExtractionManifest:
+    """
+    A record of the inputs that produced each extracted CSV file.
+
+    The manifest is a JSON file with one entry per output CSV, holding the video ID,
+    a hash of the transcript and description, the Gemini model and the prompt version.
+    Comparing these with the current inputs tells whether a video needs to be processed again.
+    """
+
+    # Entry fields that decide whether an output is up to date
+    FINGERPRINT_FIELDS = ("video_id", "transcript_hash", "description_hash", "model", "prompt_version")
+
+    def __init__(self, manifest_file="extraction_manifest.json"):
+        """
+        Initialize the manifest.
+
+        Args:
+            manifest_file (str): Path to the manifest JSON file
+        """
+        self.manifest_file = manifest_file
+        self._lock = FileLock(f"{manifest_file}.lock")
+
+    def read(self):
+        """
+        Read the manifest file.
+
+        Returns:
+            dict: The manifest with an 'outputs' mapping of CSV filename to entry
+        """
+        try:
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error reading manifest file: {str(e)}")
+        return {"outputs": {}}
+
+    def get_entry(self, csv_filename):
+        """
+        Get the manifest entry of an output CSV.
+
+        Args:
+            csv_filename (str): The CSV filename as registered in the CSV config
+
+        Returns:
+            dict: The entry or None if the output isn't in the manifest
+        """
+        return self.read()["outputs"].get(csv_filename)
+
+    def find_video(self, video_id):
+        """
+        Find the output CSV produced from a video.
+
+        Args:
+            video_id (str): The YouTube video ID
+
+        Returns:
+            tuple: (csv_filename, entry) or (None, None) if the video isn't in the manifest
+        """
+        for csv_filename, entry in self.read()["outputs"].items():
+            if entry.get("video_id") == video_id:
+                return csv_filename, entry
+        return None, None
+
+    def video_ids(self):
+        """
+        Get the IDs of every video recorded in the manifest.
+
+        Returns:
+            set: The video IDs
+        """
+        return {entry.get("video_id") for entry in self.read()["outputs"].values() if entry.get("video_id")}
+
+    def is_up_to_date(self, csv_filename, fingerprint, models=None):
+        """
+        Check whether an output was produced from the given inputs.
+
+        Args:
+            csv_filename (str): The CSV filename
+            fingerprint (dict): The current inputs, with the FINGERPRINT_FIELDS keys
+            models (list, optional): Models whose outputs count as up to date, e.g. the extraction model
+                and its fallback. The entry records the model that answered, which is only known after
+                extraction. Defaults to the fingerprint's model
+
+        Returns:
+            bool: True if the manifest entry matches every fingerprint field
+        """
+        entry = self.get_entry(csv_filename)
+        if not entry:
+            return False
+        if models is None:
+            models = [fingerprint.get("model")]
+        return entry.get("model") in models and all(
+            entry.get(field) == fingerprint.get(field) for field in self.FINGERPRINT_FIELDS if field != "model")
+
+    def record(self, csv_filename, fingerprint, **extra):
+        """
+        Record the inputs that produced an output CSV.
+
+        Args:
+            csv_filename (str): The CSV filename
+            fingerprint (dict): The inputs, with the FINGERPRINT_FIELDS keys
+            **extra: Additional fields to store in the entry, such as the video title
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            with self._lock:
+                manifest = self.read()
+                entry = {field: fingerprint.get(field) for field in self.FINGERPRINT_FIELDS}
+                entry.update(extra)
+                entry["updated"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                manifest["outputs"][csv_filename] = entry
+
+                with atomic_write(self.manifest_file, encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2)
+            return True
+        except Exception as e:
+            print(f"Error updating manifest file: {str(e)}")
+            return False
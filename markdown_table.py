@@ -0,0 +1,233 @@
+import os
+import csv
+import time
+from atomic_io import temporary_path
+
+
+def split_table_row(line):
+    """
+    Split a markdown table row into its cells.
+
+    Args:
+        line (str): A markdown table row, e.g. "| Dandadan | 5:41 | Yes | Great |"
+
+    Returns:
+        list: The cells with leading/trailing whitespace removed
+    """
+    # Split the line by | and remove leading/trailing whitespace from each cell
+    cells = [cell.strip() for cell in line.strip().split('|')]
+    # Remove the empty cell before the first and after the last | (the outer pipes). Empty
+    # cells in between are kept, so the following cells stay in their columns
+    if cells and not cells[0]:
+        cells = cells[1:]
+    if cells and not cells[-1]:
+        cells = cells[:-1]
+    return cells
+
+
+class MarkdownTableParser:
+    """
+    An incremental parser for the markdown table returned by Gemini.
+
+    Text can be fed in arbitrary chunks, as it arrives from a streamed response. Each call
+    to feed() returns the data rows completed by that chunk. Lines before the first table
+    row are skipped, the first table row is the header and a separator row right after it
+    is dropped. Data rows are validated against the header: missing cells are filled with
+    empty strings and extra cells (from a '|' inside a cell) are joined into the last column.
+    """
+
+    def __init__(self):
+        self.header = None
+        self.malformed_rows = 0
+        self._buffer = ""
+        self._table_lines = 0
+
+    def feed(self, text):
+        """
+        Parse the next piece of text.
+
+        Args:
+            text (str): The next chunk of the markdown response
+
+        Returns:
+            list: The data rows completed by this chunk
+        """
+        self._buffer += text
+        if '\n' not in self._buffer:
+            return []
+        lines = self._buffer.split('\n')
+        self._buffer = lines.pop()
+        return self._parse_lines(lines)
+
+    def close(self):
+        """
+        Parse whatever is left after the last newline.
+
+        Returns:
+            list: The data rows in the remaining text
+        """
+        lines = [self._buffer] if self._buffer else []
+        self._buffer = ""
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines):
+        rows = []
+        for line in lines:
+            if '|' not in line:
+                # Lines before the header are skipped; they still count as table lines afterwards
+                if self._table_lines:
+                    self._table_lines += 1
+                continue
+
+            cells = split_table_row(line)
+            self._table_lines += 1
+            if self._table_lines == 1:
+                # This is the header row
+                self.header = cells
+            elif self._table_lines == 2 and cells and all('-' in cell for cell in cells):
+                # This is the separator row, skip it
+                continue
+            elif any(cells):
+                rows.append(self._validate(cells))
+        return rows
+
+    def _validate(self, cells):
+        """
+        Make a data row the same width as the header.
+
+        Args:
+            cells (list): The cells of a data row
+
+        Returns:
+            list: The row with exactly as many cells as the header
+        """
+        width = len(self.header) if self.header else len(cells)
+        if len(cells) == width or width == 0:
+            return cells
+        self.malformed_rows += 1
+        if len(cells) < width:
+            return cells + [''] * (width - len(cells))
+        return cells[:width - 1] + [' | '.join(cells[width - 1:])]
+
+
+def parse_markdown_table(markdown_table):
+    """
+    Parse a complete markdown table into a header and data rows.
+
+    Args:
+        markdown_table (str): The markdown table from Gemini
+
+    Returns:
+        tuple: (header, rows). header is None if no table was found
+    """
+    parser = MarkdownTableParser()
+    rows = parser.feed(markdown_table.strip())
+    rows.extend(parser.close())
+    return parser.header, rows
+
+
+class StreamingCSVWriter:
+    """
+    Writes CSV rows while a markdown table streams in from Gemini.
+
+    Rows go to a temporary file of this process as soon as they are complete. finish() moves the
+    file to its final path; abort() moves it to "<name>.partial.csv" with the rows received so far.
+    """
+
+    def __init__(self, output_path):
+        """
+        Initialize the writer.
+
+        Args:
+            output_path (str): Final path of the CSV file
+        """
+        self.output_path = output_path
+        root, extension = os.path.splitext(output_path)
+        self.partial_path = f"{root}.partial{extension or '.csv'}"
+        self._tmp_path = temporary_path(output_path)
+        self.parser = MarkdownTableParser()
+        self.rows_written = 0
+        self.started = time.perf_counter()
+        self.time_to_first_row = None
+        self._file = None
+        self._writer = None
+
+    @property
+    def header(self):
+        return self.parser.header
+
+    def feed(self, chunk):
+        """
+        Parse a chunk of the streamed response and write the rows it completes.
+
+        Args:
+            chunk (str): The next chunk of the markdown response
+        """
+        self._write_rows(self.parser.feed(chunk))
+
+    def _write_rows(self, rows):
+        if self._writer is None:
+            if self.parser.header is None:
+                return
+            self._file = open(self._tmp_path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(self.parser.header)
+        if not rows:
+            return
+        if self.time_to_first_row is None:
+            self.time_to_first_row = time.perf_counter() - self.started
+        self._writer.writerows(rows)
+        self._file.flush()
+        self.rows_written += len(rows)
+
+    def _close_file(self, complete=True):
+        # An unterminated last line only counts as a row if the response ended normally
+        rows = self.parser.close()
+        if complete:
+            self._write_rows(rows)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """
+        Complete the file after the response ended successfully.
+
+        Returns:
+            bool: True if a table was found and the CSV was moved to its final path, False otherwise
+        """
+        self._close_file()
+        if self._writer is None:
+            return False
+        os.replace(self._tmp_path, self.output_path)
+        # A partial file left by an earlier failed run is out of date now
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        return True
+
+    def abort(self):
+        """
+        Close the file after a failed or cut-off response, keeping the complete rows received so far.
+
+        Returns:
+            str: Path to the partial CSV file or None if no rows were received
+        """
+        self._close_file(complete=False)
+        if self._writer is None:
+            return None
+        os.replace(self._tmp_path, self.partial_path)
+        return self.partial_path
+
+    def stats(self):
+        """
+        Get statistics about the streamed table.
+
+        Returns:
+            dict: rows, malformed_rows, time_to_first_row and total_seconds
+        """
+        return {
+            "rows": self.rows_written,
+            "malformed_rows": self.parser.malformed_rows,
+            "time_to_first_row": self.time_to_first_row,
+            "total_seconds": time.perf_counter() - self.started,
+        }
@@ -0,0 +1,331 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+import threading
+import contextlib
+from atomic_io import atomic_write, FileLock
+from anime_catalog import AnimeCatalog
+from references import (COLUMNS, read_config_files, read_reference_csv, format_source, extract_season,
+                        extract_year, sort_files, excitement_level, build_viewer_index)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    season TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    video_id TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS refs (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    excited TEXT NOT NULL,
+    excited_level TEXT NOT NULL,
+    notes TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_title ON refs (title_key);
+CREATE INDEX IF NOT EXISTS refs_excited ON refs (excited_level);
+CREATE INDEX IF NOT EXISTS refs_source ON refs (source_id, position);
+CREATE INDEX IF NOT EXISTS sources_season ON sources (year, season);
+"""
+
+
+class ReferenceStore:
+    """
+    All extracted references in one SQLite database, indexed by title, season/year and excitement.
+
+    Each CSV file is a source; saving a source replaces its rows in a single transaction, so
+    concurrent writers never see or leave a half-written source. The per-season CSV files the web
+    viewer reads, their csv_config.json entries, the viewer index and the anime catalog can be
+    regenerated from the database with export().
+    """
+
+    def __init__(self, db_path="references.db"):
+        """
+        Initialize the store and create the database if needed.
+
+        Args:
+            db_path (str): Path of the SQLite database
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def save_source(self, filename, rows, video_id=None):
+        """
+        Store the references of one CSV file, replacing any rows stored for it before.
+
+        Args:
+            filename (str): The CSV filename, e.g. "Fall 2024 Anime in a Nutshell_anime_references.csv"
+            rows (list): Row dicts keyed by the CSV columns
+            video_id (str, optional): The video the references were extracted from
+
+        Returns:
+            int: Number of rows stored
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.execute("INSERT INTO sources (file, source, season, year, video_id, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                       "ON CONFLICT (file) DO UPDATE SET video_id = COALESCE(excluded.video_id, video_id), "
+                       "updated_at = excluded.updated_at",
+                       (filename, format_source(filename), extract_season(filename), extract_year(filename),
+                        video_id, now))
+            source_id = db.execute("SELECT id FROM sources WHERE file = ?", (filename,)).fetchone()["id"]
+            db.execute("DELETE FROM refs WHERE source_id = ?", (source_id,))
+            db.executemany(
+                "INSERT INTO refs (source_id, position, title, title_key, timestamp, excited, excited_level, notes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(source_id, position, row.get("Anime Title", ""), row.get("Anime Title", "").lower(),
+                  row.get("Timestamp", ""), row.get("Gigguk Excited?", ""),
+                  excitement_level(row.get("Gigguk Excited?")), row.get("Notes", ""))
+                 for position, row in enumerate(rows)],
+            )
+        return len(rows)
+
+    def save_csv(self, path, video_id=None):
+        """
+        Store the references of an extracted CSV file.
+
+        Args:
+            path (str): Path to the CSV file
+            video_id (str, optional): The video the references were extracted from
+
+        Returns:
+            int: Number of rows stored, or None if the file couldn't be read
+        """
+        try:
+            rows = read_reference_csv(path)
+        except Exception as e:
+            print(f"Error reading {path}: {str(e)}")
+            return None
+        return self.save_source(os.path.basename(path), rows, video_id)
+
+    def import_csv_files(self, config_file="csv_config.json", output_dir="transcripts"):
+        """
+        Store every CSV file listed in the CSV config, e.g. to create the database from existing outputs.
+
+        Args:
+            config_file (str): Path to the CSV configuration file
+            output_dir (str): Directory containing the CSV files
+
+        Returns:
+            dict: CSV filename -> number of rows stored, for the files that could be read
+        """
+        imported = {}
+        for filename in read_config_files(config_file):
+            path = os.path.join(output_dir, filename)
+            if not os.path.exists(path):
+                print(f"Warning: {path} is listed in {config_file} but doesn't exist")
+                continue
+            count = self.save_csv(path)
+            if count is not None:
+                imported[filename] = count
+        return imported
+
+    def remove_source(self, filename):
+        """
+        Delete a CSV file and its references from the store.
+
+        Returns:
+            bool: True if the source existed
+        """
+        with self._transaction() as db:
+            return db.execute("DELETE FROM sources WHERE file = ?", (filename,)).rowcount == 1
+
+    def sources(self):
+        """
+        List the stored CSV files, newest season first.
+
+        Returns:
+            list: Dicts with file, source, season, year, video_id and the number of references
+        """
+        rows = self._connection().execute(
+            "SELECT sources.file, sources.source, sources.season, sources.year, sources.video_id, "
+            "COUNT(refs.id) AS refs FROM sources LEFT JOIN refs ON refs.source_id = sources.id "
+            "GROUP BY sources.id")
+        by_file = {row["file"]: dict(row) for row in rows}
+        return [by_file[filename] for filename in sort_files(list(by_file))]
+
+    def query(self, title=None, season=None, year=None, excited=None, limit=None):
+        """
+        Find references by title, season/year and excitement using the indexes.
+
+        Args:
+            title (str, optional): Case-insensitive title prefix; "%" matches anywhere, e.g. "%frieren"
+            season (str, optional): "Spring", "Summer", "Fall" or "Winter"
+            year (int, optional): The year
+            excited (str, optional): Leading word of the "Gigguk Excited?" value, e.g. "yes", "no" or "neutral"
+            limit (int, optional): Maximum number of references
+
+        Returns:
+            list: Dicts with the CSV columns plus Source, season and year, newest season first
+        """
+        conditions, params = [], []
+        if title:
+            # A prefix range keeps the title index usable; an explicit % falls back to LIKE
+            title_key = title.lower()
+            if "%" in title_key:
+                conditions.append("refs.title_key LIKE ?")
+                params.append(title_key if title_key.endswith("%") else title_key + "%")
+            else:
+                conditions.append("refs.title_key >= ? AND refs.title_key < ?")
+                params.extend([title_key, title_key + "\uffff"])
+        if season:
+            conditions.append("sources.season = ?")
+            params.append(season.capitalize())
+        if year:
+            conditions.append("sources.year = ?")
+            params.append(int(year))
+        if excited:
+            conditions.append("refs.excited_level = ?")
+            params.append(excitement_level(excited))
+        sql = ("SELECT refs.title, refs.timestamp, refs.excited, refs.notes, sources.source, sources.season, "
+               "sources.year FROM refs JOIN sources ON sources.id = refs.source_id")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += (" ORDER BY sources.year DESC, CASE sources.season WHEN 'Spring' THEN 3 WHEN 'Summer' THEN 2 "
+                "WHEN 'Fall' THEN 1 WHEN 'Winter' THEN 0 ELSE -1 END DESC, sources.id, refs.position")
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [
+            {"Anime Title": row["title"], "Timestamp": row["timestamp"], "Gigguk Excited?": row["excited"],
+             "Notes": row["notes"], "Source": row["source"], "season": row["season"], "year": row["year"]}
+            for row in self._connection().execute(sql, params)
+        ]
+
+    def rows(self, filename):
+        """
+        Get the references of one CSV file in their original order.
+
+        Returns:
+            list: Row dicts keyed by the CSV columns
+        """
+        return [
+            {"Anime Title": row["title"], "Timestamp": row["timestamp"], "Gigguk Excited?": row["excited"],
+             "Notes": row["notes"]}
+            for row in self._connection().execute(
+                "SELECT refs.title, refs.timestamp, refs.excited, refs.notes FROM refs "
+                "JOIN sources ON sources.id = refs.source_id WHERE sources.file = ? ORDER BY refs.position",
+                (filename,))
+        ]
+
+    def export(self, output_dir="transcripts", config_file="csv_config.json", index_file="anime_index.json",
+               catalog_file="anime_catalog.json"):
+        """
+        Regenerate the per-season CSV files for the web viewer and register them like the extractor does.
+
+        Every file is written to a temporary file first and then renamed into place, so the
+        viewer never reads a half-written file. Under the same lock extractor processes take to
+        register their outputs, the exported files are added to the CSV config (files that are
+        only in the config keep their place) and the viewer index and anime catalog are rebuilt.
+
+        Args:
+            output_dir (str): Directory the CSV files are written to
+            config_file (str): Path of the CSV configuration file to update
+            index_file (str): Path of the viewer's JSON index to rebuild
+            catalog_file (str): Path of the anime catalog to rebuild
+
+        Returns:
+            list: The exported CSV filenames, newest season first
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        files = [source["file"] for source in self.sources()]
+        for filename in files:
+            with atomic_write(os.path.join(output_dir, filename), newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(COLUMNS)
+                for row in self.rows(filename):
+                    writer.writerow([row[column] for column in COLUMNS])
+
+        with FileLock(f"{config_file}.lock"):
+            config_files = read_config_files(config_file)
+            new_files = [filename for filename in files if filename not in config_files]
+            if new_files or not os.path.exists(config_file):
+                with atomic_write(config_file, encoding='utf-8') as f:
+                    json.dump({"files": config_files + new_files}, f, indent=2)
+            build_viewer_index(config_file, output_dir, index_file)
+            AnimeCatalog(config_file, output_dir, catalog_file).build()
+        return files
+
+
+def main():
+    """
+    Manage the reference database from the command line.
+    Command-line usage: python reference_store.py import | export | query [title] [--season Fall] [--year 2024]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='SQLite storage of the extracted anime references')
+    parser.add_argument('--db', default='references.db', help='SQLite database (default: references.db)')
+    parser.add_argument('--config', default='csv_config.json', help='CSV configuration file (default: csv_config.json)')
+    parser.add_argument('--output-dir', default='transcripts', help='Directory of the CSV files (default: transcripts)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('import', help='Store every CSV file listed in the CSV config')
+    commands.add_parser('export', help='Regenerate the CSV files from the database and register them in the '
+                                       'CSV config, the viewer index and the anime catalog')
+    commands.add_parser('sources', help='List the stored CSV files')
+    query = commands.add_parser('query', help='Find references')
+    query.add_argument('title', nargs='?', help='Title prefix; use %% to match anywhere, e.g. %%frieren')
+    query.add_argument('--season', help='Filter by season, e.g. Fall')
+    query.add_argument('--year', type=int, help='Filter by year')
+    query.add_argument('--excited', help='Filter by excitement, e.g. yes, no or neutral')
+    query.add_argument('--limit', type=int, default=50, help='Maximum number of results (default: 50)')
+    args = parser.parse_args()
+
+    store = ReferenceStore(args.db)
+    if args.command == 'import':
+        imported = store.import_csv_files(args.config, args.output_dir)
+        print(f"Imported {sum(imported.values())} references from {len(imported)} files into {args.db}")
+    elif args.command == 'export':
+        files = store.export(args.output_dir, args.config)
+        print(f"Exported {len(files)} files to {args.output_dir} and {args.config}")
+    elif args.command == 'sources':
+        for source in store.sources():
+            print(f"{source['refs']:>4} references  {source['source']}")
+    else:
+        results = store.query(args.title, season=args.season, year=args.year, excited=args.excited, limit=args.limit)
+        for result in results:
+            print(f"{result['Anime Title']} ({result['Source']}, {result['Timestamp']}) - "
+                  f"{result['Gigguk Excited?']}: {result['Notes']}")
+        print(f"{len(results)} results")
+
+
+if __name__ == "__main__":
+    main()
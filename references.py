@@ -0,0 +1,190 @@
+import os
+import csv
+import json
+import gzip
+import re
+from atomic_io import atomic_write
+
+
+# The columns of every extracted CSV file
+COLUMNS = ["Anime Title", "Timestamp", "Gigguk Excited?", "Notes"]
+
+# Season order used by the web viewer (Spring: 3, Summer: 2, Fall: 1, Winter: 0)
+SEASON_ORDER = {"Spring": 3, "Summer": 2, "Fall": 1, "Winter": 0}
+
+YEAR_PATTERN = re.compile(r'\b(20\d\d)\b')
+
+
+def read_config_files(config_file="csv_config.json"):
+    """
+    Read the list of CSV files registered in the CSV configuration file.
+
+    Args:
+        config_file (str): Path to the CSV configuration file
+
+    Returns:
+        list: The CSV filenames, or an empty list if the file doesn't exist or can't be read
+    """
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            return list(json.load(f).get("files", []))
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"Error reading CSV config file: {str(e)}")
+        return []
+
+
+def format_source(filename):
+    """
+    Format the display name of a CSV file, the same way the web viewer does.
+
+    Args:
+        filename (str): The CSV filename
+
+    Returns:
+        str: The display name, e.g. "Fall 2024 Anime in a Nutshell"
+    """
+    display_name = filename.replace('.csv', '')
+    display_name = display_name.replace('_anime_references', '')
+    return display_name.replace('_', ' ')
+
+
+def extract_year(filename):
+    """
+    Extract the year from a CSV filename.
+
+    Args:
+        filename (str): The CSV filename
+
+    Returns:
+        int: The year or 0 if the filename has no year
+    """
+    match = YEAR_PATTERN.search(filename)
+    return int(match.group(1)) if match else 0
+
+
+def extract_season(filename):
+    """
+    Extract the season from a CSV filename.
+
+    Args:
+        filename (str): The CSV filename
+
+    Returns:
+        str: "Spring", "Summer", "Fall", "Winter" or an empty string
+    """
+    for season in ("Spring", "Summer", "Fall", "Winter"):
+        if season in filename:
+            return season
+    return ""
+
+
+def excitement_level(excited):
+    """
+    Reduce a "Gigguk Excited?" value to its leading word, e.g. "Yes (Intrigued)" -> "yes".
+
+    Args:
+        excited (str): The column value
+
+    Returns:
+        str: The lower-cased first word, or an empty string
+    """
+    words = (excited or "").replace("(", " ").replace("/", " ").split()
+    return words[0].strip(".,!").lower() if words else ""
+
+
+def sort_files(files):
+    """
+    Sort CSV filenames by year (descending), then season (Spring > Summer > Fall > Winter).
+
+    Args:
+        files (list): The CSV filenames
+
+    Returns:
+        list: The sorted filenames
+    """
+    return sorted(files, key=lambda f: (extract_year(f), SEASON_ORDER.get(extract_season(f), -1)), reverse=True)
+
+
+def read_reference_csv(path):
+    """
+    Read the rows of an extracted CSV file.
+
+    Args:
+        path (str): Path to the CSV file
+
+    Returns:
+        list: One dict per row, keyed by column name with surrounding whitespace removed
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return []
+        header = [column.strip() for column in header]
+        return [
+            {column: (row[index].strip() if index < len(row) else '') for index, column in enumerate(header)}
+            for row in reader
+            if any(cell.strip() for cell in row)
+        ]
+
+
+def build_viewer_index(config_file="csv_config.json", output_dir="transcripts", index_file="anime_index.json"):
+    """
+    Build the pre-parsed index the web viewer loads instead of every CSV file.
+
+    The index holds every reference of every CSV listed in the config, with the source,
+    season and year of its file and lower-cased search keys for the title and notes.
+    A gzip copy is written next to it.
+
+    Args:
+        config_file (str): Path to the CSV configuration file
+        output_dir (str): Directory containing the CSV files
+        index_file (str): Path of the JSON index to write
+
+    Returns:
+        str: Path to the index file or None if an error occurred
+    """
+    try:
+        files = []
+        references = {}
+        for filename in read_config_files(config_file):
+            path = os.path.join(output_dir, filename)
+            if not os.path.exists(path):
+                print(f"Warning: {path} is listed in {config_file} but doesn't exist")
+                continue
+
+            source = format_source(filename)
+            season = extract_season(filename)
+            year = extract_year(filename)
+            files.append({"file": filename, "source": source, "season": season, "year": year})
+
+            rows = []
+            for row in read_reference_csv(path):
+                row["Source"] = source
+                row["season"] = season
+                row["year"] = year
+                row["title_key"] = row.get("Anime Title", "").lower()
+                row["notes_key"] = row.get("Notes", "").lower()
+                rows.append(row)
+            references[filename] = rows
+
+        index = {
+            "version": 1,
+            "files": files,
+            "references": references,
+        }
+        data = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        with atomic_write(index_file, 'wb') as f:
+            f.write(data)
+        # mtime=0 keeps the gzip copy byte-identical when the index doesn't change
+        with atomic_write(index_file + ".gz", 'wb') as raw:
+            with gzip.GzipFile(index_file + ".gz", 'wb', compresslevel=9, fileobj=raw, mtime=0) as f:
+                f.write(data)
+
+        return index_file
+    except Exception as e:
+        print(f"Error building viewer index: {str(e)}")
+        return None
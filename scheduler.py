@@ -0,0 +1,487 @@
+import re
+import time
+import random
+import asyncio
+import threading
+
+
+# HTTP status codes worth retrying: rate limits, timeouts and transient server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Error text that marks a rate limit or quota error when no status code is available
+RATE_LIMIT_PATTERN = re.compile(r'\b429\b|RESOURCE_EXHAUSTED|Too Many Requests|rate.?limit|quota', re.IGNORECASE)
+
+# Error text that marks a quota that is used up for the day, e.g. Gemini's
+# "quotaId: GenerateRequestsPerDayPerProjectPerModel-FreeTier". Waiting a few seconds won't help
+DAILY_QUOTA_PATTERN = re.compile(r'per.?day|daily', re.IGNORECASE)
+
+# Error text that marks a transient failure when no status code is available. The gRPC status names are
+# matched case-sensitively, so "Video unavailable" from YouTube isn't mistaken for a server error
+TRANSIENT_PATTERN = re.compile(r'\b50[0234]\b|(?-i:UNAVAILABLE|DEADLINE_EXCEEDED)|timed? ?out|temporar|'
+                               r'Connection (reset|aborted|refused)|Remote end closed', re.IGNORECASE)
+
+# Gemini puts the suggested wait into the error details, e.g. 'retryDelay': '27s'
+RETRY_DELAY_PATTERN = re.compile(r'retryDelay\W+(\d+(?:\.\d+)?)s')
+
+# Exceptions of youtube-transcript-api that are rate limits, matched by name to avoid version-specific imports
+RATE_LIMIT_EXCEPTIONS = {"TooManyRequests", "RequestBlocked"}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised when a backend's circuit breaker is open and calls are rejected without being attempted.
+    """
+
+
+def _status_code(error):
+    for attribute in ("code", "status_code", "status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_rate_limit(error):
+    """
+    Check whether an error means the backend is throttling us.
+
+    Args:
+        error (Exception): The error raised by a call
+
+    Returns:
+        bool: True for 429 / quota errors
+    """
+    if type(error).__name__ in RATE_LIMIT_EXCEPTIONS or _status_code(error) == 429:
+        return True
+    return bool(RATE_LIMIT_PATTERN.search(str(error)))
+
+
+def is_quota_exhausted(error):
+    """
+    Check whether an error means the backend's daily quota is used up.
+
+    Args:
+        error (Exception): The error raised by a call
+
+    Returns:
+        bool: True for rate limit errors that name a daily quota
+    """
+    return is_rate_limit(error) and bool(DAILY_QUOTA_PATTERN.search(str(error)))
+
+
+def is_retryable(error):
+    """
+    Check whether a failed call may succeed when retried.
+
+    Rate limits, timeouts, connection errors and 5xx responses are retryable. Errors such as
+    a missing transcript, an unavailable video, an invalid request or an exhausted daily quota are not.
+
+    Args:
+        error (Exception): The error raised by a call
+
+    Returns:
+        bool: True if the call should be retried
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    # Errors can opt out (or in) explicitly
+    retryable = getattr(error, "retryable", None)
+    if retryable is not None:
+        return bool(retryable)
+    if is_quota_exhausted(error):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)) or is_rate_limit(error):
+        return True
+    status_code = _status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    return bool(TRANSIENT_PATTERN.search(str(error)))
+
+
+def retry_after(error):
+    """
+    Get the wait suggested by the backend in a rate limit error.
+
+    Args:
+        error (Exception): The error raised by a call
+
+    Returns:
+        float: Seconds to wait, or None if the error doesn't say
+    """
+    match = RETRY_DELAY_PATTERN.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that adapts its rate to the backend's quota.
+
+    The bucket starts at max_rate. Every rate limit error halves the rate (down to min_rate)
+    and every successful call adds back a small step, so a batch settles just below the
+    rate the quota actually allows instead of repeatedly hitting it.
+    """
+
+    def __init__(self, max_rate, burst=1, min_rate=None, recovery=0.05):
+        """
+        Initialize the bucket.
+
+        Args:
+            max_rate (float): Maximum number of calls per second
+            burst (int): Number of calls that may start at once after an idle period
+            min_rate (float, optional): Lowest rate the bucket backs off to. Defaults to a tenth of max_rate
+            recovery (float): Fraction of max_rate added back after each successful call
+        """
+        self.max_rate = max_rate
+        self.min_rate = min_rate or max_rate / 10
+        self.rate = max_rate
+        self.burst = max(1, burst)
+        self.recovery = recovery
+        self.tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, borrowing it from the future if the bucket is empty.
+
+        Returns:
+            float: Seconds the caller has to wait before making its call
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def acquire(self):
+        """
+        Wait for a token.
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def throttle(self, pause=None):
+        """
+        Slow down after a rate limit error.
+
+        Args:
+            pause (float, optional): Seconds during which no token is handed out
+        """
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if pause:
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+    def recover(self):
+        """
+        Speed back up after a successful call.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * self.recovery)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a backend after repeated failures.
+
+    After failure_threshold consecutive retryable failures the circuit opens and calls are
+    rejected for reset_timeout seconds. The next call after that is let through as a probe:
+    success closes the circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a probe call is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call may be made.
+
+        Returns:
+            bool: False while the circuit is open
+        """
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return self.state == self.CLOSED
+
+    def is_open(self):
+        """
+        Check whether calls are being rejected, without letting a probe call through.
+
+        Returns:
+            bool: True while the circuit is open
+        """
+        with self._lock:
+            return self.state == self.OPEN
+
+    def release_probe(self):
+        """
+        Give back the probe call of a half-open circuit whose outcome says nothing about the
+        backend's health (e.g. an invalid request), so the next call is let through as the probe.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def trip(self):
+        """
+        Open the circuit straight away, e.g. when the backend's quota is used up.
+        """
+        with self._lock:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class Backend:
+    """
+    The rate limit, retry policy, circuit breaker and counters of one backend.
+    """
+
+    def __init__(self, name, rate_per_minute, burst=1, max_retries=5, base_delay=1.0, max_delay=60.0,
+                 failure_threshold=5, reset_timeout=60.0):
+        """
+        Initialize the backend.
+
+        Args:
+            name (str): The backend name, e.g. "youtube" or "gemini:<model>"
+            rate_per_minute (float): Maximum number of calls per minute
+            burst (int): Number of calls that may start at once after an idle period
+            max_retries (int): Retries of a retryable error before giving up
+            base_delay (float): Backoff before the first retry in seconds
+            max_delay (float): Upper bound of the backoff in seconds
+            failure_threshold (int): Consecutive failures that open the circuit breaker
+            reset_timeout (float): Seconds the circuit breaker stays open
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst=burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+        # The scheduler is shared by the batch and segment thread pools
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt, error):
+        """
+        Get the wait before the next attempt: exponential backoff with full jitter.
+
+        Args:
+            attempt (int): The number of the failed attempt, starting at 1
+            error (Exception): The error of the failed attempt
+
+        Returns:
+            float: Seconds to wait
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        suggested = retry_after(error)
+        if suggested is not None:
+            delay = max(delay, min(suggested, self.max_delay))
+        return delay
+
+    def _start(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open after {self.breaker.failures} consecutive failures")
+        self._count(calls=1)
+        return self.bucket.reserve()
+
+    def _succeeded(self):
+        self.breaker.record_success()
+        self.bucket.recover()
+
+    def _failed(self, error, attempt):
+        """
+        Record a failed attempt.
+
+        Returns:
+            float: Seconds to wait before retrying, or None if the error should be raised
+        """
+        if is_quota_exhausted(error):
+            # Retrying won't help until the quota resets. Opening the circuit sends the following
+            # calls straight to the fallback model instead of spending a request on each of them
+            self._count(rate_limited=1, failures=1)
+            self.breaker.trip()
+            return None
+        if not is_retryable(error):
+            # The backend answered, so this doesn't count for or against the circuit breaker
+            self.breaker.release_probe()
+            return None
+        self.breaker.record_failure()
+        if is_rate_limit(error):
+            self._count(rate_limited=1)
+            self.bucket.throttle(retry_after(error))
+        if attempt > self.max_retries or self.breaker.is_open():
+            self._count(failures=1)
+            return None
+        self._count(retries=1)
+        return self.backoff(attempt, error)
+
+    def _count(self, calls=0, retries=0, rate_limited=0, failures=0):
+        with self._lock:
+            self.calls += calls
+            self.retries += retries
+            self.rate_limited += rate_limited
+            self.failures += failures
+
+    def stats(self):
+        """
+        Get the backend's counters.
+
+        Returns:
+            dict: calls, retries, rate_limited, failures, the current rate per minute and circuit state
+        """
+        with self._lock:
+            counters = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failures": self.failures,
+            }
+        return {
+            **counters,
+            "rate_per_minute": round(self.bucket.rate * 60, 1),
+            "circuit": self.breaker.state,
+        }
+
+
+class RequestScheduler:
+    """
+    Runs calls to external backends (YouTube, Gemini) under a per-backend rate limit,
+    retry policy and circuit breaker.
+
+    Retryable errors (rate limits, timeouts, 5xx) are retried with exponential backoff and
+    jitter; any other error is raised straight away. Once a backend's circuit is open,
+    calls raise CircuitOpenError without being attempted.
+    """
+
+    def __init__(self):
+        self.backends = {}
+        self._lock = threading.Lock()
+
+    def add_backend(self, name, rate_per_minute, **options):
+        """
+        Register a backend, unless one with the same name already exists.
+
+        Args:
+            name (str): The backend name
+            rate_per_minute (float): Maximum number of calls per minute
+            **options: Other Backend arguments (burst, max_retries, base_delay, max_delay, ...)
+
+        Returns:
+            Backend: The registered backend
+        """
+        with self._lock:
+            if name not in self.backends:
+                self.backends[name] = Backend(name, rate_per_minute, **options)
+            return self.backends[name]
+
+    def call(self, name, func, *args, **kwargs):
+        """
+        Call a function under the limits of a backend.
+
+        Args:
+            name (str): The backend name
+            func (callable): The function making the request
+            *args, **kwargs: Arguments for the function
+
+        Returns:
+            The function's return value
+
+        Raises:
+            CircuitOpenError: If the backend's circuit is open
+            Exception: The last error if it isn't retryable or the retries ran out
+        """
+        backend = self.backends[name]
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = backend._start()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                delay = backend._failed(e, attempt)
+                if delay is None:
+                    raise
+                print(f"{name}: {str(e)[:200]} - retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            backend._succeeded()
+            return result
+
+    async def call_async(self, name, func, *args, **kwargs):
+        """
+        Async version of call for coroutine functions.
+
+        Args:
+            name (str): The backend name
+            func (callable): The coroutine function making the request
+            *args, **kwargs: Arguments for the function
+
+        Returns:
+            The coroutine's return value
+        """
+        backend = self.backends[name]
+        attempt = 0
+        while True:
+            attempt += 1
+            wait = backend._start()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                delay = backend._failed(e, attempt)
+                if delay is None:
+                    raise
+                print(f"{name}: {str(e)[:200]} - retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            backend._succeeded()
+            return result
+
+    def stats(self):
+        """
+        Get the counters of every backend.
+
+        Returns:
+            dict: Backend name -> Backend.stats()
+        """
+        return {name: backend.stats() for name, backend in self.backends.items()}
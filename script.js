@@ -138,6 +138,12 @@ document.addEventListener('DOMContentLoaded', () => {
     async function loadCSVList() {
         loading.classList.remove('hidden');
         
+        // Prefer the pre-built index, which holds every CSV already parsed
+        if (await loadIndex()) {
+            hideLoading();
+            return;
+        }
+        
         try {
             // Get list of CSV files from the config file
             const response = await fetch('csv_config.json');
@@ -183,6 +189,34 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    async function loadIndex() {
+        try {
+            const response = await fetch('anime_index.json');
+            
+            if (!response.ok) {
+                return false;
+            }
+            
+            const index = await response.json();
+            const files = index.files.map(entry => entry.file);
+            
+            allAnimeData = index.references;
+            populateSelect(files);
+            
+            console.log(`Loaded ${files.length} videos from the index`);
+            
+            // Load the first CSV by default for display
+            if (files.length > 0) {
+                csvSelect.value = files[0];
+                loadSelectedCSV();
+            }
+            return true;
+        } catch (error) {
+            console.warn('Could not load the index, falling back to CSV files:', error);
+            return false;
+        }
+    }
+    
     async function loadAllCSVFiles(files) {
         try {
             const promises = files.map(async (file) => {
@@ -429,8 +463,8 @@ document.addEventListener('DOMContentLoaded', () => {
             filteredData = combinedData.filter(anime => {
                 // Filter by search term if there is one
                 const matchesSearch = searchTerm.length === 0 || 
-                    anime['Anime Title']?.toLowerCase().includes(searchTerm) ||
-                    anime['Notes']?.toLowerCase().includes(searchTerm);
+                    (anime.title_key ?? anime['Anime Title']?.toLowerCase())?.includes(searchTerm) ||
+                    (anime.notes_key ?? anime['Notes']?.toLowerCase())?.includes(searchTerm);
                 
                 // Filter by excitement level
                 const matchesExcitement = 
@@ -446,8 +480,8 @@ document.addEventListener('DOMContentLoaded', () => {
             filteredData = animeData.filter(anime => {
                 // Filter by search term if there is one
                 const matchesSearch = searchTerm.length === 0 || 
-                    anime['Anime Title']?.toLowerCase().includes(searchTerm) ||
-                    anime['Notes']?.toLowerCase().includes(searchTerm);
+                    (anime.title_key ?? anime['Anime Title']?.toLowerCase())?.includes(searchTerm) ||
+                    (anime.notes_key ?? anime['Notes']?.toLowerCase())?.includes(searchTerm);
                 
                 // Filter by excitement level
                 const matchesExcitement = 
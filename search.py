@@ -0,0 +1,333 @@
+import os
+import re
+import math
+import time
+import bisect
+import threading
+from collections import defaultdict
+from references import (read_config_files, read_reference_csv, format_source, extract_season, extract_year)
+
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# How much a match in each field counts towards the score
+FIELD_WEIGHTS = {"Anime Title": 3.0, "Notes": 1.0}
+
+# How much each kind of term match counts relative to an exact match
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.6
+FUZZY_MATCH = 0.4
+
+
+def tokenize(text):
+    """
+    Split text into lower-cased word tokens.
+
+    Args:
+        text (str): The text to tokenize
+
+    Returns:
+        list: The tokens
+    """
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def _deletes(term):
+    """
+    Get every string obtained by deleting one character from a term.
+
+    Args:
+        term (str): The term
+
+    Returns:
+        set: The single-deletion variants of the term
+    """
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class ReferenceSearchIndex:
+    """
+    An inverted index over the title and notes of every anime reference in the extracted CSV files.
+
+    Supports exact, prefix and typo-tolerant (one edit) term matching, filters on the
+    "Gigguk Excited?" column and on season/year, and ranked, paginated results. The index
+    is kept in sync with csv_config.json: newly registered, changed and removed CSV files
+    are indexed or dropped individually instead of rebuilding everything.
+    """
+
+    def __init__(self, config_file="csv_config.json", output_dir="transcripts", sync_interval=1.0):
+        """
+        Initialize the index and index every CSV file listed in the config.
+
+        Args:
+            config_file (str): Path to the CSV configuration file
+            output_dir (str): Directory containing the CSV files
+            sync_interval (float): Minimum number of seconds between two checks for changed files in search()
+        """
+        self.config_file = config_file
+        self.output_dir = output_dir
+        self.sync_interval = sync_interval
+
+        self.documents = {}                  # doc_id -> reference row
+        self.postings = defaultdict(dict)    # term -> {doc_id: weighted term frequency}
+        self.file_documents = {}             # CSV filename -> list of doc_ids
+        self.file_mtimes = {}                # CSV filename -> mtime when indexed
+        self._next_doc_id = 0
+        self._vocabulary = None              # sorted list of terms, rebuilt lazily
+        self._delete_map = None              # single-deletion variant -> set of terms, rebuilt lazily
+        self._last_sync = 0.0
+        self._lock = threading.RLock()
+
+        self.sync(force=True)
+
+    def sync(self, force=False):
+        """
+        Bring the index up to date with the CSV files listed in the config.
+
+        Args:
+            force (bool): Check the files even if the last check was less than sync_interval ago
+
+        Returns:
+            dict: Lists of the 'added', 'updated' and 'removed' CSV filenames
+        """
+        with self._lock:
+            now = time.monotonic()
+            changes = {"added": [], "updated": [], "removed": []}
+            if not force and now - self._last_sync < self.sync_interval:
+                return changes
+            self._last_sync = now
+
+            files = []
+            for filename in read_config_files(self.config_file):
+                path = os.path.join(self.output_dir, filename)
+                try:
+                    files.append((filename, os.path.getmtime(path)))
+                except OSError:
+                    continue
+
+            current = {filename for filename, _ in files}
+            for filename in list(self.file_documents):
+                if filename not in current:
+                    self._remove_file(filename)
+                    changes["removed"].append(filename)
+
+            for filename, mtime in files:
+                if filename not in self.file_documents:
+                    self._add_file(filename, mtime)
+                    changes["added"].append(filename)
+                elif self.file_mtimes.get(filename) != mtime:
+                    self._remove_file(filename)
+                    self._add_file(filename, mtime)
+                    changes["updated"].append(filename)
+
+            return changes
+
+    def _add_file(self, filename, mtime):
+        """
+        Index every reference of a CSV file.
+
+        Args:
+            filename (str): The CSV filename
+            mtime (float): Modification time of the file
+        """
+        try:
+            rows = read_reference_csv(os.path.join(self.output_dir, filename))
+        except Exception as e:
+            print(f"Error indexing {filename}: {str(e)}")
+            rows = []
+
+        source = format_source(filename)
+        season = extract_season(filename)
+        year = extract_year(filename)
+
+        doc_ids = []
+        for row in rows:
+            doc_id = self._next_doc_id
+            self._next_doc_id += 1
+            row.update({"Source": source, "file": filename, "season": season, "year": year})
+            self.documents[doc_id] = row
+            doc_ids.append(doc_id)
+
+            for field, weight in FIELD_WEIGHTS.items():
+                for term in tokenize(row.get(field)):
+                    postings = self.postings[term]
+                    postings[doc_id] = postings.get(doc_id, 0.0) + weight
+
+        self.file_documents[filename] = doc_ids
+        self.file_mtimes[filename] = mtime
+        self._vocabulary = None
+        self._delete_map = None
+
+    def _remove_file(self, filename):
+        """
+        Remove every reference of a CSV file from the index.
+
+        Args:
+            filename (str): The CSV filename
+        """
+        doc_ids = self.file_documents.pop(filename, [])
+        self.file_mtimes.pop(filename, None)
+        for doc_id in doc_ids:
+            row = self.documents.pop(doc_id, None)
+            if not row:
+                continue
+            for field in FIELD_WEIGHTS:
+                for term in tokenize(row.get(field)):
+                    postings = self.postings.get(term)
+                    if postings is None:
+                        continue
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self.postings[term]
+        self._vocabulary = None
+        self._delete_map = None
+
+    def _ensure_term_lookups(self):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        if self._delete_map is None:
+            delete_map = defaultdict(set)
+            for term in self._vocabulary:
+                if len(term) >= 4:
+                    for variant in _deletes(term):
+                        delete_map[variant].add(term)
+            self._delete_map = delete_map
+
+    def _expand_term(self, term, prefix=True, fuzzy=True):
+        """
+        Find the indexed terms a query term matches.
+
+        Args:
+            term (str): The query term
+            prefix (bool): Also match indexed terms starting with the query term
+            fuzzy (bool): Also match indexed terms within one edit of the query term
+
+        Returns:
+            dict: Indexed term -> match weight
+        """
+        self._ensure_term_lookups()
+        matches = {}
+        if term in self.postings:
+            matches[term] = EXACT_MATCH
+
+        if prefix and len(term) >= 2:
+            start = bisect.bisect_left(self._vocabulary, term)
+            for candidate in self._vocabulary[start:]:
+                if not candidate.startswith(term):
+                    break
+                matches.setdefault(candidate, PREFIX_MATCH)
+
+        if fuzzy and len(term) >= 4 and not matches:
+            # Terms sharing a single-deletion variant are one edit apart (SymSpell-style lookup)
+            candidates = set(self._delete_map.get(term, ()))
+            for variant in _deletes(term):
+                if variant in self.postings:
+                    candidates.add(variant)
+                candidates.update(self._delete_map.get(variant, ()))
+            for candidate in candidates:
+                matches.setdefault(candidate, FUZZY_MATCH)
+
+        return matches
+
+    def search(self, query="", excited=None, season=None, year=None, file=None, page=1, per_page=20,
+               prefix=True, fuzzy=True):
+        """
+        Search the anime references.
+
+        Every query term has to match the title or notes of a reference. Results are ranked
+        by the sum of the term scores, weighted by field and term rarity, then by recency.
+
+        Args:
+            query (str): The search text. An empty query matches every reference
+            excited (str, optional): Only keep references whose "Gigguk Excited?" value contains this text,
+                as the viewer's excitement filter does ("Yes", "Neutral", "No")
+            season (str, optional): Only keep references from this season ("Spring", "Summer", "Fall", "Winter")
+            year (int, optional): Only keep references from this year
+            file (str, optional): Only keep references from this CSV file
+            page (int): The 1-based page number
+            per_page (int): Number of results per page
+            prefix (bool): Enable prefix matching of query terms
+            fuzzy (bool): Enable typo-tolerant matching of query terms
+
+        Returns:
+            dict: total, page, per_page and results (reference rows with their score)
+        """
+        with self._lock:
+            self.sync()
+
+            terms = tokenize(query)
+            total_documents = max(len(self.documents), 1)
+            if terms:
+                scores = None
+                for term in terms:
+                    term_scores = defaultdict(float)
+                    for indexed_term, match_weight in self._expand_term(term, prefix, fuzzy).items():
+                        postings = self.postings[indexed_term]
+                        idf = math.log(1 + total_documents / len(postings))
+                        for doc_id, frequency in postings.items():
+                            term_scores[doc_id] = max(term_scores[doc_id], match_weight * frequency * idf)
+                    if scores is None:
+                        scores = dict(term_scores)
+                    else:
+                        scores = {doc_id: score + term_scores[doc_id]
+                                  for doc_id, score in scores.items() if doc_id in term_scores}
+                    if not scores:
+                        break
+                scores = scores or {}
+            else:
+                scores = {doc_id: 0.0 for doc_id in self.documents}
+
+            matches = []
+            for doc_id, score in scores.items():
+                row = self.documents[doc_id]
+                if excited and excited not in row.get("Gigguk Excited?", ""):
+                    continue
+                if season and row["season"].lower() != season.lower():
+                    continue
+                if year and row["year"] != int(year):
+                    continue
+                if file and row["file"] != file:
+                    continue
+                matches.append((-score, -row["year"], doc_id))
+            matches.sort()
+
+            page = max(1, int(page))
+            per_page = max(1, int(per_page))
+            start = (page - 1) * per_page
+            results = []
+            for negative_score, _, doc_id in matches[start:start + per_page]:
+                result = dict(self.documents[doc_id])
+                result["score"] = round(-negative_score, 4)
+                results.append(result)
+
+            return {"total": len(matches), "page": page, "per_page": per_page, "results": results}
+
+
+def main():
+    """
+    Search the extracted anime references from the command line.
+    Command-line usage: python search.py <query> [--excited Yes] [--season Fall] [--year 2024]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Search anime references across all Gigguk videos')
+    parser.add_argument('query', nargs='*', help='Search terms')
+    parser.add_argument('--excited', help='Filter by excitement, e.g. Yes, Neutral or No')
+    parser.add_argument('--season', help='Filter by season, e.g. Fall')
+    parser.add_argument('--year', type=int, help='Filter by year')
+    parser.add_argument('--page', type=int, default=1, help='Page number (default: 1)')
+    parser.add_argument('--per-page', type=int, default=20, help='Results per page (default: 20)')
+    args = parser.parse_args()
+
+    index = ReferenceSearchIndex()
+    response = index.search(" ".join(args.query), excited=args.excited, season=args.season, year=args.year,
+                            page=args.page, per_page=args.per_page)
+
+    print(f"{response['total']} results (page {response['page']})")
+    for result in response["results"]:
+        print(f"[{result['score']:>7}] {result['Anime Title']} ({result['Source']}, {result['Timestamp']}) - "
+              f"{result['Gigguk Excited?']}: {result['Notes']}")
+
+
+if __name__ == "__main__":
+    main()
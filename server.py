@@ -0,0 +1,371 @@
+import os
+import json
+import gzip
+import hashlib
+import mimetypes
+import posixpath
+import threading
+from urllib.parse import urlsplit, parse_qs, unquote
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from references import read_config_files, sort_files, format_source, extract_season, extract_year, build_viewer_index
+from search import ReferenceSearchIndex
+
+
+# The web viewer's files and directories. Nothing else in the project directory is served,
+# e.g. extraction_manifest.json, the caches or the job and reference databases
+VIEWER_FILES = {"index.html", "script.js", "styles.css", "csv_config.json", "anime_index.json"}
+VIEWER_DIRECTORIES = {"static", "transcripts"}
+
+# File types the server is allowed to serve from the viewer's files
+STATIC_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".csv": "text/csv; charset=utf-8",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".svg": "image/svg+xml",
+    ".ico": "image/x-icon",
+}
+
+# Types worth compressing; images are already compressed
+COMPRESSIBLE_TYPES = {".html", ".css", ".js", ".json", ".csv", ".svg"}
+
+# Pages and data change whenever a video is extracted, and scripts and styles are loaded from
+# unversioned URLs, so browsers revalidate all of them with the ETag
+REVALIDATE_TYPES = {".html", ".css", ".js", ".json", ".csv"}
+
+# Responses smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 512
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header against an ETag using the weak comparison the header calls for.
+
+    Args:
+        if_none_match (str): The header value, e.g. '"abc", W/"def"' or '*'
+        etag (str): The strong ETag of the file
+
+    Returns:
+        bool: True if any listed tag matches, ignoring the W/ prefix of weak tags
+    """
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+class StaticFile:
+    """
+    A static file loaded into memory, with its ETag and gzip variant.
+
+    The gzip variant has its own ETag, since a strong ETag identifies the exact bytes sent.
+    """
+
+    __slots__ = ("path", "mtime_ns", "size", "body", "gzip_body", "etag", "gzip_etag", "content_type",
+                 "cache_control")
+
+    def __init__(self, path, content_type, cache_control):
+        """
+        Load a file and prepare its gzip variant.
+
+        Args:
+            path (str): Path to the file
+            content_type (str): The Content-Type header value
+            cache_control (str): The Cache-Control header value
+        """
+        stat = os.stat(path)
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        with open(path, 'rb') as f:
+            self.body = f.read()
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+        self.gzip_etag = self.etag[:-1] + '-gz"'
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.gzip_body = None
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension in COMPRESSIBLE_TYPES and self.size >= MIN_COMPRESS_BYTES:
+            # Use a precompressed .gz file next to the original if it is up to date
+            gzip_path = path + ".gz"
+            if os.path.exists(gzip_path) and os.stat(gzip_path).st_mtime_ns >= self.mtime_ns:
+                with open(gzip_path, 'rb') as f:
+                    self.gzip_body = f.read()
+            else:
+                self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+    def is_current(self):
+        """
+        Check whether the file on disk is unchanged since it was loaded.
+
+        Returns:
+            bool: True if the file wasn't modified
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+
+class ViewerRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves the web viewer's static files and the JSON query API.
+
+    API endpoints:
+        GET /api/seasons     List every extracted video with its season, year and number of references
+        GET /api/references  Search references. Query parameters: q, excited, season, year, file, page, per_page
+    """
+
+    server_version = "GiggukViewer/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        try:
+            if path == "/api/seasons":
+                self._send_json(self.server.list_seasons(), send_body)
+            elif path == "/api/references":
+                self._send_json(self._search(parse_qs(url.query)), send_body)
+            elif path.startswith("/api/"):
+                self._send_json({"error": "Unknown endpoint"}, send_body, HTTPStatus.NOT_FOUND)
+            else:
+                self._send_static(path, send_body)
+        except ValueError as e:
+            self._send_json({"error": str(e)}, send_body, HTTPStatus.BAD_REQUEST)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _search(self, params):
+        def param(name, default=None):
+            values = params.get(name)
+            return values[0] if values else default
+
+        year = param("year")
+        try:
+            page = int(param("page", 1))
+            per_page = min(int(param("per_page", 50)), 500)
+            year = int(year) if year else None
+        except ValueError:
+            raise ValueError("page, per_page and year must be integers")
+
+        return self.server.search_index.search(
+            param("q", ""),
+            excited=param("excited"),
+            season=param("season"),
+            year=year,
+            file=param("file"),
+            page=page,
+            per_page=per_page,
+        )
+
+    def _accepts_gzip(self):
+        return "gzip" in self.headers.get("Accept-Encoding", "")
+
+    def _send_json(self, payload, send_body, status=HTTPStatus.OK):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressed = self._accepts_gzip() and len(body) >= MIN_COMPRESS_BYTES
+        if compressed:
+            body = gzip.compress(body, compresslevel=6)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_static(self, path, send_body):
+        static_file = self.server.get_static_file(path)
+        if static_file is None:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return
+
+        use_gzip = static_file.gzip_body is not None and self._accepts_gzip()
+        body = static_file.gzip_body if use_gzip else static_file.body
+        etag = static_file.gzip_etag if use_gzip else static_file.etag
+
+        not_modified = etag_matches(self.headers.get("If-None-Match", ""), etag)
+
+        self.send_response(HTTPStatus.NOT_MODIFIED if not_modified else HTTPStatus.OK)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", static_file.cache_control)
+        if static_file.gzip_body is not None:
+            self.send_header("Vary", "Accept-Encoding")
+        if not_modified:
+            self.end_headers()
+            return
+
+        self.send_header("Content-Type", static_file.content_type)
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class ViewerServer(ThreadingHTTPServer):
+    """
+    A multi-threaded HTTP server for the web viewer with in-memory static file and search caches.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, root=".", config_file="csv_config.json", output_dir="transcripts",
+                 index_file="anime_index.json", max_age=86400, quiet=False):
+        """
+        Initialize the server.
+
+        Args:
+            address (tuple): (host, port) to listen on
+            root (str): Directory with index.html and the other static files
+            config_file (str): Path to the CSV configuration file
+            output_dir (str): Directory containing the CSV files
+            index_file (str): The viewer index inside root, rebuilt from the CSV files on startup
+            max_age (int): Cache lifetime in seconds for images
+            quiet (bool): Don't log every request
+        """
+        super().__init__(address, ViewerRequestHandler)
+        self.root = os.path.abspath(root)
+        self.config_file = config_file
+        self.max_age = max_age
+        self.quiet = quiet
+        self.search_index = ReferenceSearchIndex(config_file, output_dir)
+        self._static_files = {}
+        self._static_lock = threading.Lock()
+        # The index is a generated file that isn't committed, so build it from the current CSV files
+        index_path = build_viewer_index(config_file, output_dir, os.path.join(self.root, index_file))
+        if index_path and not quiet:
+            print(f"Built viewer index {index_path}")
+
+    def _resolve(self, url_path):
+        """
+        Map a URL path to a file inside the root directory.
+
+        Args:
+            url_path (str): The decoded URL path
+
+        Returns:
+            str: The file path, or None if the path isn't one of the viewer's files, is hidden or
+                isn't a servable type
+        """
+        url_path = posixpath.normpath(url_path)
+        if url_path in ("/", "."):
+            url_path = "/index.html"
+        parts = [part for part in url_path.split("/") if part]
+        # Never serve dotfiles such as .env or .git
+        if any(part.startswith(".") for part in parts):
+            return None
+        if parts[0] not in (VIEWER_DIRECTORIES if len(parts) > 1 else VIEWER_FILES):
+            return None
+        path = os.path.join(self.root, *parts)
+        if os.path.commonpath([self.root, os.path.abspath(path)]) != self.root:
+            return None
+        if os.path.splitext(path)[1].lower() not in STATIC_TYPES or not os.path.isfile(path):
+            return None
+        return path
+
+    def get_static_file(self, url_path):
+        """
+        Get a static file, loading it into the cache on first use or when it changed on disk.
+
+        Args:
+            url_path (str): The decoded URL path
+
+        Returns:
+            StaticFile: The file or None if it can't be served
+        """
+        path = self._resolve(url_path)
+        if path is None:
+            return None
+
+        static_file = self._static_files.get(path)
+        if static_file is not None and static_file.is_current():
+            return static_file
+
+        extension = os.path.splitext(path)[1].lower()
+        content_type = STATIC_TYPES.get(extension) or mimetypes.guess_type(path)[0]
+        if extension in REVALIDATE_TYPES:
+            cache_control = "no-cache"
+        else:
+            cache_control = f"public, max-age={self.max_age}"
+        try:
+            static_file = StaticFile(path, content_type, cache_control)
+        except OSError:
+            return None
+
+        with self._static_lock:
+            self._static_files[path] = static_file
+        return static_file
+
+    def list_seasons(self):
+        """
+        List every extracted video, newest season first.
+
+        Returns:
+            dict: 'seasons' list with file, source, season, year and number of references
+        """
+        self.search_index.sync()
+        seasons = []
+        for filename in sort_files(read_config_files(self.config_file)):
+            seasons.append({
+                "file": filename,
+                "source": format_source(filename),
+                "season": extract_season(filename),
+                "year": extract_year(filename),
+                "references": len(self.search_index.file_documents.get(filename, [])),
+            })
+        return {"seasons": seasons}
+
+
+def main():
+    """
+    Serve the web viewer.
+    Command-line usage: python server.py [--port 8000] [--bind 127.0.0.1]
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve the Gigguk anime recommendations viewer and query API')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on (default: 8000)')
+    parser.add_argument('--bind', default='127.0.0.1', help='Address to bind to (default: 127.0.0.1)')
+    parser.add_argument('--max-age', type=int, default=86400,
+                        help='Cache lifetime in seconds for images (default: 86400)')
+    parser.add_argument('--quiet', action='store_true', help="Don't log every request")
+    args = parser.parse_args()
+
+    server = ViewerServer((args.bind, args.port), max_age=args.max_age, quiet=args.quiet)
+    print(f"Serving on http://{args.bind}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import csv
+import json
+import re
+from atomic_io import atomic_write
+
+
+# JSON record field -> CSV column. The short field names keep the generated JSON small.
+RECORD_FIELDS = {
+    "title": "Anime Title",
+    "timestamp": "Timestamp",
+    "excited": "Gigguk Excited?",
+    "notes": "Notes",
+}
+
+CODE_FENCE_PATTERN = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$')
+
+
+def parse_json_records(response_text):
+    """
+    Parse the JSON records returned by Gemini in structured output mode.
+
+    Args:
+        response_text (str): The JSON response, optionally wrapped in a ```json code fence
+
+    Returns:
+        list: One dict per record with every RECORD_FIELDS key as a string
+
+    Raises:
+        ValueError: If the response isn't a JSON array of objects
+    """
+    records = json.loads(CODE_FENCE_PATTERN.sub('', response_text))
+    if isinstance(records, dict):
+        # Accept {"references": [...]} style wrappers
+        records = next((value for value in records.values() if isinstance(value, list)), None)
+    if not isinstance(records, list):
+        raise ValueError("Expected a JSON array of records")
+
+    parsed = []
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError(f"Expected a JSON object, got {type(record).__name__}")
+        parsed.append({field: str(record.get(field) or '').strip() for field in RECORD_FIELDS})
+    return parsed
+
+
+def merge_records(record_lists):
+    """
+    Merge the records of several segments, dropping duplicate anime titles.
+
+    Args:
+        record_lists (list): Lists of records, in video order
+
+    Returns:
+        list: The merged records
+    """
+    merged = []
+    seen_titles = set()
+    for records in record_lists:
+        for record in records:
+            title_key = " ".join(record["title"].lower().split())
+            if title_key in seen_titles:
+                continue
+            seen_titles.add(title_key)
+            merged.append(record)
+    return merged
+
+
+def write_records_csv(records, output_path):
+    """
+    Write records to a CSV file with the usual four columns.
+
+    Args:
+        records (list): Records returned by parse_json_records
+        output_path (str): Path where the CSV file will be saved
+    """
+    with atomic_write(output_path, newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(list(RECORD_FIELDS.values()))
+        writer.writerows([record[field] for field in RECORD_FIELDS] for record in records)
+
+
+def render_markdown_table(records):
+    """
+    Render records as the markdown table the markdown extraction mode asks Gemini for.
+
+    Used to estimate how many output tokens the same extraction costs as markdown.
+
+    Args:
+        records (list): Records returned by parse_json_records
+
+    Returns:
+        str: The markdown table with padded columns, as Gemini usually formats it
+    """
+    header = list(RECORD_FIELDS.values())
+    rows = [[record[field] for field in RECORD_FIELDS] for record in records]
+    widths = [max([len(header[i])] + [len(row[i]) for row in rows]) for i in range(len(header))]
+
+    def render(cells):
+        return "| " + " | ".join(cell.ljust(width) for cell, width in zip(cells, widths)) + " |"
+
+    lines = [render(header), "|" + "|".join("-" * (width + 2) for width in widths) + "|"]
+    lines.extend(render(row) for row in rows)
+    return "\n".join(lines) + "\n"
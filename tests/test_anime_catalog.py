@@ -0,0 +1,117 @@
+import csv
+import json
+
+import pytest
+
+from anime_catalog import AnimeCatalog, canonical_title_key, display_title, excitement_score
+from references import COLUMNS
+
+
+FALL_2021 = "Fall Anime 2021 in a Nutshell_anime_references.csv"
+SUMMER_2023 = "Summer Anime 2023 in a Nutshell_anime_references.csv"
+SPRING_2024 = "Spring Anime 2024 in a Nutshell_anime_references.csv"
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Mushoku Tensei II", "Mushoku Tensei: Jobless Reincarnation Season 2 Part 2"),
+    ("Spy x Family (Season 2)", "Spy x Family"),
+    ("Drug Store in Another World", "Drugstore in Another World"),
+    ("Frieren: Beyond Journey's End", "frieren"),
+    ("Attack on Titan Final Season", "Attack on Titan"),
+    ("Oshi no Ko 2nd Season", "Oshi no Ko"),
+    ("Kaiju No. 8 Season 2", "Kaiju No. 8"),
+    ("Konosuba - God's Blessing on this Wonderful World!", "KonoSuba"),
+])
+def test_spellings_of_one_anime_share_a_key(first, second):
+    assert canonical_title_key(first) == canonical_title_key(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Kaiju No. 8", "Kaiju No. 9"),
+    ("Re:Zero", "Re:Creators"),
+    ("Spy x Family", "Spice and Wolf"),
+])
+def test_different_anime_keep_different_keys(first, second):
+    assert canonical_title_key(first) != canonical_title_key(second)
+
+
+def test_titles_that_are_only_numbers_keep_a_key():
+    assert canonical_title_key("86") == "86"
+    assert canonical_title_key("") == ""
+
+
+def test_display_title_keeps_the_subtitle():
+    assert display_title("Tsukimichi: Moonlit Fantasy (Season 2)") == "Tsukimichi: Moonlit Fantasy"
+    assert display_title("Kaiju No. 8") == "Kaiju No. 8"
+
+
+def test_excitement_score():
+    assert excitement_score("Yes (Intrigued)") == 1.0
+    assert excitement_score("No") == -1.0
+    assert excitement_score("N/A") is None
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for title, excited in rows:
+            writer.writerow([title, "1:00", excited, ""])
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    output_dir = tmp_path / "transcripts"
+    output_dir.mkdir()
+    write_csv(output_dir / FALL_2021, [("Mushoku Tensei: Jobless Reincarnation", "Yes")])
+    write_csv(output_dir / SUMMER_2023, [("Mushoku Tensei II", "Neutral"), ("Spy x Family (Season 2)", "Yes")])
+    write_csv(output_dir / SPRING_2024, [("Mushoku Tensei: Jobless Reincarnation Season 2 Part 2", "No")])
+    config_file = tmp_path / "csv_config.json"
+    config_file.write_text(json.dumps({"files": [SPRING_2024, SUMMER_2023, FALL_2021]}))
+    return AnimeCatalog(str(config_file), str(output_dir), str(tmp_path / "anime_catalog.json"))
+
+
+def test_build_merges_spellings_across_seasons(catalog):
+    assert catalog.build() == 2
+    entry = catalog.lookup("Mushoku Tensei")
+    assert entry["title"] == "Mushoku Tensei: Jobless Reincarnation"
+    assert entry["appearance_count"] == 3
+    assert entry["seasons"] == ["Fall Anime 2021 in a Nutshell", "Summer Anime 2023 in a Nutshell",
+                                "Spring Anime 2024 in a Nutshell"]
+    assert entry["average_score"] == 0.0
+    assert entry["trend"] == "falling"
+    assert catalog.lookup("spy x family")["trend"] == "single"
+    assert [entry["appearance_count"] for entry in catalog.top()] == [3, 1]
+
+
+def test_update_file_only_touches_changed_files(catalog, tmp_path):
+    catalog.build()
+    assert catalog.update_file(FALL_2021) == 0
+    write_csv(tmp_path / "transcripts" / FALL_2021, [("Spy x Family", "Yes")])
+    assert catalog.update_file(FALL_2021) == 2
+    assert catalog.lookup("Mushoku Tensei")["appearance_count"] == 2
+    assert catalog.lookup("Spy x Family")["appearance_count"] == 2
+
+
+def test_sync_picks_up_added_and_removed_files(catalog, tmp_path):
+    catalog.build()
+    config_file = tmp_path / "csv_config.json"
+    config_file.write_text(json.dumps({"files": [SPRING_2024, FALL_2021]}))
+    assert catalog.sync() == {"added": [], "updated": [], "removed": [SUMMER_2023]}
+    assert catalog.lookup("Spy x Family") is None
+
+    # A second catalog object reads the saved file
+    reloaded = AnimeCatalog(str(config_file), str(tmp_path / "transcripts"), str(tmp_path / "anime_catalog.json"))
+    assert reloaded.lookup("Mushoku Tensei")["appearance_count"] == 2
+
+
+def test_update_file_without_a_catalog_indexes_every_configured_file(catalog, tmp_path):
+    assert not (tmp_path / "anime_catalog.json").exists()
+    assert catalog.update_file(SPRING_2024) == 2
+    assert sorted(catalog.files) == [FALL_2021, SPRING_2024, SUMMER_2023]
+    assert catalog.lookup("Mushoku Tensei")["appearance_count"] == 3
+    assert catalog.lookup("Spy x Family") is not None
+
+    reloaded = AnimeCatalog(catalog.config_file, catalog.output_dir, catalog.catalog_file)
+    assert reloaded.lookup("Spy x Family")["appearance_count"] == 1
+    assert reloaded.update_file(SPRING_2024) == 0
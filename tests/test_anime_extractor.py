@@ -0,0 +1,43 @@
+import pytest
+
+from anime_extractor import AnimeExtractor
+from instrumentation import Instrumentation, PrometheusTextfileSink
+
+
+class NoRequests:
+    def __getattr__(self, name):
+        raise AssertionError(f"unexpected Gemini client use: {name}")
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    extractor = AnimeExtractor(api_key="test", output_dir=str(tmp_path), config_file=str(tmp_path / "csv_config.json"),
+                               cache_dir=str(tmp_path / ".cache"), manifest_file=str(tmp_path / "manifest.json"))
+    extractor.gemini_client = NoRequests()
+    return extractor
+
+
+def test_output_token_report_makes_no_request(extractor):
+    records = [{"title": "Dandadan", "timestamp": "5:41", "excited": "Yes", "notes": "Great"}]
+    json_text = '[{"title": "Dandadan", "timestamp": "5:41", "excited": "Yes", "notes": "Great"}]'
+    for output_tokens in (None, 30):
+        report = extractor._report_output_tokens(json_text, records, output_tokens)
+        assert report["json_tokens"] > 0
+        assert report["markdown_tokens"] > 0
+
+
+def test_cache_hits_are_counted_as_cached_tokens(extractor, tmp_path):
+    prom = PrometheusTextfileSink(str(tmp_path / "metrics.prom"))
+    instrumentation = Instrumentation([prom])
+    with instrumentation.span("gemini") as span:
+        span.set(**extractor._gemini_metrics("prompt " * 40, "| Dandadan | 5:41 |", None, cache_hit=True))
+    with instrumentation.span("gemini") as span:
+        span.set(**extractor._gemini_metrics("prompt", "response", {"input_tokens": 100, "output_tokens": 20}))
+
+    assert instrumentation.totals.tokens == {"input": 100, "output": 20}
+    assert instrumentation.totals.cached_tokens["input"] > 0
+    assert instrumentation.totals.cached_tokens["output"] > 0
+    metrics = prom.render()
+    assert 'gigguk_gemini_tokens_total{direction="input"} 100' in metrics
+    assert 'gigguk_gemini_tokens_total{direction="output"} 20' in metrics
+    assert f'gigguk_gemini_cached_tokens_total{{direction="input"}} {instrumentation.totals.cached_tokens["input"]}' in metrics
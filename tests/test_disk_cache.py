@@ -0,0 +1,87 @@
+import os
+import time
+import threading
+
+from disk_cache import DiskCache
+
+
+def test_get_returns_stored_value(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert cache.set("video", {"title": "Frieren"})
+    assert cache.get("video") == {"title": "Frieren"}
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_compressed_entries_round_trip(tmp_path):
+    cache = DiskCache(str(tmp_path), compress=True)
+    cache.set("video", [1, 2, 3])
+    assert cache.get("video") == [1, 2, 3]
+    assert all(name.endswith(".json.gz") for name in os.listdir(tmp_path))
+
+
+def test_expired_entry_is_a_miss_and_removed(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set("video", "value")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("video") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_evict_removes_stale_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), ttl=60)
+    cache.set("old", "value")
+    cache.set("new", "value")
+    old_path = cache._path("old")
+    past = time.time() - 120
+    os.utime(old_path, (past, past))
+    assert cache.evict() == 1
+    assert not os.path.exists(old_path)
+    assert cache.get("new") == "value"
+
+
+def test_max_entries_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    # Age both entries, then read "a" so "b" becomes the least recently used
+    for offset, key in ((20, "a"), (10, "b")):
+        past = time.time() - offset
+        os.utime(cache._path(key), (past, past))
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_max_bytes_evicts_until_within_limit(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=300)
+    for index in range(5):
+        cache.set(f"key{index}", "x" * 100)
+        past = time.time() - 100 + index
+        os.utime(cache._path(f"key{index}"), (past, past))
+    cache.evict()
+    assert cache.stats()["bytes"] <= 300
+    assert cache.get("key4") == "x" * 100
+
+
+def test_counters_are_exact_across_threads(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set("hit", 1)
+
+    def read():
+        for _ in range(200):
+            cache.get("hit")
+            cache.get("miss")
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats["hits"] == 1600
+    assert stats["misses"] == 1600
@@ -0,0 +1,194 @@
+import time
+
+import pytest
+
+from instrumentation import Instrumentation
+from job_queue import DONE, FAILED, LEASE_LOST, PENDING, RUNNING, JobQueue, QueueWorker
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease_seconds=60, max_attempts=2, retry_delay=0)
+    yield queue
+    queue.close()
+
+
+def expire_leases(queue):
+    queue._connection().execute("UPDATE jobs SET lease_expires = ?", (time.time() - 1,))
+
+
+class FakeExtractor:
+    """
+    The parts of AnimeExtractor a QueueWorker uses, counting the calls of each stage.
+    """
+
+    def __init__(self, tmp_path):
+        self.instrumentation = Instrumentation()
+        self.output_format = "markdown"
+        self.segment_seconds = None
+        self.quiet = True
+        self.output_dir = tmp_path
+        self.calls = {"transcript": 0, "metadata": 0, "llm": 0, "save": 0}
+        self.fail_save = False
+
+    def _get_prompt_transcript(self, video_id):
+        self.calls["transcript"] += 1
+        return f"transcript of {video_id}"
+
+    def _get_metadata(self, video_id):
+        self.calls["metadata"] += 1
+        return {"title": f"Title {video_id}", "description": "", "duration": 600, "view_count": 1}
+
+    def _video_inputs(self, video_id, transcript, metadata):
+        return {"video_id": video_id, "video_title": (metadata or {}).get("title", video_id),
+                "transcript": transcript}
+
+    def _up_to_date_output(self, inputs, output_csv=None):
+        return None
+
+    def _request_responses(self, inputs, echo=True, usage=None, gemini_slots=None):
+        self.calls["llm"] += 1
+        inputs["model"] = "model"
+        return [f"| Anime Title |\n|---|\n| {inputs['video_title']} |\n"]
+
+    def _save_responses(self, inputs, responses, output_csv=None, usage=None):
+        self.calls["save"] += 1
+        if self.fail_save:
+            raise OSError("disk full")
+        return str(self.output_dir / f"{inputs['video_title']}.csv")
+
+
+def test_claim_takes_each_job_once(queue):
+    assert queue.enqueue(["a", "b"]) == 2
+    assert queue.enqueue(["a"]) == 0
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+    assert {first["video_id"], second["video_id"]} == {"a", "b"}
+    assert first["status"] == RUNNING
+    assert first["attempts"] == 1
+    assert queue.claim("w3") is None
+    assert queue.counts()[RUNNING] == 2
+
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.enqueue(["a"])
+    queue.claim("w1")
+    assert queue.claim("w2") is None
+    expire_leases(queue)
+    job = queue.claim("w2")
+    assert job["lease_owner"] == "w2"
+    assert job["attempts"] == 2
+    assert not queue.renew("a", "w1")
+    assert queue.renew("a", "w2")
+    assert not queue.complete("a", "w1", "a.csv")
+    assert queue.complete("a", "w2", "a.csv")
+    assert queue.counts()[DONE] == 1
+
+
+def test_failed_jobs_are_retried_until_max_attempts(queue):
+    queue.enqueue(["a"])
+    queue.claim("w1")
+    assert queue.fail("a", "w1", "boom")
+    assert queue.jobs()[0]["status"] == PENDING
+    queue.claim("w1")
+    queue.fail("a", "w1", "boom")
+    job = queue.jobs()[0]
+    assert job["status"] == FAILED
+    assert job["error"] == "boom"
+    assert queue.retry_failed() == 1
+    assert queue.claim("w1") is not None
+
+
+def test_release_keeps_stages_without_counting_the_attempt(queue):
+    queue.enqueue(["a"])
+    queue.claim("w1")
+    assert queue.complete_stage("a", "transcript", "w1", "text")
+    queue.release("a", "w1")
+    job = queue.claim("w2")
+    assert job["attempts"] == 1
+    assert job["stage"] == "transcript"
+    assert queue.stage_outputs("a") == {"transcript": "text"}
+
+
+def test_stages_need_the_lease(queue):
+    queue.enqueue(["a"])
+    queue.claim("w1")
+    assert not queue.complete_stage("a", "transcript", "w2", "text")
+    assert queue.jobs()[0]["stages"] == []
+    with pytest.raises(ValueError):
+        queue.complete_stage("a", "unknown", "w1")
+
+
+def test_requeue_clears_stage_outputs(queue):
+    queue.enqueue(["a"])
+    queue.claim("w1")
+    queue.complete_stage("a", "transcript", "w1", "text")
+    queue.complete("a", "w1", "a.csv")
+    assert queue.enqueue(["a"], requeue=True) == 1
+    assert queue.jobs()[0]["stages"] == []
+    assert queue.stage_outputs("a") == {}
+
+
+def test_worker_runs_every_stage(queue, tmp_path):
+    extractor = FakeExtractor(tmp_path)
+    worker = QueueWorker(queue, extractor, owner="w1")
+    queue.enqueue(["a"])
+    assert worker.run() == {DONE: 1, FAILED: 0, LEASE_LOST: 0}
+    job = queue.jobs()[0]
+    assert job["stages"] == ["transcript", "metadata", "llm", "csv"]
+    assert job["csv_path"] == str(tmp_path / "Title a.csv")
+    outputs = queue.stage_outputs("a")
+    assert outputs["metadata"] == {"title": "Title a", "description": "", "duration": 600}
+    assert outputs["llm"]["responses"] == ["| Anime Title |\n|---|\n| Title a |\n"]
+
+
+def test_resumed_job_skips_finished_stages(queue, tmp_path):
+    extractor = FakeExtractor(tmp_path)
+    worker = QueueWorker(queue, extractor, owner="w1")
+    queue.enqueue(["a"])
+    extractor.fail_save = True
+    assert worker.run_job(queue.claim("w1")) == FAILED
+    assert queue.jobs()[0]["status"] == PENDING
+    assert extractor.calls == {"transcript": 1, "metadata": 1, "llm": 1, "save": 1}
+
+    extractor.fail_save = False
+    job = queue.claim("w2")
+    assert job["stage"] == "llm"
+    assert QueueWorker(queue, extractor, owner="w2").run_job(job) == DONE
+    # Only the failed CSV stage ran again
+    assert extractor.calls == {"transcript": 1, "metadata": 1, "llm": 1, "save": 2}
+
+
+def test_responses_of_other_extraction_options_are_not_reused(queue, tmp_path):
+    extractor = FakeExtractor(tmp_path)
+    queue.enqueue(["a"])
+    extractor.fail_save = True
+    QueueWorker(queue, extractor, owner="w1").run_job(queue.claim("w1"))
+    extractor.fail_save = False
+    extractor.output_format = "json"
+    assert QueueWorker(queue, extractor, owner="w1").run_job(queue.claim("w1")) == DONE
+    assert extractor.calls["llm"] == 2
+    assert extractor.calls["transcript"] == 1
+
+
+def test_worker_that_lost_the_lease_saves_nothing(queue, tmp_path):
+    extractor = FakeExtractor(tmp_path)
+    worker = QueueWorker(queue, extractor, owner="w1")
+    queue.enqueue(["a"])
+    job = queue.claim("w1")
+
+    request_responses = extractor._request_responses
+
+    def taken_over(*args, **kwargs):
+        responses = request_responses(*args, **kwargs)
+        expire_leases(queue)
+        queue.claim("w2")
+        return responses
+
+    extractor._request_responses = taken_over
+    assert worker.run_job(job) == LEASE_LOST
+    assert extractor.calls["save"] == 0
+    job = queue.jobs()[0]
+    assert job["status"] == RUNNING
+    assert job["lease_owner"] == "w2"
+    assert "llm" not in job["stages"]
@@ -0,0 +1,54 @@
+import pytest
+
+from anime_extractor import AnimeExtractor
+from manifest import ExtractionManifest
+
+
+FINGERPRINT = {"video_id": "abc", "transcript_hash": "t", "description_hash": "d", "model": "pro",
+               "prompt_version": "3"}
+
+
+def test_is_up_to_date(tmp_path):
+    manifest = ExtractionManifest(str(tmp_path / "manifest.json"))
+    assert not manifest.is_up_to_date("a.csv", FINGERPRINT)
+    assert manifest.record("a.csv", FINGERPRINT, video_title="A")
+    assert manifest.is_up_to_date("a.csv", FINGERPRINT)
+    assert not manifest.is_up_to_date("a.csv", dict(FINGERPRINT, transcript_hash="changed"))
+    assert not manifest.is_up_to_date("a.csv", dict(FINGERPRINT, model="flash"))
+    assert manifest.is_up_to_date("a.csv", dict(FINGERPRINT, model="flash"), models=["flash", "pro"])
+    assert manifest.find_video("abc")[0] == "a.csv"
+
+
+@pytest.fixture
+def extractor(tmp_path):
+    return AnimeExtractor(api_key="test", output_dir=str(tmp_path), config_file=str(tmp_path / "csv_config.json"),
+                          cache_dir=str(tmp_path / ".cache"), manifest_file=str(tmp_path / "manifest.json"),
+                          incremental=True, model="pro", fallback_model="flash")
+
+
+def inputs():
+    return {"video_id": "abc", "video_title": "Fall 2024 Anime in a Nutshell", "transcript": "transcript",
+            "description": "description"}
+
+
+@pytest.mark.parametrize("answered_by", ["pro", "flash"])
+def test_output_answered_by_either_model_is_up_to_date(extractor, tmp_path, answered_by):
+    recorded = dict(inputs(), model=answered_by)
+    csv_filename = extractor._output_csv_name(recorded)
+    (tmp_path / csv_filename).write_text("Anime Title\n")
+    extractor.manifest.record(csv_filename, extractor._input_fingerprint(recorded))
+
+    # Before extraction the inputs don't know which model will answer
+    assert extractor._up_to_date_output(inputs()) == str(tmp_path / csv_filename)
+
+
+def test_output_of_another_model_is_extracted_again(extractor, tmp_path):
+    recorded = dict(inputs(), model="old-model")
+    csv_filename = extractor._output_csv_name(recorded)
+    (tmp_path / csv_filename).write_text("Anime Title\n")
+    extractor.manifest.record(csv_filename, extractor._input_fingerprint(recorded))
+    assert extractor._up_to_date_output(inputs()) is None
+
+    extractor.manifest.record(csv_filename, extractor._input_fingerprint(dict(inputs(), model="flash")))
+    extractor.fallback_model = None
+    assert extractor._up_to_date_output(inputs()) is None
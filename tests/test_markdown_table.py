@@ -0,0 +1,101 @@
+import csv
+import os
+
+from markdown_table import MarkdownTableParser, StreamingCSVWriter, parse_markdown_table, split_table_row
+
+
+TABLE = """Here is the table:
+
+| Anime Title | Timestamp | Gigguk Excited? | Notes |
+|---|---|---|---|
+| Dandadan | 5:41 | Yes | Great opening |
+| Frieren | 10:02 | Yes | |
+
+That's all.
+"""
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_split_table_row_keeps_empty_middle_cells():
+    assert split_table_row("| Dandadan | 5:41 | Yes | Great |") == ["Dandadan", "5:41", "Yes", "Great"]
+    assert split_table_row("| Dandadan | | Yes | |") == ["Dandadan", "", "Yes", ""]
+    assert split_table_row("Dandadan | 5:41") == ["Dandadan", "5:41"]
+
+
+def test_parse_markdown_table():
+    header, rows = parse_markdown_table(TABLE)
+    assert header == ["Anime Title", "Timestamp", "Gigguk Excited?", "Notes"]
+    assert rows == [["Dandadan", "5:41", "Yes", "Great opening"], ["Frieren", "10:02", "Yes", ""]]
+
+
+def test_rows_are_the_same_in_any_chunking():
+    expected = parse_markdown_table(TABLE)[1]
+    for size in (1, 3, 7, 64):
+        parser = MarkdownTableParser()
+        rows = []
+        for start in range(0, len(TABLE), size):
+            rows.extend(parser.feed(TABLE[start:start + size]))
+        rows.extend(parser.close())
+        assert rows == expected
+
+
+def test_rows_are_returned_once_complete():
+    parser = MarkdownTableParser()
+    assert parser.feed("| Title | Notes |\n|---|---|\n| Dandadan | Gr") == []
+    assert parser.feed("eat |\n") == [["Dandadan", "Great"]]
+
+
+def test_malformed_rows_are_padded_or_merged():
+    parser = MarkdownTableParser()
+    rows = parser.feed("| A | B | C |\n|---|---|---|\n| short |\n| x | y | z | extra |\n| | | |\n")
+    assert rows == [["short", "", ""], ["x", "y", "z | extra"]]
+    assert parser.malformed_rows == 2
+
+
+def test_writer_finish_writes_the_csv(tmp_path):
+    output_path = str(tmp_path / "out.csv")
+    writer = StreamingCSVWriter(output_path)
+    for start in range(0, len(TABLE), 10):
+        writer.feed(TABLE[start:start + 10])
+    assert writer.finish()
+    assert read_csv(output_path) == [["Anime Title", "Timestamp", "Gigguk Excited?", "Notes"],
+                                     ["Dandadan", "5:41", "Yes", "Great opening"], ["Frieren", "10:02", "Yes", ""]]
+    assert writer.stats()["rows"] == 2
+    assert os.listdir(tmp_path) == ["out.csv"]
+
+
+def test_writer_without_table_writes_nothing(tmp_path):
+    writer = StreamingCSVWriter(str(tmp_path / "out.csv"))
+    writer.feed("Sorry, I can't help with that.\n")
+    assert not writer.finish()
+    assert writer.abort() is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_writer_abort_keeps_complete_rows(tmp_path):
+    output_path = str(tmp_path / "out.csv")
+    writer = StreamingCSVWriter(output_path)
+    writer.feed("| Anime Title | Notes |\n|---|---|\n| Dandadan | Great |\n| Frier")
+    partial_path = writer.abort()
+    assert partial_path == str(tmp_path / "out.partial.csv")
+    assert not os.path.exists(output_path)
+    # The cut-off last line isn't a row
+    assert read_csv(partial_path) == [["Anime Title", "Notes"], ["Dandadan", "Great"]]
+    assert writer.rows_written == 1
+
+
+def test_successful_run_removes_the_stale_partial_file(tmp_path):
+    output_path = str(tmp_path / "out.csv")
+    failed = StreamingCSVWriter(output_path)
+    failed.feed("| Anime Title | Notes |\n|---|---|\n| Dandadan | Great |\n")
+    assert os.path.exists(failed.abort())
+
+    writer = StreamingCSVWriter(output_path)
+    writer.feed("| Anime Title | Notes |\n|---|---|\n| Dandadan | Great |\n| Frieren | Yes |")
+    assert writer.finish()
+    assert os.listdir(tmp_path) == ["out.csv"]
+    assert read_csv(output_path)[-1] == ["Frieren", "Yes"]
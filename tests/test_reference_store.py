@@ -0,0 +1,108 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from reference_store import ReferenceStore
+from references import COLUMNS, read_reference_csv
+
+
+FALL = "Fall 2024 Anime in a Nutshell_anime_references.csv"
+SPRING = "Spring Anime 2025 In A Nutshell_anime_references.csv"
+
+ROWS = {
+    FALL: [
+        {"Anime Title": "Dandadan", "Timestamp": "5:41", "Gigguk Excited?": "Yes", "Notes": "Great opening, \"wild\""},
+        {"Anime Title": "Re:Zero Season 3", "Timestamp": "12:00", "Gigguk Excited?": "Neutral", "Notes": ""},
+    ],
+    SPRING: [
+        {"Anime Title": "The Apothecary Diaries", "Timestamp": "1:02", "Gigguk Excited?": "Yes", "Notes": "Season 2"},
+        {"Anime Title": "Dan Da Dan", "Timestamp": "3:10", "Gigguk Excited?": "No", "Notes": "Skipping"},
+    ],
+}
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow([row[column] for column in COLUMNS])
+
+
+@pytest.fixture
+def store(tmp_path):
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for filename, rows in ROWS.items():
+        write_csv(source_dir / filename, rows)
+    config_file = tmp_path / "source_config.json"
+    config_file.write_text(json.dumps({"files": [FALL, SPRING, "Missing_anime_references.csv"]}))
+
+    store = ReferenceStore(str(tmp_path / "references.db"))
+    assert store.import_csv_files(str(config_file), str(source_dir)) == {FALL: 2, SPRING: 2}
+    yield store
+    store.close()
+
+
+def test_sources_are_listed_newest_first(store):
+    assert [(source["file"], source["refs"]) for source in store.sources()] == [(SPRING, 2), (FALL, 2)]
+    assert store.rows(FALL) == ROWS[FALL]
+
+
+def test_query_by_title_season_and_excitement(store):
+    assert [row["Anime Title"] for row in store.query("dan")] == ["Dan Da Dan", "Dandadan"]
+    assert [row["Anime Title"] for row in store.query("%diaries")] == ["The Apothecary Diaries"]
+    assert [row["Anime Title"] for row in store.query(season="fall", year=2024)] == ["Dandadan", "Re:Zero Season 3"]
+    assert [row["Anime Title"] for row in store.query(excited="yes")] == ["The Apothecary Diaries", "Dandadan"]
+    assert len(store.query(limit=1)) == 1
+
+
+def test_saving_a_source_again_replaces_its_rows(store):
+    store.save_source(FALL, ROWS[FALL][:1], video_id="abc")
+    assert store.rows(FALL) == ROWS[FALL][:1]
+    assert {source["file"]: source["video_id"] for source in store.sources()}[FALL] == "abc"
+    assert store.remove_source(FALL)
+    assert not store.remove_source(FALL)
+    assert store.rows(FALL) == []
+
+
+def test_export_round_trip(store, tmp_path):
+    output_dir = tmp_path / "export"
+    config_file = tmp_path / "csv_config.json"
+    index_file = tmp_path / "anime_index.json"
+    catalog_file = tmp_path / "anime_catalog.json"
+
+    files = store.export(str(output_dir), str(config_file), str(index_file), str(catalog_file))
+    assert files == [SPRING, FALL]
+    for filename, rows in ROWS.items():
+        assert read_reference_csv(str(output_dir / filename)) == rows
+    assert json.loads(config_file.read_text()) == {"files": [SPRING, FALL]}
+
+    index = json.loads(index_file.read_text())
+    assert [entry["file"] for entry in index["files"]] == [SPRING, FALL]
+    assert gzip.decompress((tmp_path / "anime_index.json.gz").read_bytes()) == index_file.read_bytes()
+    catalog = json.loads(catalog_file.read_text())
+    assert sorted(catalog["files"]) == [FALL, SPRING]
+
+    # Exporting into a fresh store gives the same rows back
+    imported = ReferenceStore(str(tmp_path / "copy.db"))
+    imported.import_csv_files(str(config_file), str(output_dir))
+    assert imported.rows(FALL) == ROWS[FALL]
+    assert imported.rows(SPRING) == ROWS[SPRING]
+    imported.close()
+
+
+def test_export_merges_into_the_existing_config(store, tmp_path):
+    output_dir = tmp_path / "export"
+    output_dir.mkdir()
+    write_csv(output_dir / "Hand Edited_anime_references.csv", ROWS[FALL][:1])
+    config_file = tmp_path / "csv_config.json"
+    config_file.write_text(json.dumps({"files": ["Hand Edited_anime_references.csv", FALL]}))
+
+    store.export(str(output_dir), str(config_file), str(tmp_path / "anime_index.json"),
+                 str(tmp_path / "anime_catalog.json"))
+    assert json.loads(config_file.read_text()) == {"files": ["Hand Edited_anime_references.csv", FALL, SPRING]}
+    index = json.loads((tmp_path / "anime_index.json").read_text())
+    assert "Hand Edited_anime_references.csv" in index["references"]
@@ -0,0 +1,219 @@
+import time
+import threading
+import random
+
+import pytest
+
+import scheduler
+from scheduler import (Backend, CircuitBreaker, CircuitOpenError, RequestScheduler, TokenBucket, is_quota_exhausted,
+                       is_retryable, retry_after)
+
+
+class StatusError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(message or f"{code} error")
+        self.code = code
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(scheduler.time, "sleep", clock.sleep)
+    return clock
+
+
+def failing(errors, result="ok"):
+    errors = list(errors)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    call.calls = calls
+    return call
+
+
+def test_error_classification():
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(503))
+    assert is_retryable(TimeoutError("read timed out"))
+    assert not is_retryable(StatusError(400, "invalid argument"))
+    assert not is_retryable(ValueError("No transcript found"))
+    assert not is_retryable(Exception("ERROR: [youtube] abc: Video unavailable"))
+    assert is_retryable(Exception("503 UNAVAILABLE"))
+    daily = StatusError(429, "RESOURCE_EXHAUSTED quotaId: GenerateRequestsPerDayPerProjectPerModel-FreeTier")
+    assert is_quota_exhausted(daily)
+    assert not is_retryable(daily)
+    assert not is_quota_exhausted(StatusError(429, "RESOURCE_EXHAUSTED GenerateRequestsPerMinutePerProject"))
+    assert retry_after(StatusError(429, "{'retryDelay': '27s'}")) == 27.0
+
+
+def test_backoff_is_capped_and_honours_retry_delay(monkeypatch):
+    monkeypatch.setattr(random, "uniform", lambda low, high: high)
+    backend = Backend("test", 60, base_delay=1.0, max_delay=10.0)
+    assert [backend.backoff(attempt, StatusError(503)) for attempt in (1, 2, 3, 4, 5)] == [1, 2, 4, 8, 10]
+    monkeypatch.setattr(random, "uniform", lambda low, high: low)
+    assert backend.backoff(1, StatusError(429, "retryDelay: '5s'")) == 5.0
+    assert backend.backoff(1, StatusError(429, "retryDelay: '90s'")) == 10.0
+
+
+def test_retryable_errors_are_retried_until_success(clock):
+    requests = RequestScheduler()
+    requests.add_backend("test", 6000, max_retries=3, failure_threshold=10)
+    call = failing([StatusError(503), StatusError(503)])
+    assert requests.call("test", call) == "ok"
+    assert len(call.calls) == 3
+    stats = requests.stats()["test"]
+    assert stats["retries"] == 2
+    assert stats["failures"] == 0
+    assert stats["circuit"] == CircuitBreaker.CLOSED
+
+
+def test_retries_run_out(clock):
+    requests = RequestScheduler()
+    requests.add_backend("test", 6000, max_retries=2, failure_threshold=10)
+    call = failing([StatusError(503)] * 5)
+    with pytest.raises(StatusError):
+        requests.call("test", call)
+    assert len(call.calls) == 3
+    assert requests.stats()["test"]["failures"] == 1
+
+
+def test_non_retryable_error_is_raised_at_once(clock):
+    requests = RequestScheduler()
+    requests.add_backend("test", 6000)
+    call = failing([ValueError("Video unavailable")])
+    with pytest.raises(ValueError):
+        requests.call("test", call)
+    assert len(call.calls) == 1
+    assert clock.sleeps == []
+
+
+def test_rate_limit_throttles_the_bucket(clock):
+    requests = RequestScheduler()
+    backend = requests.add_backend("test", 600, failure_threshold=10)
+    requests.call("test", failing([StatusError(429)]))
+    assert backend.rate_limited == 1
+    assert backend.bucket.rate < backend.bucket.max_rate
+
+
+def test_breaker_state_machine(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.is_open()
+    assert not breaker.allow()
+
+    # Checking the state doesn't move the breaker to half-open
+    clock.now += 31
+    assert breaker.is_open()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    # A failed probe opens the circuit again, a successful one closes it
+    breaker.record_failure()
+    assert breaker.is_open()
+    clock.now += 31
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_released_probe_keeps_the_circuit_open(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 31
+    assert breaker.allow()
+    breaker.release_probe()
+    assert breaker.is_open()
+    # The next call is let through as the probe instead
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_open_circuit_rejects_calls(clock):
+    requests = RequestScheduler()
+    requests.add_backend("test", 6000, max_retries=5, failure_threshold=2)
+    call = failing([StatusError(503)] * 5)
+    with pytest.raises(StatusError):
+        requests.call("test", call)
+    assert len(call.calls) == 2
+    with pytest.raises(CircuitOpenError):
+        requests.call("test", call)
+    assert len(call.calls) == 2
+
+
+def test_non_retryable_error_during_probe_keeps_the_circuit_open(clock):
+    requests = RequestScheduler()
+    backend = requests.add_backend("test", 6000, failure_threshold=1, reset_timeout=30, max_retries=0)
+    with pytest.raises(StatusError):
+        requests.call("test", failing([StatusError(503)]))
+    clock.now += 31
+    with pytest.raises(ValueError):
+        requests.call("test", failing([ValueError("invalid request")]))
+    assert backend.breaker.is_open()
+
+
+def test_daily_quota_fails_fast_and_opens_the_circuit(clock):
+    requests = RequestScheduler()
+    backend = requests.add_backend("test", 6000, max_retries=5, failure_threshold=5)
+    call = failing([StatusError(429, "RESOURCE_EXHAUSTED quotaId: GenerateRequestsPerDayPerProject")] * 5)
+    with pytest.raises(StatusError):
+        requests.call("test", call)
+    assert len(call.calls) == 1
+    assert backend.breaker.is_open()
+    with pytest.raises(CircuitOpenError):
+        requests.call("test", call)
+
+
+def test_token_bucket_spaces_calls(clock):
+    bucket = TokenBucket(2.0, burst=1)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    bucket.throttle(pause=10)
+    assert bucket.rate == 1.0
+    assert bucket.reserve() == pytest.approx(10)
+    for _ in range(100):
+        bucket.recover()
+    assert bucket.rate == bucket.max_rate
+
+
+def test_counters_are_exact_across_threads():
+    requests = RequestScheduler()
+    requests.add_backend("test", 1e9, burst=10 ** 6, max_retries=1, failure_threshold=10 ** 6)
+
+    def work():
+        for _ in range(500):
+            requests.call("test", lambda: "ok")
+            with pytest.raises(ValueError):
+                requests.call("test", failing([ValueError("invalid request")]))
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = requests.stats()["test"]
+    assert stats["calls"] == 8000
+    assert stats["retries"] == 0
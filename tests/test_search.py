@@ -0,0 +1,97 @@
+import csv
+import json
+import os
+
+import pytest
+
+from references import COLUMNS
+from search import ReferenceSearchIndex, tokenize
+
+
+FALL = "Fall 2024 Anime in a Nutshell_anime_references.csv"
+SPRING = "Spring Anime 2023 in a Nutshell_anime_references.csv"
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def index(tmp_path):
+    output_dir = tmp_path / "transcripts"
+    output_dir.mkdir()
+    write_csv(output_dir / FALL, [
+        ["Dandadan", "5:41", "Yes", "Great opening with aliens"],
+        ["Frieren: Beyond Journey's End", "8:00", "Yes", "Still airing"],
+        ["Re:Zero Season 3", "12:00", "Neutral", "Long awaited sequel"],
+    ])
+    write_csv(output_dir / SPRING, [
+        ["Oshi no Ko", "2:10", "Yes", "Idol drama"],
+        ["Demon Slayer Swordsmith Village", "4:00", "No", "Frieren fans will like the fights"],
+    ])
+    (tmp_path / "csv_config.json").write_text(json.dumps({"files": [FALL, SPRING]}))
+    return ReferenceSearchIndex(str(tmp_path / "csv_config.json"), str(output_dir), sync_interval=0)
+
+
+def titles(result):
+    return [row["Anime Title"] for row in result["results"]]
+
+
+def test_tokenize():
+    assert tokenize("Frieren: Beyond Journey's End") == ["frieren", "beyond", "journey", "s", "end"]
+    assert tokenize(None) == []
+
+
+def test_exact_match_ranks_titles_above_notes(index):
+    assert titles(index.search("frieren")) == ["Frieren: Beyond Journey's End", "Demon Slayer Swordsmith Village"]
+
+
+def test_prefix_match(index):
+    assert titles(index.search("dand")) == ["Dandadan"]
+    assert titles(index.search("swords")) == ["Demon Slayer Swordsmith Village"]
+    assert index.search("dand", prefix=False)["total"] == 0
+
+
+def test_fuzzy_match_tolerates_one_typo(index):
+    assert titles(index.search("freiren"))[0] == "Frieren: Beyond Journey's End"
+    assert titles(index.search("dandadna"))[0] == "Dandadan"
+    assert titles(index.search("dandaan")) == ["Dandadan"]
+    assert index.search("freiren", fuzzy=False)["total"] == 0
+    # Terms shorter than four characters are never matched fuzzily
+    assert titles(index.search("oshx")) == ["Oshi no Ko"]
+    assert index.search("osx")["total"] == 0
+
+
+def test_exact_matches_turn_fuzzy_matching_off(index):
+    assert titles(index.search("idol")) == ["Oshi no Ko"]
+
+
+def test_every_term_has_to_match(index):
+    assert titles(index.search("frieren fights")) == ["Demon Slayer Swordsmith Village"]
+    assert index.search("frieren zzzz")["total"] == 0
+
+
+def test_filters_and_pagination(index):
+    assert titles(index.search(excited="Yes", season="fall")) == ["Dandadan", "Frieren: Beyond Journey's End"]
+    assert titles(index.search(year=2023, excited="No")) == ["Demon Slayer Swordsmith Village"]
+    assert index.search(file=SPRING)["total"] == 2
+    result = index.search(per_page=2, page=3)
+    assert result["total"] == 5
+    assert len(result["results"]) == 1
+
+
+def test_sync_follows_the_config_and_file_changes(index, tmp_path):
+    output_dir = tmp_path / "transcripts"
+    write_csv(output_dir / FALL, [["Dandadan Season 2", "1:00", "Yes", ""]])
+    stat = os.stat(output_dir / FALL)
+    os.utime(output_dir / FALL, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert index.sync(force=True) == {"added": [], "updated": [FALL], "removed": []}
+    assert titles(index.search("dandadan")) == ["Dandadan Season 2"]
+    assert index.search("frieren")["total"] == 1
+
+    (tmp_path / "csv_config.json").write_text(json.dumps({"files": [FALL]}))
+    assert index.sync(force=True)["removed"] == [SPRING]
+    assert index.search("frieren")["total"] == 0
@@ -0,0 +1,143 @@
+import csv
+import gzip
+import http.client
+import json
+import threading
+
+import pytest
+
+from references import COLUMNS
+from server import ViewerServer, etag_matches
+
+
+FALL = "Fall 2024 Anime in a Nutshell_anime_references.csv"
+
+
+@pytest.fixture
+def server(tmp_path):
+    (tmp_path.parent / "secret.json").write_text("{}")
+    (tmp_path / "index.html").write_text("<html>" + "viewer " * 200 + "</html>")
+    (tmp_path / "script.js").write_text("console.log('viewer');\n" * 50)
+    (tmp_path / "styles.css").write_text("body { margin: 0; }\n")
+    (tmp_path / "extraction_manifest.json").write_text("{}")
+    (tmp_path / "static").mkdir()
+    (tmp_path / "static" / "image.png").write_bytes(b"\x89PNG" + b"\0" * 1000)
+    (tmp_path / "transcripts").mkdir()
+    with open(tmp_path / "transcripts" / FALL, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerow(["Dandadan", "5:41", "Yes", "Great opening"])
+        writer.writerow(["Re:Zero Season 3", "12:00", "Neutral", ""])
+    (tmp_path / "csv_config.json").write_text(json.dumps({"files": [FALL]}))
+
+    server = ViewerServer(("127.0.0.1", 0), root=str(tmp_path), config_file=str(tmp_path / "csv_config.json"),
+                          output_dir=str(tmp_path / "transcripts"), quiet=True)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def request(server, path, headers=None, method="GET"):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    connection.request(method, path, headers=headers or {})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"abcd"', '"abc"')
+    assert not etag_matches('', '"abc"')
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+def test_static_file_has_etag_and_revalidates(server, accept_encoding):
+    headers = {"Accept-Encoding": accept_encoding}
+    response, body = request(server, "/script.js", headers)
+    assert response.status == 200
+    assert response.getheader("Cache-Control") == "no-cache"
+    if accept_encoding == "gzip":
+        body = gzip.decompress(body)
+    assert body.startswith(b"console.log")
+    etag = response.getheader("ETag")
+
+    response, body = request(server, "/script.js", {**headers, "If-None-Match": etag})
+    assert response.status == 304
+    assert body == b""
+    assert response.getheader("ETag") == etag
+    assert request(server, "/script.js", {**headers, "If-None-Match": "W/" + etag})[0].status == 304
+    assert request(server, "/script.js", {**headers, "If-None-Match": '"other"'})[0].status == 200
+
+
+def test_gzip_variant_has_its_own_etag(server):
+    plain_etag = request(server, "/script.js", {"Accept-Encoding": "identity"})[0].getheader("ETag")
+    gzip_etag = request(server, "/script.js", {"Accept-Encoding": "gzip"})[0].getheader("ETag")
+    assert gzip_etag != plain_etag
+    assert request(server, "/script.js", {"Accept-Encoding": "gzip", "If-None-Match": plain_etag})[0].status == 200
+    assert request(server, "/script.js", {"Accept-Encoding": "identity", "If-None-Match": gzip_etag})[0].status == 200
+
+
+def test_images_are_cached(server):
+    response, _ = request(server, "/static/image.png")
+    assert response.status == 200
+    assert response.getheader("Cache-Control") == "public, max-age=86400"
+
+
+def test_gzip_is_sent_when_accepted(server):
+    response, body = request(server, "/", {"Accept-Encoding": "gzip"})
+    assert response.status == 200
+    assert response.getheader("Content-Encoding") == "gzip"
+    assert response.getheader("Vary") == "Accept-Encoding"
+    plain_response, plain_body = request(server, "/")
+    assert plain_response.getheader("Content-Encoding") is None
+    assert gzip.decompress(body) == plain_body
+    assert int(response.getheader("Content-Length")) == len(body)
+
+
+def test_head_sends_no_body(server):
+    response, body = request(server, "/index.html", method="HEAD")
+    assert response.status == 200
+    assert body == b""
+    assert int(response.getheader("Content-Length")) > 0
+
+
+def test_changed_file_gets_a_new_etag(server, tmp_path):
+    etag = request(server, "/styles.css")[0].getheader("ETag")
+    (tmp_path / "styles.css").write_text("body { margin: 1px; }\n")
+    response, body = request(server, "/styles.css", {"If-None-Match": etag})
+    assert response.status == 200
+    assert body == b"body { margin: 1px; }\n"
+
+
+@pytest.mark.parametrize("path", ["/extraction_manifest.json", "/static/../../secret.json", "/.env", "/static/missing.png",
+                                  "/transcripts/../extraction_manifest.json", "/server.py"])
+def test_only_viewer_files_are_served(server, path):
+    assert request(server, path)[0].status == 404
+
+
+def test_index_is_built_on_startup(server, tmp_path):
+    response, body = request(server, "/anime_index.json")
+    assert response.status == 200
+    index = json.loads(body)
+    assert [row["Anime Title"] for row in index["references"][FALL]] == ["Dandadan", "Re:Zero Season 3"]
+    assert (tmp_path / "anime_index.json.gz").exists()
+
+
+def test_api(server):
+    response, body = request(server, "/api/seasons")
+    assert response.status == 200
+    assert response.getheader("Cache-Control") == "no-cache"
+    assert json.loads(body)["seasons"][0]["references"] == 2
+
+    _, body = request(server, "/api/references?q=dandadan")
+    assert [row["Anime Title"] for row in json.loads(body)["results"]] == ["Dandadan"]
+    assert request(server, "/api/references?page=x")[0].status == 400
+    assert request(server, "/api/unknown")[0].status == 404
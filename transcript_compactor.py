@@ -0,0 +1,151 @@
+import re
+import html
+
+
+# Caption tags such as [Music], [Applause] or [ __ ], music notes and speaker change markers
+NOISE_PATTERN = re.compile(r'\[[^\]]{0,40}\]|\((?:music|applause|laughter|laughs|inaudible)\)|[♪♫]+|>>',
+                           re.IGNORECASE)
+
+# Filler words that carry no content
+FILLER_PATTERN = re.compile(r'\b(?:u+m+|u+h+|uhm+|erm+|hmm+|mhm+)\b[,.]?', re.IGNORECASE)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+WORD_KEY_PATTERN = re.compile(r'[^\w]+')
+SENTENCE_END = ('.', '!', '?')
+
+# Number of recently emitted words compared against the start of each snippet
+OVERLAP_WINDOW = 20
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens of a text, at about 4 characters per token.
+
+    Args:
+        text (str): The text
+
+    Returns:
+        int: The estimated number of tokens
+    """
+    return max(1, len(text or "") // 4) if text else 0
+
+
+def normalize_caption(text):
+    """
+    Clean up the text of one caption snippet.
+
+    Decodes HTML entities, removes caption tags like [Music] and filler words, and collapses whitespace.
+
+    Args:
+        text (str): The snippet text
+
+    Returns:
+        str: The cleaned text, possibly empty
+    """
+    text = html.unescape(text or "")
+    text = NOISE_PATTERN.sub(' ', text)
+    text = FILLER_PATTERN.sub(' ', text)
+    return WHITESPACE_PATTERN.sub(' ', text).strip(' ,')
+
+
+def _word_key(word):
+    return WORD_KEY_PATTERN.sub('', word.lower())
+
+
+def _overlap(recent_keys, keys):
+    """
+    Find how many leading words of a snippet repeat the last words already emitted.
+
+    Rolling auto-captions repeat the end of the previous line at the start of the next one.
+
+    Args:
+        recent_keys (list): Normalized keys of the last emitted words
+        keys (list): Normalized keys of the snippet's words
+
+    Returns:
+        int: Number of leading words to drop
+    """
+    for size in range(min(len(recent_keys), len(keys)), 0, -1):
+        if recent_keys[-size:] == keys[:size]:
+            # A single repeated word is more likely speech ("very very") than a caption overlap
+            if size >= 2 or size == len(keys):
+                return size
+            break
+    return 0
+
+
+def format_anchor(seconds):
+    """
+    Format a time anchor for the compacted transcript.
+
+    Args:
+        seconds (float): Time in seconds
+
+    Returns:
+        str: The anchor, e.g. "[05:41]"
+    """
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"[{minutes:02d}:{seconds:02d}]"
+
+
+def compact_transcript(snippets, anchor_seconds=30, min_line_chars=80, max_line_chars=400):
+    """
+    Turn raw caption snippets into a compact transcript for the Gemini prompt.
+
+    Snippets are normalized, words repeated by rolling captions are dropped, and the rest
+    is merged into lines of whole sentences. A line gets a "[mm:ss]" anchor with its start
+    time when at least anchor_seconds passed since the previous anchor.
+
+    Args:
+        snippets (iterable): TranscriptSnippets in time order, e.g. from YouTubeDataExtractor.iter_snippets
+        anchor_seconds (float): Minimum number of seconds between two time anchors
+        min_line_chars (int): A line ends at the first sentence end after this many characters
+        max_line_chars (int): A line ends after this many characters even without a sentence end
+            (auto-captions have no punctuation)
+
+    Returns:
+        str: The compacted transcript, one line per group of sentences
+    """
+    lines = []
+    line_words = []
+    line_length = 0
+    line_start = None
+    last_anchor = None
+    recent_keys = []
+
+    def flush():
+        nonlocal line_words, line_length, line_start, last_anchor
+        if not line_words:
+            return
+        text = " ".join(line_words)
+        if last_anchor is None or line_start - last_anchor >= anchor_seconds:
+            text = f"{format_anchor(line_start)} {text}"
+            last_anchor = line_start
+        lines.append(text)
+        line_words = []
+        line_length = 0
+        line_start = None
+
+    for snippet in snippets:
+        words = normalize_caption(snippet.text).split()
+        keys = [_word_key(word) for word in words]
+        overlap = _overlap(recent_keys, keys)
+        words = words[overlap:]
+        if not words:
+            continue
+
+        recent_keys = (recent_keys + keys[overlap:])[-OVERLAP_WINDOW:]
+        if line_start is None:
+            line_start = snippet.start
+
+        for word in words:
+            line_words.append(word)
+            line_length += len(word) + 1
+            if (line_length >= min_line_chars and word.endswith(SENTENCE_END)) or line_length >= max_line_chars:
+                flush()
+                line_start = snippet.start
+        if not line_words:
+            line_start = None
+
+    flush()
+    return "\n".join(lines) + "\n" if lines else ""
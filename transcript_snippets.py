@@ -0,0 +1,120 @@
+import bisect
+
+
+class TranscriptSnippet:
+    """
+    One caption snippet of a transcript.
+    """
+
+    __slots__ = ("text", "start", "duration")
+
+    def __init__(self, text, start=0.0, duration=0.0):
+        """
+        Initialize the snippet.
+
+        Args:
+            text (str): The caption text
+            start (float): Start time in seconds
+            duration (float): Duration in seconds
+        """
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    @classmethod
+    def from_dict(cls, snippet):
+        """
+        Create a snippet from a dict with text, start and duration.
+
+        Args:
+            snippet (dict): The snippet dict, e.g. from YouTubeDataExtractor.get_transcript
+
+        Returns:
+            TranscriptSnippet: The snippet
+        """
+        return cls(snippet['text'], snippet.get('start', 0.0), snippet.get('duration', 0.0))
+
+    def to_dict(self):
+        return {'text': self.text, 'start': self.start, 'duration': self.duration}
+
+    def __repr__(self):
+        return f"TranscriptSnippet({self.text!r}, start={self.start}, duration={self.duration})"
+
+
+class TranscriptWindow:
+    """
+    The snippets of a transcript between two points in time.
+    """
+
+    __slots__ = ("start", "end", "snippets")
+
+    def __init__(self, start, end, snippets):
+        """
+        Initialize the window.
+
+        Args:
+            start (float): Start of the window in seconds
+            end (float): End of the window in seconds
+            snippets (list): The TranscriptSnippets starting inside the window
+        """
+        self.start = start
+        self.end = end
+        self.snippets = snippets
+
+    @property
+    def text(self):
+        """
+        The text of the window, one snippet per line.
+        """
+        return "".join(snippet.text + "\n" for snippet in self.snippets)
+
+    def __repr__(self):
+        return f"TranscriptWindow(start={self.start}, end={self.end}, snippets={len(self.snippets)})"
+
+
+def iter_windows(snippets, window_seconds=None, boundaries=None):
+    """
+    Group time-ordered snippets into consecutive windows, holding one window in memory at a time.
+
+    Windows are either fixed windows of window_seconds or the ranges between the given
+    boundaries. Windows without snippets are skipped. The last window ends with its last snippet.
+
+    Args:
+        snippets (iterable): TranscriptSnippets ordered by start time, e.g. from YouTubeDataExtractor.iter_snippets
+        window_seconds (float, optional): Length of fixed windows
+        boundaries (list, optional): Window start times in seconds; the first window starts at 0
+
+    Yields:
+        TranscriptWindow: The windows in time order
+    """
+    if not window_seconds and not boundaries:
+        raise ValueError("window_seconds or boundaries is required")
+    boundaries = sorted(boundaries) if boundaries else None
+
+    def bounds(seconds):
+        if boundaries:
+            index = bisect.bisect_right(boundaries, seconds) - 1
+            start = boundaries[index] if index >= 0 else 0
+            end = boundaries[index + 1] if index + 1 < len(boundaries) else None
+            return start, end
+        start = (seconds // window_seconds) * window_seconds
+        return start, start + window_seconds
+
+    window = None
+    for snippet in snippets:
+        if window is not None and window.end is not None and snippet.start >= window.end:
+            yield window
+            window = None
+        if window is None:
+            start, end = bounds(snippet.start)
+            window = TranscriptWindow(start, end, [])
+        window.snippets.append(snippet)
+
+    if window is not None:
+        last_end = max(snippet.end for snippet in window.snippets)
+        window.end = last_end if window.end is None else min(window.end, last_end)
+        yield window
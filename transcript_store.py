@@ -0,0 +1,219 @@
+import os
+import json
+import gzip
+import time
+import threading
+from transcript_snippets import TranscriptSnippet
+
+
+class TranscriptStore:
+    """
+    A local store of raw YouTube transcripts keyed by (video ID, language).
+
+    Each transcript is saved once as a gzip-compressed JSON-lines file. The first line is a
+    header with the video ID, language and fetch time, followed by one compact
+    [start, duration, text] array per snippet, so the timing data is kept and transcripts
+    can be read back one snippet at a time.
+    """
+
+    def __init__(self, store_dir, max_age=None, max_entries=None):
+        """
+        Initialize the store.
+
+        Args:
+            store_dir (str): Directory where transcripts are stored
+            max_age (float, optional): Seconds after which prune() removes a stored transcript
+            max_entries (int, optional): Maximum number of transcripts kept by prune()
+        """
+        self.store_dir = store_dir
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        # Create the store directory if it doesn't exist
+        if not os.path.exists(store_dir):
+            os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, video_id, language=None):
+        """
+        Get the file path used to store a transcript.
+
+        Args:
+            video_id (str): The YouTube video ID
+            language (str, optional): The language code, None for YouTube's default
+
+        Returns:
+            str: Path of the transcript file
+        """
+        return os.path.join(self.store_dir, f"{video_id}.{language or 'default'}.jsonl.gz")
+
+    def has(self, video_id, language=None):
+        """
+        Check whether a transcript is stored.
+
+        Args:
+            video_id (str): The YouTube video ID
+            language (str, optional): The language code
+
+        Returns:
+            bool: True if the transcript is stored
+        """
+        return os.path.exists(self._path(video_id, language))
+
+    def get(self, video_id, language=None):
+        """
+        Read a stored transcript.
+
+        Args:
+            video_id (str): The YouTube video ID
+            language (str, optional): The language code
+
+        Returns:
+            list: Snippet dicts with text, start and duration, or None if the transcript isn't stored
+        """
+        try:
+            return [snippet.to_dict() for snippet in self.iter(video_id, language)]
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error reading stored transcript for video {video_id}: {str(e)}")
+            self.evict(video_id, language)
+            return None
+
+    def iter(self, video_id, language=None):
+        """
+        Read a stored transcript one snippet at a time.
+
+        Args:
+            video_id (str): The YouTube video ID
+            language (str, optional): The language code
+
+        Yields:
+            TranscriptSnippet: The snippets in time order
+
+        Raises:
+            FileNotFoundError: If the transcript isn't stored
+        """
+        with gzip.open(self._path(video_id, language), 'rt', encoding='utf-8') as f:
+            f.readline()  # header
+            for line in f:
+                start, duration, text = json.loads(line)
+                yield TranscriptSnippet(text, start, duration)
+
+    def put(self, video_id, language, snippets):
+        """
+        Save a transcript, replacing any stored copy.
+
+        Args:
+            video_id (str): The YouTube video ID
+            language (str, optional): The language code
+            snippets (iterable): Snippet dicts (or objects) with text, start and duration
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        path = self._path(video_id, language)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                header = {'video_id': video_id, 'language': language, 'fetched': time.time()}
+                f.write(json.dumps(header) + "\n")
+                for snippet in snippets:
+                    if isinstance(snippet, dict):
+                        row = [snippet.get('start', 0.0), snippet.get('duration', 0.0), snippet['text']]
+                    else:
+                        row = [snippet.start, snippet.duration, snippet.text]
+                    f.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + "\n")
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error storing transcript for video {video_id}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        if self.max_age is not None or self.max_entries is not None:
+            self.prune()
+        return True
+
+    def evict(self, video_id, language=None):
+        """
+        Remove a stored transcript.
+
+        Args:
+            video_id (str): The YouTube video ID
+            language (str, optional): The language code. If "*", every language of the video is removed
+
+        Returns:
+            int: Number of transcripts removed
+        """
+        if language == "*":
+            paths = [
+                os.path.join(self.store_dir, filename)
+                for filename in os.listdir(self.store_dir)
+                if filename.startswith(f"{video_id}.") and filename.endswith(".jsonl.gz")
+            ]
+        else:
+            paths = [self._path(video_id, language)]
+
+        removed = 0
+        for path in paths:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def clear(self):
+        """
+        Remove every stored transcript.
+
+        Returns:
+            int: Number of transcripts removed
+        """
+        removed = 0
+        for filename in os.listdir(self.store_dir):
+            if filename.endswith(".jsonl.gz"):
+                try:
+                    os.remove(os.path.join(self.store_dir, filename))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def prune(self):
+        """
+        Remove transcripts older than max_age, then the oldest transcripts until at most
+        max_entries remain.
+
+        Returns:
+            int: Number of transcripts removed
+        """
+        with self._lock:
+            entries = []
+            for filename in os.listdir(self.store_dir):
+                if not filename.endswith(".jsonl.gz"):
+                    continue
+                path = os.path.join(self.store_dir, filename)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+            entries.sort()
+
+            # The two limits apply independently: expired transcripts go first, then the
+            # oldest of the rest while there are more than max_entries
+            now = time.time()
+            expired = [path for mtime, path in entries if self.max_age is not None and now - mtime > self.max_age]
+            kept = entries[len(expired):] if expired else entries
+            kept = [path for _, path in kept]
+            excess = kept[:max(0, len(kept) - self.max_entries)] if self.max_entries is not None else []
+
+            removed = 0
+            for path in expired + excess:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError:
+                    pass
+            return removed
@@ -1,27 +1,180 @@
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
 import os
-import yt_dlp
-import re
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from disk_cache import DiskCache
+from transcript_store import TranscriptStore
+from transcript_snippets import TranscriptSnippet, iter_windows
+from chapters import Chapter, parse_chapters, chapters_to_dict, format_timestamp
+from scheduler import RequestScheduler
+from ytdlp_pool import YoutubeDLPool, METADATA_OPTIONS, LISTING_OPTIONS
+from atomic_io import atomic_write, temporary_path
 
 class YouTubeDataExtractor:
     """
     A class to extract data from YouTube videos, including transcripts and video information.
     """
     
-    def __init__(self, output_dir="transcripts"):
+    def __init__(self, output_dir="transcripts", cache_dir=".cache", metadata_ttl=7 * 24 * 3600,
+                 metadata_max_entries=2000, transcript_max_entries=None, max_io_workers=16, scheduler=None,
+                 youtube_rate_per_minute=60, ytdlp_pool=None):
         """
         Initialize the extractor with an optional output directory.
         
         Args:
             output_dir (str): Directory where transcript files will be saved
+            cache_dir (str): Directory for the on-disk caches
+            metadata_ttl (float, optional): Seconds before cached video metadata is fetched again. None never expires
+            metadata_max_entries (int, optional): Maximum number of videos kept in the metadata cache
+            transcript_max_entries (int, optional): Maximum number of transcripts kept in the transcript store
+            max_io_workers (int): Maximum number of blocking YouTube calls run at once by the async methods
+            scheduler (RequestScheduler, optional): Scheduler shared with other backends. A new one is created if None
+            youtube_rate_per_minute (float): Maximum number of YouTube requests per minute
+            ytdlp_pool (YoutubeDLPool, optional): Pool of yt-dlp instances used for video metadata.
+                A new one with the lean METADATA_OPTIONS profile is created if None
         """
         self.output_dir = output_dir
+        self.cache_dir = cache_dir
+        self.max_io_workers = max_io_workers
+        self._io_executor = None
+        self._io_executor_lock = threading.Lock()
+        
+        # Rate limit, retries and circuit breaker for every request to YouTube
+        self.scheduler = scheduler or RequestScheduler()
+        self.scheduler.add_backend("youtube", youtube_rate_per_minute, burst=4)
+        
+        # Long-lived yt-dlp instances: one profile for single videos, a flat one for playlist and channel listings
+        self.ytdlp = ytdlp_pool or YoutubeDLPool(METADATA_OPTIONS, max_size=4)
+        self.ytdlp_listing = YoutubeDLPool(LISTING_OPTIONS, max_size=1)
         
         # Create the output directory if it doesn't exist
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
+        
+        # Video metadata (title, description, duration, upload date) keyed by video ID
+        self.metadata_cache = DiskCache(os.path.join(cache_dir, "metadata"), ttl=metadata_ttl,
+                                        max_entries=metadata_max_entries)
+        
+        # Raw transcript snippets with timing data keyed by (video ID, language)
+        self.transcript_store = TranscriptStore(os.path.join(cache_dir, "transcripts"),
+                                                max_entries=transcript_max_entries)
+    
+    @staticmethod
+    def resolve_video_id(video):
+        """
+        Get the video ID from either a video ID or a YouTube URL.
+        
+        Args:
+            video (str): A YouTube video ID or URL
+            
+        Returns:
+            str: The video ID or None if it couldn't be extracted
+        """
+        if '/' in video or 'youtube' in video or 'youtu.be' in video:
+            return YouTubeDataExtractor.get_video_id_from_url(video)
+        return video
+    
+    def get_video_metadata(self, video, refresh=False):
+        """
+        Get the title, description, duration and upload date of a YouTube video.
+        
+        The metadata is fetched with a single yt-dlp call per video and kept in the
+        on-disk metadata cache, so later calls for the same video don't hit YouTube.
+        
+        Args:
+            video (str): The YouTube video ID or URL
+            refresh (bool): Ignore the cached entry and fetch the metadata again
+            
+        Returns:
+            dict: The video metadata or None if it couldn't be retrieved
+        """
+        video_id = self.resolve_video_id(video)
+        if video_id and not refresh:
+            metadata = self.metadata_cache.get(video_id)
+            if metadata is not None:
+                return metadata
+        
+        video_url = f"https://www.youtube.com/watch?v={video_id}" if video_id else video
+        try:
+            info = self.scheduler.call("youtube", self._extract_info, video_url)
+        except Exception as e:
+            print(f"Error getting metadata for video {video_url}: {str(e)}")
+            return None
+        
+        metadata = {
+            'id': info.get('id') or video_id,
+            'title': info.get('title'),
+            'description': info.get('description'),
+            'duration': info.get('duration'),
+            'upload_date': info.get('upload_date') or self._upload_date(info.get('timestamp')),
+            'chapters': [
+                {'title': chapter.get('title'), 'start_time': chapter.get('start_time'),
+                 'end_time': chapter.get('end_time')}
+                for chapter in (info.get('chapters') or [])
+            ],
+        }
+        if metadata['id']:
+            self.metadata_cache.set(metadata['id'], metadata)
+        return metadata
+    
+    def _extract_info(self, video_url):
+        # Only the raw extractor result is needed, without yt-dlp's format processing
+        return self.ytdlp.extract_info(video_url, process=False)
+    
+    @staticmethod
+    def _upload_date(timestamp):
+        # yt-dlp only derives upload_date from the timestamp while processing, which is skipped
+        if not timestamp:
+            return None
+        from datetime import datetime, timezone
+        return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y%m%d')
+    
+    def get_playlist_entries(self, url, max_entries=None):
+        """
+        List the videos of a playlist or channel without visiting each video.
+        
+        Uses yt-dlp's flat playlist extraction, so a listing costs a few page requests no
+        matter how many videos it has. Nested playlists, e.g. the tabs of a channel page,
+        are skipped; pass the /videos URL of a channel to list its uploads.
+        
+        Args:
+            url (str): The playlist or channel URL
+            max_entries (int, optional): Only read the first entries, e.g. the latest uploads of a channel
+            
+        Returns:
+            list: Dicts with 'id', 'title', 'url' and 'duration' (None if unknown) in listing order,
+                or None if the listing couldn't be retrieved
+        """
+        try:
+            info = self.scheduler.call("youtube", self.ytdlp_listing.extract_info, url, max_entries=max_entries)
+        except Exception as e:
+            print(f"Error listing videos of {url}: {str(e)}")
+            return None
+        
+        entries = []
+        for entry in info.get('entries') or []:
+            if not entry or entry.get('_type') == 'playlist' or entry.get('ie_key') not in (None, 'Youtube'):
+                continue
+            video_id = entry.get('id')
+            if video_id:
+                entries.append({
+                    'id': video_id,
+                    'title': entry.get('title'),
+                    'url': entry.get('url') or f"https://www.youtube.com/watch?v={video_id}",
+                    'duration': entry.get('duration'),
+                })
+        return entries
+    
+    def close(self):
+        """
+        Close the pooled yt-dlp instances and the I/O thread pool of the async methods.
+        """
+        self.ytdlp.close()
+        self.ytdlp_listing.close()
+        with self._io_executor_lock:
+            if self._io_executor is not None:
+                self._io_executor.shutdown(wait=False)
+                self._io_executor = None
     
     def get_video_title(self, video_url):
         """
@@ -33,13 +186,143 @@ class YouTubeDataExtractor:
         Returns:
             str: The video title or None if it couldn't be retrieved
         """
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(video_url, download=False)
-                return info.get('title')
-        except Exception as e:
-            print(f"Error getting title for video {video_url}: {str(e)}")
+        metadata = self.get_video_metadata(video_url)
+        if not metadata:
             return None
+        return metadata.get('title')
+    
+    def get_transcript(self, video_id, language_code=None, refresh=False):
+        """
+        Get the raw transcript snippets of a video, including their timing data.
+        
+        The transcript is fetched from YouTube only once per (video ID, language) and read
+        from the local transcript store afterwards. Rate limits and transient errors are
+        retried by the scheduler; other errors from youtube-transcript-api are raised to the caller.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            language_code (str, optional): The language code for the transcript
+            refresh (bool): Fetch the transcript from YouTube again and replace the stored copy
+            
+        Returns:
+            list: Snippet dicts with text, start and duration
+        """
+        if not refresh:
+            transcript = self.transcript_store.get(video_id, language_code)
+            if transcript is not None:
+                return transcript
+        
+        return self._fetch_transcript(video_id, language_code)
+    
+    def _fetch_transcript(self, video_id, language_code=None):
+        """
+        Fetch a transcript from YouTube and save it in the transcript store.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            language_code (str, optional): The language code for the transcript
+            
+        Returns:
+            list: The snippets returned by youtube-transcript-api
+        """
+        from youtube_transcript_api import YouTubeTranscriptApi
+        
+        if language_code:
+            transcript = self.scheduler.call("youtube", YouTubeTranscriptApi.get_transcript, video_id,
+                                             languages=[language_code])
+        else:
+            transcript = self.scheduler.call("youtube", YouTubeTranscriptApi.get_transcript, video_id)
+        
+        self.transcript_store.put(video_id, language_code, transcript)
+        return transcript
+    
+    def iter_snippets(self, video_id, language_code=None, refresh=False, start=None, end=None):
+        """
+        Iterate over the snippets of a transcript, optionally only those in a time range.
+        
+        The transcript is fetched into the transcript store if needed and then read back one
+        snippet at a time, so even multi-hour streams are processed in constant memory.
+        Errors from youtube-transcript-api are raised when iteration starts.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            language_code (str, optional): The language code for the transcript
+            refresh (bool): Fetch the transcript from YouTube again and replace the stored copy
+            start (float, optional): Skip snippets starting before this many seconds
+            end (float, optional): Stop at the first snippet starting at or after this many seconds
+            
+        Yields:
+            TranscriptSnippet: The snippets in time order
+        """
+        if refresh or not self.transcript_store.has(video_id, language_code):
+            transcript = self._fetch_transcript(video_id, language_code)
+            if not self.transcript_store.has(video_id, language_code):
+                # The store couldn't save it, so stream the fetched copy instead
+                snippets = (TranscriptSnippet.from_dict(snippet) if isinstance(snippet, dict) else
+                            TranscriptSnippet(snippet.text, snippet.start, snippet.duration)
+                            for snippet in transcript)
+            else:
+                snippets = self.transcript_store.iter(video_id, language_code)
+        else:
+            snippets = self.transcript_store.iter(video_id, language_code)
+        
+        for snippet in snippets:
+            if start is not None and snippet.start < start:
+                continue
+            if end is not None and snippet.start >= end:
+                break
+            yield snippet
+    
+    def iter_transcript_windows(self, video_id, window_seconds=None, boundaries=None, language_code=None,
+                                refresh=False):
+        """
+        Iterate over a transcript in consecutive time windows.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            window_seconds (float, optional): Length of fixed windows
+            boundaries (list, optional): Window start times in seconds, e.g. chapter starts
+            language_code (str, optional): The language code for the transcript
+            refresh (bool): Fetch the transcript from YouTube again and replace the stored copy
+            
+        Yields:
+            TranscriptWindow: The non-empty windows in time order
+        """
+        snippets = self.iter_snippets(video_id, language_code, refresh=refresh)
+        yield from iter_windows(snippets, window_seconds, boundaries)
+    
+    def _print_transcript_error(self, video_id, error, action="getting"):
+        """
+        Print an error raised while reading a transcript.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            error (Exception): The error
+            action (str): What was being done, e.g. "downloading"
+        """
+        from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
+        
+        if isinstance(error, TranscriptsDisabled):
+            print(f"Error: Transcripts are disabled for video {video_id}")
+        elif isinstance(error, NoTranscriptFound):
+            print(f"Error: No transcript found for video {video_id}")
+        elif isinstance(error, VideoUnavailable):
+            print(f"Error: Video {video_id} is unavailable")
+        else:
+            print(f"Error {action} transcript for video {video_id}: {str(error)}")
+    
+    def evict_transcript(self, video_id, language_code=None):
+        """
+        Remove a transcript from the local transcript store so the next call fetches it again.
+        
+        Args:
+            video_id (str): The YouTube video ID
+            language_code (str, optional): The language code. Use "*" to remove every language
+            
+        Returns:
+            int: Number of stored transcripts removed
+        """
+        return self.transcript_store.evict(video_id, language_code)
     
     def sanitize_filename(self, filename):
         """
@@ -58,7 +341,7 @@ class YouTubeDataExtractor:
         # Limit the length of the filename
         return filename[:100]  # Limit to 100 characters
 
-    def download_transcript(self, video_id, language_code=None, filename=None):
+    def download_transcript(self, video_id, language_code=None, filename=None, refresh=False):
         """
         Download the transcript for a specific YouTube video and save it to a text file.
         
@@ -66,123 +349,80 @@ class YouTubeDataExtractor:
             video_id (str): The YouTube video ID
             language_code (str, optional): The language code for the transcript
             filename (str, optional): Custom filename for the transcript
+            refresh (bool): Fetch the transcript from YouTube again instead of using the transcript store
             
         Returns:
             str: Path to the saved transcript file or None if an error occurred
         """
-        try:
-            # Get transcript
-            if language_code:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language_code])
-            else:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            
-            # Format transcript by directly accessing text from each entry
-            formatted_transcript = ""
-            for snippet in transcript:
-                formatted_transcript += snippet['text'] + "\n"
-            
-            # Determine filename
-            if not filename:
-                # Get video title and use it for filename
-                video_url = f"https://www.youtube.com/watch?v={video_id}"
-                video_title = self.get_video_title(video_url)
-                
-                if video_title:
-                    # Sanitize the title to be used as a filename
-                    sanitized_title = self.sanitize_filename(video_title)
-                    filename = f"{sanitized_title}.txt"
-                else:
-                    # Fall back to video ID if title can't be retrieved
-                    filename = f"{video_id}.txt"
-            elif not filename.endswith('.txt'):
-                filename = f"{filename}.txt"
-            
-            # Save transcript to file
-            file_path = os.path.join(self.output_dir, filename)
-            with open(file_path, 'w', encoding='utf-8') as file:
-                file.write(formatted_transcript)
+        # Determine filename
+        if not filename:
+            # Get video title and use it for filename
+            video_url = f"https://www.youtube.com/watch?v={video_id}"
+            video_title = self.get_video_title(video_url)
             
+            if video_title:
+                # Sanitize the title to be used as a filename
+                sanitized_title = self.sanitize_filename(video_title)
+                filename = f"{sanitized_title}.txt"
+            else:
+                # Fall back to video ID if title can't be retrieved
+                filename = f"{video_id}.txt"
+        elif not filename.endswith('.txt'):
+            filename = f"{filename}.txt"
+        
+        # Stream the snippets to a temporary file and move it into place once complete
+        file_path = os.path.join(self.output_dir, filename)
+        tmp_path = temporary_path(file_path)
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                for snippet in self.iter_snippets(video_id, language_code, refresh=refresh):
+                    file.write(snippet.text + "\n")
+            os.replace(tmp_path, file_path)
             return file_path
         
-        except TranscriptsDisabled:
-            print(f"Error: Transcripts are disabled for video {video_id}")
-            return None
-        except NoTranscriptFound:
-            print(f"Error: No transcript found for video {video_id}")
-            return None
-        except VideoUnavailable:
-            print(f"Error: Video {video_id} is unavailable")
-            return None
         except Exception as e:
-            # Handle the case where error might be a dictionary
-            if isinstance(e, dict):
-                print(f"Error downloading transcript for video {video_id}: {str(e)}")
-            else:
-                print(f"Error downloading transcript for video {video_id}: {str(e)}")
+            self._print_transcript_error(video_id, e, "downloading")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return None
     
-    def get_transcript_text(self, video_id, language_code=None):
+    def get_transcript_text(self, video_id, language_code=None, refresh=False):
         """
         Get the transcript text without saving to a file.
         
         Args:
             video_id (str): The YouTube video ID
             language_code (str, optional): The language code for the transcript
+            refresh (bool): Fetch the transcript from YouTube again instead of using the transcript store
             
         Returns:
             str: The transcript text or None if an error occurred
         """
         try:
-            # Get transcript
-            if language_code:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language_code])
-            else:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            
-            # Format transcript by directly accessing text from each entry
-            formatted_transcript = ""
-            for snippet in transcript:
-                formatted_transcript += snippet['text'] + "\n"
-            
-            return formatted_transcript
-        
-        except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable) as e:
-            print(f"Error: {str(e)} for video {video_id}")
-            return None
+            return "".join(snippet.text + "\n" for snippet in self.iter_snippets(video_id, language_code,
+                                                                                  refresh=refresh))
         except Exception as e:
-            print(f"Error getting transcript for video {video_id}: {str(e)}")
+            self._print_transcript_error(video_id, e)
             return None
 
-    def print_transcript_snippets(self, video_id, language_code=None):
+    def print_transcript_snippets(self, video_id, language_code=None, refresh=False):
         """
         Print individual transcript snippets (similar to the provided example).
         
         Args:
             video_id (str): The YouTube video ID
             language_code (str, optional): The language code for the transcript
+            refresh (bool): Fetch the transcript from YouTube again instead of using the transcript store
             
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            # Get transcript
-            if language_code:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id, languages=[language_code])
-            else:
-                transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            
-            # Print each snippet
-            for snippet in transcript:
-                print(snippet['text'])
-            
+            for snippet in self.iter_snippets(video_id, language_code, refresh=refresh):
+                print(snippet.text)
             return True
-        
-        except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable) as e:
-            print(f"Error: {str(e)} for video {video_id}")
-            return False
         except Exception as e:
-            print(f"Error printing transcript for video {video_id}: {str(e)}")
+            self._print_transcript_error(video_id, e, "printing")
             return False
 
     def get_description(self, video_url):
@@ -195,15 +435,13 @@ class YouTubeDataExtractor:
         Returns:
             str: The video description or 'No description found' if not available
         """
-        try:
-            with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
-                info = ydl.extract_info(video_url, download=False)
-                return info.get('description', 'No description found')
-        except Exception as e:
-            print(f"Error getting description for video {video_url}: {str(e)}")
+        metadata = self.get_video_metadata(video_url)
+        if not metadata:
             return "Description could not be retrieved"
+        return metadata.get('description') or 'No description found'
     
-    def get_video_id_from_url(self, video_url):
+    @staticmethod
+    def get_video_id_from_url(video_url):
         """
         Extract the video ID from a YouTube URL.
         
@@ -271,7 +509,7 @@ class YouTubeDataExtractor:
                 
             # Save description to file
             file_path = os.path.join(output_dir, filename)
-            with open(file_path, 'w', encoding='utf-8') as file:
+            with atomic_write(file_path, encoding='utf-8') as file:
                 file.write(description)
             
             return file_path
@@ -288,7 +526,7 @@ class YouTubeDataExtractor:
             video_url (str, optional): The URL of the YouTube video to get description from
             
         Returns:
-            dict: A dictionary with timestamps as keys and titles as values
+            dict: A dictionary with timestamps as keys and titles as values, in start time order
             
         Note:
             Either description or video_url must be provided. If both are provided,
@@ -296,6 +534,8 @@ class YouTubeDataExtractor:
             This function can handle both formats:
             - "0:00 Anime Name" (timestamp first)
             - "Anime Name 0:00" (anime name first)
+            Use chapters.parse_chapters or get_chapters for an ordered list with start and end
+            times in seconds that keeps repeated timestamps.
         """
         if not description and not video_url:
             print("Error: Either description or video_url must be provided")
@@ -308,36 +548,94 @@ class YouTubeDataExtractor:
                 print(f"No description found for video: {video_url}")
                 return {}
         
-        # Dictionary to store timestamps and titles
-        timestamps_dict = {}
+        return chapters_to_dict(parse_chapters(description))
+    
+    def get_chapters(self, video, refresh=False):
+        """
+        Get the chapters of a video with their start and end times in seconds.
         
-        # Regex pattern for "timestamp title" format (0:00 Anime Name)
-        timestamp_first_pattern = r'(\d+:\d+(?::\d+)?)\s+(.*?)(?=\n\d+:\d+(?::\d+)?\s+|\n\n|\Z)'
+        Uses the chapters YouTube reports in the video metadata, or parses the timestamp
+        lines of the description if there are none.
         
-        # Regex pattern for "title timestamp" format (Anime Name 0:00)
-        title_first_pattern = r'(.*?)\s+(\d+:\d+(?::\d+)?)(?=\n|$)'
+        Args:
+            video (str): The YouTube video ID or URL
+            refresh (bool): Fetch the metadata again instead of using the metadata cache
+            
+        Returns:
+            list: Chapter objects ordered by start time, empty if the video has no chapters
+        """
+        metadata = self.get_video_metadata(video, refresh=refresh)
+        if not metadata:
+            return []
+        if metadata.get('chapters'):
+            return [
+                Chapter(format_timestamp(chapter.get('start_time') or 0), chapter.get('title') or '',
+                        int(chapter.get('start_time') or 0),
+                        int(chapter['end_time']) if chapter.get('end_time') is not None else None)
+                for chapter in metadata['chapters']
+            ]
+        return parse_chapters(metadata.get('description'), metadata.get('duration'))
+
+    def _run_blocking(self, func, *args):
+        """
+        Run a blocking YouTube call on the extractor's bounded I/O thread pool.
         
-        # Find matches for timestamp-first format
-        timestamp_first_matches = re.findall(timestamp_first_pattern, description, re.MULTILINE)
+        The YouTube libraries have no async API, so the async methods hand their calls to a
+        pool of at most max_io_workers threads. Extra calls wait in the pool's queue, which
+        applies backpressure instead of starting a thread per video.
         
-        # Process timestamp-first matches
-        for timestamp, title in timestamp_first_matches:
-            # Clean up the title (remove extra spaces)
-            title = title.strip()
+        Args:
+            func (callable): The blocking function to call
+            *args: Arguments for the function
             
-            # Add to dictionary
-            timestamps_dict[timestamp] = title
+        Returns:
+            asyncio.Future: Future resolving to the function's return value
+        """
+        with self._io_executor_lock:
+            if self._io_executor is None:
+                self._io_executor = ThreadPoolExecutor(max_workers=self.max_io_workers,
+                                                       thread_name_prefix="youtube-io")
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._io_executor, func, *args)
+
+    async def get_transcript_async(self, video_id, language_code=None, refresh=False):
+        """
+        Async version of get_transcript. Errors are raised to the caller.
         
-        # Find matches for title-first format
-        title_first_matches = re.findall(title_first_pattern, description, re.MULTILINE)
+        Args:
+            video_id (str): The YouTube video ID
+            language_code (str, optional): The language code for the transcript
+            refresh (bool): Fetch the transcript from YouTube again and replace the stored copy
+            
+        Returns:
+            list: Snippet dicts with text, start and duration
+        """
+        return await self._run_blocking(self.get_transcript, video_id, language_code, refresh)
+
+    async def get_transcript_text_async(self, video_id, language_code=None, refresh=False):
+        """
+        Async version of get_transcript_text.
         
-        # Process title-first matches
-        for title, timestamp in title_first_matches:
-            # Clean up the title (remove extra spaces)
-            title = title.strip()
+        Args:
+            video_id (str): The YouTube video ID
+            language_code (str, optional): The language code for the transcript
+            refresh (bool): Fetch the transcript from YouTube again instead of using the transcript store
             
-            # If this timestamp isn't already in our dict (to avoid duplicates)
-            if timestamp not in timestamps_dict:
-                timestamps_dict[timestamp] = title
+        Returns:
+            str: The transcript text or None if an error occurred
+        """
+        return await self._run_blocking(self.get_transcript_text, video_id, language_code, refresh)
+
+    async def get_video_metadata_async(self, video, refresh=False):
+        """
+        Async version of get_video_metadata.
         
-        return timestamps_dict
\ No newline at end of file
+        Args:
+            video (str): The YouTube video ID or URL
+            refresh (bool): Ignore the cached entry and fetch the metadata again
+            
+        Returns:
+            dict: The video metadata or None if it couldn't be retrieved
+        """
+        return await self._run_blocking(self.get_video_metadata, video, refresh)
+
@@ -0,0 +1,152 @@
+import itertools
+import threading
+import contextlib
+
+
+# Reading the title, description, duration and chapters of one video: nothing is downloaded and
+# the DASH/HLS manifests and translated subtitles that are only needed for format selection are skipped
+METADATA_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'noplaylist': True,
+    'extractor_args': {'youtube': {'skip': ['dash', 'hls', 'translated_subs']}},
+}
+
+# Listing the videos of a playlist or channel without visiting each video
+LISTING_OPTIONS = {
+    'quiet': True,
+    'no_warnings': True,
+    'skip_download': True,
+    'extract_flat': 'in_playlist',
+}
+
+# info dict types that point to another page instead of describing a video or playlist
+URL_RESULT_TYPES = ('url', 'url_transparent')
+
+
+class YoutubeDLPool:
+    """
+    A pool of long-lived yt_dlp.YoutubeDL instances shared by all threads.
+
+    Creating a YoutubeDL instance sets up its extractors, cookie jar and HTTP handlers, so
+    instances are created on demand, up to max_size, and reused for later calls. Each instance
+    is used by one thread at a time. yt-dlp is imported when the first instance is created.
+    """
+
+    def __init__(self, options=None, max_size=4):
+        """
+        Initialize the pool.
+
+        Args:
+            options (dict, optional): YoutubeDL options of every instance. Defaults to METADATA_OPTIONS
+            max_size (int): Maximum number of instances, i.e. of concurrent extractions
+        """
+        self.options = dict(METADATA_OPTIONS if options is None else options)
+        self.max_size = max(1, max_size)
+        self.size = 0
+        self._closed = False
+        self._idle = []
+        self._condition = threading.Condition()
+
+    def _create(self):
+        import yt_dlp
+
+        return yt_dlp.YoutubeDL(dict(self.options))
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """
+        Borrow an instance, waiting while all of them are in use.
+
+        Failed extractions leave no state behind, so the instance is put back after an error too.
+        Only an interrupted one (e.g. KeyboardInterrupt in the middle of a request) is closed.
+
+        Yields:
+            yt_dlp.YoutubeDL: The instance
+        """
+        with self._condition:
+            while not self._idle and self.size >= self.max_size:
+                self._condition.wait()
+            ydl = self._idle.pop() if self._idle else None
+            if ydl is None:
+                self.size += 1
+
+        if ydl is None:
+            try:
+                ydl = self._create()
+            except BaseException:
+                with self._condition:
+                    self.size -= 1
+                    self._condition.notify()
+                raise
+
+        interrupted = True
+        try:
+            yield ydl
+            interrupted = False
+        except Exception:
+            interrupted = False
+            raise
+        finally:
+            self._release(ydl, discard=interrupted)
+
+    def _release(self, ydl, discard=False):
+        with self._condition:
+            if not (discard or self._closed):
+                self._idle.append(ydl)
+                self._condition.notify()
+                return
+        self._discard(ydl)
+
+    def _discard(self, ydl):
+        with self._condition:
+            self.size -= 1
+            self._condition.notify()
+        try:
+            ydl.close()
+        except Exception:
+            pass
+
+    def extract_info(self, url, process=False, max_entries=None):
+        """
+        Extract the info dict of a video, playlist or channel URL without downloading anything.
+
+        Args:
+            url (str): The URL
+            process (bool): Run yt-dlp's post-extraction processing (format selection, thumbnail
+                sorting, playlist entry resolution). The raw extractor result already holds the
+                title, description, duration and chapters, so it is skipped by default
+            max_entries (int, optional): Keep only the first entries of a playlist. Listings are read
+                page by page, so a small limit only costs the first page
+
+        Returns:
+            dict: The info dict
+        """
+        with self.acquire() as ydl:
+            info = ydl.extract_info(url, download=False, process=process)
+            # Short links and channel pages can point to another page first, so follow it once
+            if info and info.get('_type') in URL_RESULT_TYPES and info.get('url'):
+                info = ydl.extract_info(info['url'], download=False, process=process)
+            # Playlist entries can be a generator that requests further pages while it is consumed
+            if info and info.get('entries') is not None:
+                info['entries'] = list(itertools.islice(info['entries'], max_entries))
+        return info
+
+    def close(self):
+        """
+        Close every idle instance. Instances in use are closed when they are given back.
+        """
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self.size -= len(idle)
+        for ydl in idle:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._condition:
+            return {"size": self.size, "idle": len(self._idle), "max_size": self.max_size}